@@ -1,74 +1,248 @@
-from collections import defaultdict
 import random
-import copy
 import numpy as np
 
-def solution_capacity(solution: list, cap_cost_array) -> float:
+class SolutionState:
     """
-    Calcula la capacidad total de una solución dada.
-    
-    Parámetros:
-    - solution: Lista de índices de centros abiertos.
-    - cap_cost_array: Array de capacidades y costos fijos de los centros.
-    
-    Retorna:
-    - Capacidad total.
-    """
-    capacity = 0
-    for center in solution:
-        capacity += cap_cost_array[center, 0]
-    return capacity
+    Estado compacto de una solución para el ILS.
 
-def solution_fitness(solution: list, cap_cost_array) -> float:
-    """
-    Calcula el costo total de una solución, incluyendo costos fijos de apertura.
-    
-    Parámetros:
-    - solution: Lista de índices de centros abiertos.
-    - cap_cost_array: Array de capacidades y costos fijos de los centros.
-    
-    Retorna:
-    - Costo total.
+    Mantiene una máscara de centros abiertos, las listas de centros abiertos y
+    cerrados (con sus posiciones, para elegir y quitar en O(1)) y los totales de
+    capacidad y costo fijo. Cada movimiento se aplica en el lugar y se anota en
+    un registro, de modo que se puede deshacer sin copiar la solución.
+
+    Si se entrega un evaluador (evaluador.EvaluadorCFLP), cada movimiento también
+    actualiza la asignación de clientes y el fitness pasa a ser el costo total.
+    Con un caché (cache_evaluaciones.CacheEvaluaciones) se mantienen además el hash de
+    Zobrist y el bitset del conjunto abierto, y las evaluaciones desde cero se
+    reemplazan por la asignación guardada cuando el conjunto ya se evaluó.
     """
-    fitness = 0
-    
-    # Sumar costos fijos de apertura
-    for center in solution:
-        fitness += cap_cost_array[center, 1]
-    
-    return fitness
 
+    def __init__(self, cap_cost_array, evaluator=None, cache=None):
+        self.facilities = cap_cost_array.shape[0]
+        self._capacity = cap_cost_array[:, 0].tolist()
+        self._cost = cap_cost_array[:, 1].tolist()
+        self._mask = bytearray(self.facilities)
+        # Vista booleana de NumPy sobre la misma memoria que la máscara
+        self.mask = np.frombuffer(self._mask, dtype=bool)
+        self.open_list = []
+        self.closed_list = list(range(self.facilities))
+        self._pos = list(range(self.facilities))  # Posición de cada centro en su lista
+        self.capacity = 0.0
+        self.fixed_cost = 0.0
+        self._journal = []
+        self.evaluator = evaluator
+        self._replaying = False
+        self.cache = cache if evaluator is not None else None
+        self.key = 0  # Hash de Zobrist del conjunto abierto
+        self._bits = bytearray((self.facilities + 7) // 8)  # Bitset en el orden de np.packbits
 
-def fix_solution(solution: list, demand: float, max_facility: int, cap_cost_array) -> list:
-    """
-    Ajusta una solución para asegurar que la capacidad total cubra la demanda total,
-    añadiendo centros aleatorios si es necesario.
-    
-    Parámetros:
-    - solution: Lista de índices de centros abiertos.
-    - demand: Demanda total a cubrir.
-    - max_facility: Número total de centros disponibles.
-    - cap_cost_array: Array de capacidades y costos fijos de los centros.
-    
-    Retorna:
-    - Solución ajustada.
-    """
-    current_capacity = solution_capacity(solution, cap_cost_array)
+    @property
+    def fitness(self) -> float:
+        if self.evaluator is not None:
+            return self.evaluator.costo
+        return self.fixed_cost
+
+    def is_open(self, center: int) -> bool:
+        return self._mask[center] == 1
+
+    def _move(self, center, source, target):
+        # Quita el centro de source intercambiándolo con el último y lo agrega a target
+        pos = self._pos[center]
+        last = source[-1]
+        source[pos] = last
+        self._pos[last] = pos
+        source.pop()
+        self._pos[center] = len(target)
+        target.append(center)
+
+    def open(self, center: int):
+        """Abre un centro cerrado."""
+        self._mask[center] = 1
+        self._move(center, self.closed_list, self.open_list)
+        self.capacity += self._capacity[center]
+        self.fixed_cost += self._cost[center]
+        self._journal.append(center)
+        if self.cache is not None:
+            self._flip(center)
+        if self.evaluator is not None and not self._replaying:
+            self.evaluator.abrir(center)
+
+    def close(self, center: int):
+        """Cierra un centro abierto."""
+        self._mask[center] = 0
+        self._move(center, self.open_list, self.closed_list)
+        self.capacity -= self._capacity[center]
+        self.fixed_cost -= self._cost[center]
+        self._journal.append(~center)
+        if self.cache is not None:
+            self._flip(center)
+        if self.evaluator is not None and not self._replaying:
+            self.evaluator.cerrar(center)
+
+    def _flip(self, center):
+        self.key ^= self.cache.zobrist[center]
+        self._bits[center >> 3] ^= 0x80 >> (center & 7)
 
-    # si se cumple la demanda
-    if current_capacity >= demand:
-        return solution
-    # se añaden centros aleatorios
-    while current_capacity < demand:
-        new_center = random.randint(0, max_facility - 1)
+    def cache_key(self):
+        """Retorna la clave (hash, bitset) del conjunto abierto actual en el caché."""
+        return self.key, bytes(self._bits)
 
-        if new_center not in solution:
-            solution.append(new_center)
-            current_capacity += cap_cost_array[new_center, 0]
+    def swap_key(self, old_center: int, new_center: int):
+        """Retorna la clave en el caché del conjunto que resultaría de swap(old_center, new_center)."""
+        z = self.cache.zobrist
+        bits = bytearray(self._bits)
+        bits[old_center >> 3] ^= 0x80 >> (old_center & 7)
+        bits[new_center >> 3] ^= 0x80 >> (new_center & 7)
+        return self.key ^ z[old_center] ^ z[new_center], bytes(bits)
 
-    return solution
+    def _evaluate(self):
+        # Evaluación desde cero del conjunto abierto, o restauración desde el caché
+        if self.cache is None:
+            self.evaluator.evaluar(self.mask)
+            return
+        key, bits = self.cache_key()
+        if not self.cache.restaurar(key, bits, self.evaluator, self.mask):
+            self.evaluator.evaluar(self.mask)
+            self.cache.guardar(key, bits, self.evaluator, instantanea=True)
 
-def iterated_local_search(cap_cost_array, facilities, demand_total, global_iterations=5, time_intervals=None):
+    def swap(self, old_center: int, new_center: int):
+        """Cierra old_center y abre new_center."""
+        self.close(old_center)
+        self.open(new_center)
+
+    def random_open(self, rng) -> int:
+        return self.open_list[rng.randrange(len(self.open_list))]
+
+    def random_closed(self, rng) -> int:
+        return self.closed_list[rng.randrange(len(self.closed_list))]
+
+    def checkpoint(self):
+        """Retorna una marca del registro para poder deshacer hasta ese punto."""
+        evaluator_mark = self.evaluator.checkpoint() if self.evaluator is not None else None
+        return len(self._journal), evaluator_mark
+
+    def rollback(self, mark):
+        """Deshace, en orden inverso, los movimientos posteriores a la marca."""
+        length, evaluator_mark = mark
+        journal = self._journal
+        # El evaluador restaura su propia asignación; aquí solo se revierte la máscara
+        self._replaying = True
+        while len(journal) > length:
+            center = journal.pop()
+            if center >= 0:
+                self.close(center)
+            else:
+                self.open(~center)
+            journal.pop()
+        self._replaying = False
+        if evaluator_mark is not None:
+            self.evaluator.rollback(evaluator_mark)
+
+    def commit(self):
+        """Acepta los movimientos registrados y vacía el registro."""
+        self._journal.clear()
+        if self.evaluator is not None:
+            self.evaluator.commit()
+
+    def reset(self):
+        """Cierra todos los centros."""
+        self._replaying = True
+        while self.open_list:
+            self.close(self.open_list[-1])
+        self._replaying = False
+        self.capacity = 0.0
+        self.fixed_cost = 0.0
+        self.commit()
+
+    def feasible(self, demand_total: float) -> bool:
+        """La capacidad cubre la demanda y, con evaluador, todos los clientes quedan asignados."""
+        if self.capacity < demand_total:
+            return False
+        return self.evaluator is None or self._replaying or self.evaluator.factible
+
+    def fill_random(self, demand_total: float, rng):
+        """Abre centros cerrados al azar hasta que la solución sea factible."""
+        while not self.feasible(demand_total) and self.closed_list:
+            self.open(self.random_closed(rng))
+
+    def load(self, centers, demand_total: float, rng):
+        """
+        Reemplaza la solución por los centros dados (lista de índices o máscara booleana),
+        completándola al azar si no es factible.
+        """
+        centers = np.asarray(centers)
+        if centers.dtype == bool:
+            centers = np.flatnonzero(centers)
+        self.reset()
+        self._replaying = True
+        for center in centers.tolist():
+            self.open(center)
+        self._replaying = False
+        if self.evaluator is not None:
+            self._evaluate()
+        self.fill_random(demand_total, rng)
+        self.commit()
+
+    def randomize(self, demand_total: float, rng):
+        """
+        Reemplaza la solución por una aleatoria que cubra la demanda. Con evaluador,
+        la asignación se calcula una sola vez al final, desde cero.
+        """
+        self.reset()
+        self._replaying = True
+        self.fill_random(demand_total, rng)
+        self._replaying = False
+        if self.evaluator is not None:
+            self._evaluate()
+            self.fill_random(demand_total, rng)
+        self.commit()
+
+    def resync(self):
+        """Recalcula los totales desde cero para eliminar errores de redondeo acumulados."""
+        self.capacity = float(sum(self._capacity[j] for j in self.open_list))
+        self.fixed_cost = float(sum(self._cost[j] for j in self.open_list))
+        if self.evaluator is not None:
+            # La asignación incremental depende del camino: nos quedamos con la mejor
+            # entre ella y la asignación calculada desde cero
+            self.evaluator.recalcular()
+            current = self.evaluator.costo
+            if self.cache is not None:
+                key, bits = self.cache_key()
+                cached = self.cache.buscar(key, bits)
+                if cached is not None and cached[4] is not None:
+                    # La asignación desde cero (o una mejor) ya está en el caché
+                    if cached[0] < current:
+                        self.cache.restaurar(key, bits, self.evaluator, self.mask)
+                    self.cache.guardar(key, bits, self.evaluator, instantanea=True)
+                    return
+            snapshot = self.evaluator.instantanea()
+            if self.evaluator.evaluar(self.mask) > current:
+                self.evaluator.restaurar(snapshot)
+            if self.cache is not None:
+                self.cache.guardar(key, bits, self.evaluator, instantanea=True)
+
+    def adopt(self):
+        """
+        Sincroniza la máscara con los centros abiertos del evaluador sin reevaluar la
+        asignación (después de moverlo directamente, por ejemplo con vecindario.Vecindario).
+        """
+        target = self.evaluator.abiertos
+        self._replaying = True
+        for center in np.flatnonzero(target & ~self.mask).tolist():
+            self.open(center)
+        for center in np.flatnonzero(self.mask & ~target).tolist():
+            self.close(center)
+        self._replaying = False
+        self.commit()
+
+    def solution(self) -> list:
+        """Retorna la lista ordenada de índices de centros abiertos."""
+        return sorted(self.open_list)
+
+
+def iterated_local_search(cap_cost_array, facilities, demand_total, global_iterations=5, time_intervals=None, seed=None,
+                          evaluator=None, initial_solution=None, verbose=True, instrumentation=None, cache=None,
+                          neighborhood=None):
     """
     Implementación de la heurística Iterated Local Search (ILS) para CFLP.
     
@@ -78,6 +252,24 @@ def iterated_local_search(cap_cost_array, facilities, demand_total, global_itera
     - demand_total: Demanda total a cubrir.
     - global_iterations: Número de iteraciones globales.
     - time_intervals: Lista de intervalos de tiempo para iteraciones locales.
+    - seed: Semilla del generador aleatorio, para ejecuciones reproducibles (opcional).
+    - evaluator: Evaluador del costo total (evaluador.EvaluadorCFLP). Si se entrega, el ILS
+      optimiza apertura + asignación en vez de solo el costo de apertura, y al terminar
+      el evaluador queda cargado con la mejor solución (opcional).
+    - initial_solution: Centros abiertos de la solución inicial (lista de índices o máscara
+      booleana). Si no se entrega, la solución inicial es aleatoria (opcional).
+    - verbose: Si es False no se imprime el progreso.
+    - instrumentation: Objeto instrumentacion.Instrumentacion que recibe los incumbentes y
+      los contadores de movimientos (opcional). Sin él, el ciclo solo suma contadores
+      enteros locales.
+    - cache: Objeto cache_evaluaciones.CacheEvaluaciones (opcional, solo con evaluator).
+      Un swap hacia un conjunto ya evaluado, factible y más caro que la solución actual
+      se descarta sin evaluarlo, y los reinicios reutilizan las asignaciones guardadas.
+      Se puede compartir entre llamadas para aprovechar lo evaluado en ellas.
+    - neighborhood: Objeto vecindario.Vecindario (opcional, solo con evaluator). Si se
+      entrega, la fase local de cada iteración global es una búsqueda sobre el vecindario
+      completo de abrir, cerrar e intercambiar (evaluado en bloque), con tantas
+      iteraciones como el intervalo elegido, en vez de los cambios aleatorios de ±3.
     
     Retorna:
     - best_solution: Lista de índices de centros abiertos de la mejor solución encontrada.
@@ -86,78 +278,127 @@ def iterated_local_search(cap_cost_array, facilities, demand_total, global_itera
     if time_intervals is None:
         time_intervals = [10, 20, 30, 40, 50, 60, 80, 90, 100, 110, 120, 130, 140, 150, 160, 170, 180, 190, 200]
     
-    # Solución inicial aleatoria
-    initial_solution = []
+    rng = random.Random(seed)
+    
+    label = "total" if evaluator is not None else "de apertura"
     
-    # Llenamos la lista con centros aleatorios hasta que la capacidad >= demanda
-    while solution_capacity(initial_solution, cap_cost_array) < demand_total:
-        center = random.randint(0, facilities - 1)
-        if center not in initial_solution:
-            initial_solution.append(center)
+    # Solución inicial: la entregada o una aleatoria, llenando con centros aleatorios hasta que la capacidad >= demanda
+    if evaluator is None:
+        cache = None
+    solution = SolutionState(cap_cost_array[:facilities], evaluator, cache)
+    if initial_solution is not None:
+        solution.load(initial_solution, demand_total, rng)
+    else:
+        solution.randomize(demand_total, rng)
     
-    print("--- ILS")
-    print("La solución inicial:", initial_solution)
-    print("El costo de apertura inicial:", solution_fitness(initial_solution, cap_cost_array))
+    if verbose:
+        print("--- ILS")
+        print("La solución inicial:", solution.solution())
+        print(f"El costo {label} inicial:", solution.fitness)
     
     # La solución inicial es la mejor solución
-    best_solution = copy.deepcopy(initial_solution)
-    solution = copy.deepcopy(initial_solution)
+    best_mask = solution.mask.copy()
+    best_fitness = solution.fitness
+    best_assignment = evaluator.instantanea() if evaluator is not None else None
+    
+    # Estado auxiliar reutilizado para el random restart
+    new_base = SolutionState(cap_cost_array[:facilities], evaluator.copia() if evaluator is not None else None, cache)
+    
+    # Contadores de movimientos (propuestos, aceptados, omitidos por centro repetido,
+    # reparaciones de factibilidad y reinicios aceptados)
+    proposed = accepted = skipped = repairs = restarts = 0
+    if instrumentation is not None:
+        instrumentation.incumbente(best_fitness, 'ils', iteracion=0)
     
     # Corremos el algoritmo la cantidad de global_iterations
     for i in range(global_iterations):
         # Seleccionamos un intervalo de tiempo aleatorio
-        time = random.choice(time_intervals)
+        time = rng.choice(time_intervals)
         
-        # Realizamos cambios locales en la solución
-        for j in range(time):
-            tweaked_solution = copy.deepcopy(solution)
+        # Con vecindario, la fase local explora en cada paso todos los movimientos
+        if neighborhood is not None and evaluator is not None:
+            verificados, aplicados = neighborhood.verificados, neighborhood.aplicados
+            neighborhood.buscar(solution.evaluator, max_iteraciones=time)
+            solution.adopt()
+            proposed += neighborhood.verificados - verificados
+            accepted += neighborhood.aplicados - aplicados
+        else:
+            # Realizamos cambios locales en la solución
+            for j in range(time):
+                if not solution.open_list:
+                    continue
+                proposed += 1
             
-            # Realizamos una perturbación: cambiamos un centro aleatorio
-            if len(tweaked_solution) == 0:
-                continue
-            tweaked_index = random.randint(0, len(tweaked_solution) - 1)
-            old_center = tweaked_solution[tweaked_index]
-            delta = random.randint(-3, 3)
-            new_center = max(0, min(facilities - 1, old_center + delta))
+                # Realizamos una perturbación: cambiamos un centro aleatorio
+                old_center = solution.random_open(rng)
+                delta = rng.randint(-3, 3)
+                new_center = max(0, min(facilities - 1, old_center + delta))
             
-            # Si el nuevo centro ya está en la solución, saltamos
-            if new_center in tweaked_solution:
-                continue
-            else:
-                tweaked_solution[tweaked_index] = new_center
+                # Si el nuevo centro ya está en la solución, saltamos
+                if solution.is_open(new_center):
+                    skipped += 1
+                    continue
             
-            # Arreglamos la solución si es necesario
-            if solution_capacity(tweaked_solution, cap_cost_array) < demand_total:
-                tweaked_solution = fix_solution(tweaked_solution, demand_total, facilities, cap_cost_array)
+                current_fitness = solution.fitness
             
-            # Comparamos la solución tweaked con la actual
-            tweaked_fitness = solution_fitness(tweaked_solution, cap_cost_array)
-            current_fitness = solution_fitness(solution, cap_cost_array)
+                # Si el vecino ya se evaluó y es peor, lo descartamos sin evaluarlo
+                if cache is not None:
+                    cached = cache.buscar(*solution.swap_key(old_center, new_center))
+                    if cached is not None and cached[3] and cached[0] > current_fitness:
+                        cache.rechazos += 1
+                        continue
             
-            if tweaked_fitness <= current_fitness:
-                solution = copy.deepcopy(tweaked_solution)
+                mark = solution.checkpoint()
+                solution.swap(old_center, new_center)
+            
+                # Arreglamos la solución si es necesario
+                if not solution.feasible(demand_total):
+                    solution.fill_random(demand_total, rng)
+                    repairs += 1
+            
+                if cache is not None:
+                    cache.guardar(*solution.cache_key(), solution.evaluator)
+            
+                # Comparamos la solución tweaked con la actual
+                if solution.fitness <= current_fitness:
+                    solution.commit()
+                    accepted += 1
+                else:
+                    solution.rollback(mark)
         
         # Comparar y actualizar la mejor solución
-        current_fitness = solution_fitness(solution, cap_cost_array)
-        best_fitness = solution_fitness(best_solution, cap_cost_array)
-        
-        if current_fitness < best_fitness:
-            best_solution = copy.deepcopy(solution)
+        solution.resync()
+        if solution.fitness < best_fitness:
+            best_mask[:] = solution.mask
+            best_fitness = solution.fitness
+            if evaluator is not None:
+                best_assignment = solution.evaluator.instantanea()
+            if instrumentation is not None:
+                instrumentation.incumbente(best_fitness, 'ils', iteracion=i + 1)
         
         # Parte de random restart: crear una nueva solución
-        new_base = []
-        while solution_capacity(new_base, cap_cost_array) < demand_total:
-            center = random.randint(0, facilities - 1)
-            if center not in new_base:
-                new_base.append(center)
+        new_base.randomize(demand_total, rng)
         
         # Probabilidad de aceptar la nueva solución
-        if solution_fitness(new_base, cap_cost_array) < solution_fitness(solution, cap_cost_array):
-            solution = copy.deepcopy(new_base)
-        elif random.random() < 0.15:
-            solution = copy.deepcopy(new_base)
+        if new_base.fitness < solution.fitness or rng.random() < 0.15:
+            solution, new_base = new_base, solution
+            restarts += 1
+    
+    best_solution = np.flatnonzero(best_mask).tolist()
+    if evaluator is not None:
+        evaluator.restaurar(best_assignment)
+    
+    if instrumentation is not None:
+        instrumentation.sumar('ils', movimientos_propuestos=proposed, movimientos_aceptados=accepted,
+                              movimientos_omitidos=skipped, reparaciones=repairs, reinicios_aceptados=restarts)
+        if cache is not None:
+            instrumentation.evento('cache', **cache.estadisticas())
     
-    print("La solución final es:", best_solution)
-    print("El costo de apertura final es:", solution_fitness(best_solution, cap_cost_array))
+    if verbose:
+        print("La solución final es:", best_solution)
+        print(f"El costo {label} final es:", best_fitness)
+        if cache is not None:
+            print(f"Caché de evaluaciones: {cache.aciertos} aciertos, {cache.fallos} fallos "
+                  f"({cache.tasa_aciertos:.1%}), {cache.rechazos} movimientos descartados, {len(cache)} entradas")
     
-    return best_solution, solution_fitness(best_solution, cap_cost_array)
\ No newline at end of file
+    return best_solution, best_fitness
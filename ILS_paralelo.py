@@ -0,0 +1,180 @@
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from ILS import iterated_local_search
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import CACHE_DIR, cargar_instancia, cap_cost_array
+from evaluador import EvaluadorCFLP
+
+# Estado de cada proceso trabajador (se inicializa una vez por proceso)
+_trabajador = {}
+
+
+def _inicializar_trabajador(ruta, cache_dir, single_source, evaluar_asignacion, cache_mb, mejor_costo, mejor_mascara,
+                            candado):
+    """
+    Prepara un proceso trabajador. Los arrays de la instancia se abren desde el caché
+    como memoria mapeada, de modo que todos los procesos comparten las mismas páginas
+    en vez de recibir una copia serializada. Cada proceso tiene su propio caché de
+    evaluaciones, que se reutiliza en todas sus épocas.
+    """
+    instancia = cargar_instancia(ruta, cache_dir)
+    _trabajador['cap_cost_array'] = cap_cost_array(instancia)
+    _trabajador['demand_total'] = float(np.asarray(instancia.demand).sum())
+    _trabajador['evaluador'] = EvaluadorCFLP(instancia, single_source) if evaluar_asignacion else None
+    _trabajador['cache'] = (CacheEvaluaciones(instancia.s.shape[0], max_bytes=cache_mb * 2**20)
+                            if evaluar_asignacion and cache_mb > 0 else None)
+    _trabajador['mejor_costo'] = mejor_costo
+    _trabajador['mejor_mascara'] = mejor_mascara
+    _trabajador['candado'] = candado
+
+
+def _publicar(mascara, costo):
+    # Publica la solución si mejora el incumbente global; retorna True si lo reemplazó
+    mejor_costo = _trabajador['mejor_costo']
+    with _trabajador['candado']:
+        if costo < mejor_costo.value:
+            mejor_costo.value = costo
+            _trabajador['mejor_mascara'][:] = mascara.astype(np.int8).tolist()
+            return True
+    return False
+
+
+def _leer_incumbente():
+    with _trabajador['candado']:
+        return _trabajador['mejor_costo'].value, np.array(_trabajador['mejor_mascara'][:], dtype=bool)
+
+
+def _trayectoria(argumentos):
+    """
+    Ejecuta una trayectoria ILS independiente dividida en épocas. Al final de cada
+    época se publica el mejor local y, si el incumbente global es mejor, se adopta
+    como punto de partida de la época siguiente.
+    """
+    trabajador_id, semilla, epocas, iteraciones_por_epoca = argumentos
+    rng = random.Random(semilla)
+    cap_cost = _trabajador['cap_cost_array']
+    facilities = cap_cost.shape[0]
+    inicio = time.perf_counter()
+
+    actual = None
+    mejor_costo = float('inf')
+    mejor_mascara = None
+    publicadas = adoptadas = 0
+    for _ in range(epocas):
+        solucion, costo = iterated_local_search(
+            cap_cost, facilities, _trabajador['demand_total'], global_iterations=iteraciones_por_epoca,
+            seed=rng.getrandbits(32), evaluator=_trabajador['evaluador'], initial_solution=actual, verbose=False,
+            cache=_trabajador['cache']
+        )
+        mascara = np.zeros(facilities, dtype=bool)
+        mascara[solucion] = True
+        if costo < mejor_costo:
+            mejor_costo, mejor_mascara = costo, mascara
+        publicadas += _publicar(mascara, costo)
+
+        # Intercambio de incumbentes: adoptamos el global si es mejor que el nuestro
+        costo_global, mascara_global = _leer_incumbente()
+        if costo_global < costo:
+            actual = mascara_global
+            adoptadas += 1
+        else:
+            actual = mascara
+
+    return {
+        'trabajador': trabajador_id,
+        'semilla': semilla,
+        'mejor_costo': mejor_costo,
+        'mejor_solucion': np.flatnonzero(mejor_mascara).tolist(),
+        'iteraciones_globales': epocas * iteraciones_por_epoca,
+        'publicadas': publicadas,
+        'adoptadas': adoptadas,
+        'tiempo': time.perf_counter() - inicio,
+        'tasa_aciertos': _trabajador['cache'].tasa_aciertos if _trabajador['cache'] is not None else None,
+    }
+
+
+def ils_paralelo(ruta, trabajadores=None, trayectorias=None, epocas=10, iteraciones_por_epoca=5, semilla=0,
+                 single_source=False, evaluar_asignacion=True, cache_dir=CACHE_DIR, cache_mb=64):
+    """
+    Ejecuta varias trayectorias ILS independientes en un pool de procesos.
+
+    Parámetros:
+    - ruta: Ruta al archivo .txt o .dat de la instancia.
+    - trabajadores: Número de procesos (por defecto, el número de núcleos).
+    - trayectorias: Número de trayectorias ILS (por defecto, una por proceso).
+    - epocas: Número de épocas por trayectoria; entre épocas se intercambia el incumbente.
+    - iteraciones_por_epoca: Iteraciones globales del ILS en cada época.
+    - semilla: Semilla base; la trayectoria k usa semilla + k.
+    - single_source: Si es True se evalúa con el costo de CFLPsingle.mod.
+    - evaluar_asignacion: Si es False, el ILS optimiza solo el costo de apertura.
+    - cache_dir: Directorio del caché de instancias.
+    - cache_mb: Memoria máxima en MB del caché de evaluaciones de cada proceso (0 lo desactiva).
+
+    Retorna:
+    - best_solution: Lista de índices de centros abiertos de la mejor solución global.
+    - best_fitness: Costo de la mejor solución global.
+    - estadisticas: Lista con las estadísticas de cada trayectoria.
+    """
+    trabajadores = trabajadores or os.cpu_count() or 1
+    trayectorias = trayectorias or trabajadores
+
+    # Generamos el caché antes de crear los procesos para que todos lo reutilicen
+    instancia = cargar_instancia(ruta, cache_dir)
+    facilities = instancia.s.shape[0]
+
+    mejor_costo = mp.Value('d', float('inf'), lock=False)
+    mejor_mascara = mp.Array('b', facilities, lock=False)
+    candado = mp.Lock()
+
+    tareas = [(k, semilla + k, epocas, iteraciones_por_epoca) for k in range(trayectorias)]
+    with mp.Pool(trabajadores, initializer=_inicializar_trabajador,
+                 initargs=(ruta, cache_dir, single_source, evaluar_asignacion, cache_mb, mejor_costo, mejor_mascara,
+                           candado)) as pool:
+        estadisticas = pool.map(_trayectoria, tareas, chunksize=1)
+
+    mejor = min(estadisticas, key=lambda e: e['mejor_costo'])
+    return mejor['mejor_solucion'], mejor['mejor_costo'], estadisticas
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ILS multi-arranque en paralelo con intercambio de incumbentes.")
+    parser.add_argument('-d', '--data', type=str, required=True, help="Ruta al archivo .txt o .dat de la instancia.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Número de procesos (por defecto, núcleos disponibles).")
+    parser.add_argument('-r', '--runs', type=int, default=None, help="Número de trayectorias (por defecto, una por proceso).")
+    parser.add_argument('-e', '--epochs', type=int, default=10, help="Épocas por trayectoria.")
+    parser.add_argument('-i', '--iterations', type=int, default=5, help="Iteraciones globales del ILS por época.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla base.")
+    parser.add_argument('--single', action='store_true', help="Evaluar con el costo de CFLPsingle.mod.")
+    parser.add_argument('--apertura', action='store_true', help="Optimizar solo el costo de apertura.")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="Memoria máxima en MB del caché de evaluaciones de cada proceso (0 lo desactiva).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        print(f"Error: El archivo de datos '{args.data}' no existe.")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    best_solution, best_fitness, estadisticas = ils_paralelo(
+        args.data, args.workers, args.runs, args.epochs, args.iterations, args.seed,
+        single_source=args.single, evaluar_asignacion=not args.apertura, cache_mb=args.cache_mb
+    )
+    total = time.perf_counter() - inicio
+
+    print("--- ILS PARALELO")
+    for e in estadisticas:
+        print(f"Trayectoria {e['trabajador']:>3} (semilla {e['semilla']}): costo {e['mejor_costo']:.2f}, "
+              f"publicadas {e['publicadas']}, adoptadas {e['adoptadas']}, tiempo {e['tiempo']:.2f} s"
+              + (f", aciertos del caché {e['tasa_aciertos']:.1%}" if e['tasa_aciertos'] is not None else ""))
+    iteraciones = sum(e['iteraciones_globales'] for e in estadisticas)
+    print(f"\nMejor solución global: {best_solution}")
+    print(f"Mejor costo global: {best_fitness}")
+    print(f"Tiempo total: {total:.2f} s ({iteraciones / total:.1f} iteraciones globales por segundo)")
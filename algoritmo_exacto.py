@@ -1,129 +1,10 @@
-from amplpy import AMPL, Environment
 import os
 import sys
-from ILS import iterated_local_search
-import numpy as np
-import pandas as pd
+from almacen_resultados import AlmacenResultados
+from instrumentacion import Instrumentacion
+from resolutores import MODOS_ARRANQUE, RESOLUTORES, ejecutar_resolucion
 
 
-def ejecutar_modelo_ampl(mod_path, dat_path, solver='gurobi', max_nodes=None, time_limit=None):
-    """
-    Ejecutamos un modelo AMPL con los archivos .mod y .dat proporcionados,
-    utilizando una heurística Iterated Local Search (ILS) para la solución inicial.
-
-    Parámetros:
-    - mod_path: Ruta al archivo .mod.
-    - dat_path: Ruta al archivo .dat.
-    - solver: Nombre del solver a utilizar (por defecto, 'gurobi').
-    - max_nodes: Número máximo de nodos para el solver (opcional).
-    - time_limit: Límite de tiempo para el solver (en segundos().
-    """
-    try:
-        # Inicializamos AMPL
-        ampl = AMPL(Environment())
-        
-        # Cargamos el modelo y los datos
-        ampl.read(mod_path)
-        ampl.readData(dat_path)
-        
-        # Extraemos parámetros y conjuntos para la heurística
-        C = [j for j in ampl.getSet('C')]  # Conjunto de almacenes
-        D = [i for i in ampl.getSet('D')]  # Conjunto de clientes
-        
-        # Extraemos parámetros asegurando que coincidan con las definiciones en AMPL
-        s = {j: ampl.getParameter('s')[j] for j in C}  # Capacidades
-        f = {j: ampl.getParameter('f')[j] for j in C}  # Costos fijos
-        c = {i: {j: ampl.getParameter('c')[i, j] for j in C} for i in D}  # Costos de asignación
-        demand_array = [ampl.getParameter('demand')[i] for i in D]  # Demandas
-        
-        # Convertimos parámetros a arrays para la heurística
-        facilities = len(C)
-        demand_total = sum(demand_array)
-        
-        # Creamos el array de capacidades y costos fijos
-        cap_cost_array = np.zeros((facilities, 2))
-        for idx, j in enumerate(C):
-            cap_cost_array[idx, 0] = s[j]
-            cap_cost_array[idx, 1] = f[j]
-        
-        # Aplicamos la heurística ILS
-        best_solution, best_fitness = iterated_local_search(
-            cap_cost_array, facilities, demand_total
-        )
-        
-        print("\n---EXACTO")
-        print(f"Centros abiertos (como indices): {best_solution}")
-        print(f"Centros abiertos (como nombres): {[f"j{i+1}" for i in best_solution]}")
-        print(f"Costo: {best_fitness}")
-        
-        # Configuramos los centros abiertos en AMPL basados en la solución de ILS
-        y = ampl.getVariable('y')
-        for idx, j in enumerate(C):
-            if idx in best_solution:
-                y[j].fix(1)  # Fijar el valor de y[j] a 1 si el centro está abierto
-            else:
-                y[j].fix(0)  # Fijar el valor de y[j] a 0 si el centro está cerrado
-        
-        # Configuramos las asignaciones iniciales en AMPL
-        x = ampl.getVariable('x')
-        for i_idx, i in enumerate(D):
-            for j_idx, j in enumerate(C):
-                if j_idx in best_solution:
-                    # Asignamos proporcionalmente la demanda
-                    x[i, j].setValue(demand_array[i_idx] / len(best_solution))
-                else:
-                    x[i, j].setValue(0)
-
-        # Configuramos el solver
-        ampl.setOption('solver', solver)
-
-        # Establecemos un criterio de término basado en nodos máximos o tiempo límite
-        gurobi_options = 'MIPGap=1e-4'
-
-        if time_limit is not None:
-            gurobi_options += f' TimeLimit={time_limit}'
-
-        if max_nodes is not None:
-            gurobi_options += f' NodeLimit={max_nodes}'
-
-        ampl.setOption('gurobi_options', gurobi_options)
-        
-        print("\nResolviendo con AMPL...")
-        
-        # Resolvemos el modelo
-        ampl.solve()
-        
-        # Obtenemos valores de las variables
-        y_values = ampl.getVariable("y").getValues().to_pandas()
-        x_values = ampl.getVariable("x").getValues().to_pandas()
-
-        # Mostramos los centros abiertos
-        centros_abiertos_ampl = []
-        for j in C:
-            index = j  # Aquí, j debe coincidir con los índices como 'j1', 'j2', etc.
-            valor = y_values.loc[index, 'y.val']  # Accedemos al valor correcto
-            if valor > 0.5:
-                centros_abiertos_ampl.append(j)  # Agregar el centro abierto a la lista
-        print("\nCentros abiertos AMPL: " + ", ".join(centros_abiertos_ampl))
-
-        # Mostramos las asignaciones de clientes
-        print("\nAsignaciones de clientes:")
-        for i in D:
-            for j in C:
-                index = (i, j)  # Índices como ('i1', 'j1')
-                asignacion = x_values.loc[index, 'x.val']  # Accedemos al valor correcto
-                if asignacion > 0:
-                    print(f"Cliente {i} asignado a Centro {j}, con un costo de asignación: {asignacion}")
-        
-        # Obtenemos el valor de la función objetivo "TotalCost"
-        total_cost_final = ampl.getObjective("TotalCost").value()
-        print("\n--- COMPARACIÓN DE COSTOS ---")
-        print(f"Costo inicial (de apertura) generado por ILS: {best_fitness}")
-        print(f"Costo final (de apertura + de asignación) optimizado por AMPL: {total_cost_final}")
-
-    except Exception as e:
-        print(f"Error al ejecutar el modelo AMPL: {e}")
-
 if __name__ == "__main__":
     import argparse
     
@@ -132,18 +13,42 @@ if __name__ == "__main__":
     parser.add_argument('-m', '--model', type=str, default='CFLP.mod',
                         help="Ruta al archivo .mod (por defecto: 'CFLP.mod').")
     parser.add_argument('-d', '--data', type=str, required=True, default=None,
-                        help="Ruta al archivo .dat")
+                        help="Ruta al archivo .dat (o .txt) de la instancia")
     parser.add_argument('-s', '--solver', type=str, default='gurobi',
                         help="Nombre del solver a utilizar (por defecto, 'gurobi').")
     parser.add_argument('-n', '--nodes', type=int, default=None,
                         help="Número máximo de nodos para el solver (opcional).")
     parser.add_argument('-t', '--time', type=int, default=None,
                         help="Límite de tiempo para el solver")
+    parser.add_argument('-l', '--lagrangiano', action='store_true',
+                        help="Calcular una cota inferior lagrangiana y pasarla al solver.")
+    parser.add_argument('-b', '--backend', type=str, choices=sorted(RESOLUTORES), default='ampl',
+                        help="Backend de resolución: 'ampl' (AMPL + solver) o 'highs' (matrices dispersas + HiGHS).")
+    parser.add_argument('-k', '--k-cercanos', type=int, default=None,
+                        help="Modelo reducido a los K almacenes más baratos por cliente, con pricing (solo highs).")
+    parser.add_argument('-a', '--arranque', type=str, choices=MODOS_ARRANQUE, default='arranque',
+                        help="Uso de la solución heurística: 'fijar' (y fijas), 'arranque' (MIP start, por defecto) "
+                             "o 'concurrente' (ILS en paralelo inyectando incumbentes, solo highs).")
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help="Archivo .npz donde guardar la solución (asignaciones no nulas, objetivo, cota y tiempos).")
+    parser.add_argument('--traza', type=str, default=None,
+                        help="Archivo .jsonl donde registrar fases, contadores e incumbentes (opcional).")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="Memoria máxima en MB del caché de evaluaciones del ILS (0 lo desactiva).")
+    parser.add_argument('-p', '--preproceso', action='store_true',
+                        help="Fijar almacenes y eliminar pares x por costo reducido antes del solver.")
+    parser.add_argument('--dominancia', action='store_true',
+                        help="Con --preproceso, aplicar también las reglas de dominancia entre almacenes.")
+    parser.add_argument('--almacen', type=str, default=None,
+                        help="Directorio del almacén de resultados donde buscar y guardar la resolución "
+                             "(opcional; sin él se resuelve siempre desde cero).")
+    parser.add_argument('--almacen-mb', type=float, default=256,
+                        help="Tamaño máximo en MB del almacén de resultados.")
     
     args = parser.parse_args()
     
     # Verificamos que los archivos existan
-    if not os.path.exists(args.model):
+    if args.backend == 'ampl' and not os.path.exists(args.model):
         print(f"Error: El archivo de modelo '{args.model}' no existe.")
         sys.exit(1)
     if not os.path.exists(args.data):
@@ -151,5 +56,14 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Ejecutamos el modelo
-    ejecutar_modelo_ampl(args.model, args.data, args.solver, args.nodes, args.time)
+    try:
+        ejecutar_resolucion(args.model, args.data, False, solver=args.solver, max_nodes=args.nodes,
+                            time_limit=args.time, lagrangiano=args.lagrangiano, backend=args.backend,
+                            k_cercanos=args.k_cercanos,
+                            instrumentacion=Instrumentacion(args.traza) if args.traza else None,
+                            modo=args.arranque, salida=args.output, cache_mb=args.cache_mb,
+                            preproceso=args.preproceso, dominancia=args.dominancia,
+                            almacen=AlmacenResultados(args.almacen, args.almacen_mb * 2**20) if args.almacen else None)
+    except Exception as e:
+        print(f"Error al ejecutar el modelo: {e}")
 
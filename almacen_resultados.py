@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo, el índice igual se relee justo antes de escribirlo
+    fcntl = None
+
+from cache_instancias import hash_archivo
+from solucion import cargar_solucion, guardar_solucion
+
+# Directorio por defecto del almacén (junto a los scripts del proyecto)
+ALMACEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_resultados")
+
+# Opciones que solo limitan cuánto se busca: no cambian el problema, así que un
+# resultado guardado con otros valores sirve como arranque
+LIMITES = ('time_limit', 'max_nodes')
+
+# Gap relativo con el que un resultado se considera resuelto (el de término del solver)
+GAP_CERRADO = 1e-4
+
+
+def _hash_json(datos):
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def claves_resultado(mod_path, instancia, opciones):
+    """
+    Calcula las claves de un resultado a partir del modelo, la instancia y las opciones.
+
+    Parámetros:
+    - mod_path: Ruta al archivo .mod, o None si el backend no lo usa (highs).
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia (se usa su
+      clave, el hash del archivo de origen).
+    - opciones: Diccionario serializable en JSON con las opciones del solver. Las de
+      LIMITES entran solo en la clave completa.
+
+    Retorna:
+    - clave: Hash del modelo, la instancia y todas las opciones.
+    - clave_base: Hash del modelo, la instancia y las opciones sin los límites.
+    """
+    modelo = hash_archivo(mod_path) if mod_path is not None else None
+    base = {nombre: valor for nombre, valor in opciones.items() if nombre not in LIMITES}
+    clave_base = _hash_json({'modelo': modelo, 'instancia': instancia.clave, 'opciones': base})
+    limites = {nombre: opciones.get(nombre) for nombre in LIMITES}
+    return _hash_json({'base': clave_base, 'limites': limites}), clave_base
+
+
+def claves_resolucion(instancia, mod_path, single_source, backend, solver=None, **opciones):
+    """
+    Claves de una resolución de algoritmo_exacto.py o algoritmo_exacto_single.py.
+    El .mod y el solver solo cuentan con el backend ampl; highs construye la
+    formulación desde single_source.
+
+    Retorna:
+    - Tupla (clave, clave_base) de claves_resultado.
+    """
+    opciones = dict(opciones, single_source=single_source, backend=backend)
+    if backend == 'ampl':
+        opciones['solver'] = solver
+    return claves_resultado(mod_path if backend == 'ampl' else None, instancia, opciones)
+
+
+class AlmacenResultados:
+    """
+    Almacén en disco de resultados de resolución, direccionado por contenido.
+
+    Cada resultado (almacenes abiertos, asignaciones no nulas, objetivo, cota y
+    tiempos, en el formato de solucion.py) se guarda bajo el hash del .mod, de los
+    datos de la instancia y de las opciones del solver (ver claves_resultado), así
+    que repetir una resolución idéntica entrega el resultado sin construir el modelo.
+    Si solo cambiaron los límites de tiempo o de nodos, el mejor resultado con las
+    mismas opciones base se puede usar como arranque; si ese resultado ya cerró el
+    gap, se entrega directamente.
+
+    Un índice JSON guarda el tamaño y el último uso de cada entrada; al superar
+    max_bytes se desalojan las usadas hace más tiempo. Cada actualización del índice
+    lo relee y lo reescribe con un archivo de bloqueo tomado, así que varios procesos
+    pueden compartir el almacén.
+    """
+
+    def __init__(self, directorio=ALMACEN_DIR, max_bytes=256 * 2**20):
+        """
+        Parámetros:
+        - directorio: Directorio del almacén (por defecto, .cache_resultados).
+        - max_bytes: Tamaño máximo en disco de las entradas.
+        """
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.arranques = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    # --- Índice ---
+
+    def _ruta_indice(self):
+        return os.path.join(self.directorio, 'indice.json')
+
+    def _leer_indice(self):
+        try:
+            with open(self._ruta_indice(), 'r') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir_indice(self, indice):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta_indice()
+        tmp = ruta + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w') as archivo:
+            json.dump(indice, archivo, indent=1)
+        os.replace(tmp, ruta)
+
+    @contextmanager
+    def _actualizar_indice(self):
+        # Lectura, modificación y escritura del índice con el bloqueo exclusivo tomado
+        os.makedirs(self.directorio, exist_ok=True)
+        with open(os.path.join(self.directorio, 'indice.lock'), 'a') as bloqueo:
+            if fcntl is not None:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)
+            indice = self._leer_indice()
+            yield indice
+            self._escribir_indice(indice)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave[:32]}.npz')
+
+    def _cargar(self, clave):
+        # Carga una entrada y anota su uso; descarta la entrada si el archivo ya no existe
+        try:
+            abiertos, x, info = cargar_solucion(self._ruta(clave))
+        except (OSError, ValueError, KeyError):
+            with self._actualizar_indice() as indice:
+                indice.pop(clave, None)
+            return None
+        with self._actualizar_indice() as indice:
+            if clave in indice:
+                indice[clave]['uso'] = time.time()
+        return abiertos, x, info
+
+    def __len__(self):
+        return len(self._leer_indice())
+
+    @property
+    def bytes(self):
+        return sum(entrada['bytes'] for entrada in self._leer_indice().values())
+
+    # --- Consultas ---
+
+    def buscar(self, clave, clave_base=None):
+        """
+        Busca un resultado por su clave completa o, con clave_base, uno con las mismas
+        opciones base cuyo gap ya esté cerrado (más tiempo o nodos no lo cambiarían).
+
+        Retorna:
+        - Tupla (abiertos, x, info) como solucion.cargar_solucion, o None.
+        """
+        indice = self._leer_indice()
+        if clave not in indice and clave_base is not None:
+            cerradas = [c for c, entrada in indice.items() if entrada['base'] == clave_base and entrada['cerrado']]
+            clave = min(cerradas, key=lambda c: indice[c]['objetivo']) if cerradas else clave
+        resultado = self._cargar(clave) if clave in indice else None
+        if resultado is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        return resultado
+
+    def buscar_arranque(self, clave_base):
+        """
+        Busca el mejor resultado guardado con las mismas opciones base (solo cambian
+        los límites), para usarlo como solución inicial.
+
+        Retorna:
+        - Tupla (abiertos, x, info) como solucion.cargar_solucion, o None.
+        """
+        indice = self._leer_indice()
+        candidatas = [c for c, entrada in indice.items() if entrada['base'] == clave_base]
+        if not candidatas:
+            return None
+        resultado = self._cargar(min(candidatas, key=lambda c: indice[c]['objetivo']))
+        if resultado is not None:
+            self.arranques += 1
+        return resultado
+
+    # --- Escritura ---
+
+    def guardar(self, clave, clave_base, abiertos, x, objetivo, cota=None, tiempos=None, **meta):
+        """
+        Guarda un resultado y desaloja las entradas más antiguas si se supera max_bytes.
+
+        Parámetros:
+        - clave, clave_base: Claves de claves_resultado.
+        - abiertos, x, objetivo, cota, tiempos, meta: Como en solucion.guardar_solucion.
+
+        Retorna:
+        - Ruta del archivo escrito.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(clave)
+        tmp = ruta[:-len('.npz')] + f'.{os.getpid()}.tmp.npz'
+        guardar_solucion(tmp, abiertos, x, objetivo, cota, tiempos, clave=clave, clave_base=clave_base, **meta)
+        os.replace(tmp, ruta)
+
+        cerrado = cota is not None and objetivo is not None and objetivo - cota <= GAP_CERRADO * abs(objetivo)
+        with self._actualizar_indice() as indice:
+            indice[clave] = {'base': clave_base, 'bytes': os.path.getsize(ruta), 'uso': time.time(),
+                             'objetivo': float(objetivo), 'cerrado': bool(cerrado)}
+            self._desalojar(indice)
+        return ruta
+
+    def _desalojar(self, indice):
+        total = sum(entrada['bytes'] for entrada in indice.values())
+        for clave in sorted(indice, key=lambda c: indice[c]['uso']):
+            if total <= self.max_bytes:
+                break
+            total -= indice.pop(clave)['bytes']
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                pass
+            self.desalojos += 1
+
+    def vaciar(self):
+        """Elimina todas las entradas."""
+        with self._actualizar_indice() as indice:
+            for clave in list(indice):
+                try:
+                    os.remove(self._ruta(clave))
+                except OSError:
+                    pass
+            indice.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Muestra o vacía el almacén de resultados de resolución.")
+    parser.add_argument('--almacen', type=str, default=ALMACEN_DIR, help="Directorio del almacén.")
+    parser.add_argument('--vaciar', action='store_true', help="Eliminar todas las entradas.")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.almacen):
+        print(f"Error: El almacén '{args.almacen}' no existe.")
+        sys.exit(1)
+
+    almacen = AlmacenResultados(args.almacen)
+    if args.vaciar:
+        almacen.vaciar()
+        print("Almacén vaciado")
+        sys.exit(0)
+
+    indice = almacen._leer_indice()
+    for clave, entrada in sorted(indice.items(), key=lambda item: -item[1]['uso']):
+        _, _, info = cargar_solucion(almacen._ruta(clave))
+        print(f"{clave[:12]}  {os.path.basename(str(info.get('instancia', '?'))):<14} {info.get('backend', '?'):<6} "
+              f"objetivo {entrada['objetivo']:.4f}{' (cerrado)' if entrada['cerrado'] else ''}, "
+              f"{entrada['bytes'] / 1024:.1f} KiB, usado {time.ctime(entrada['uso'])}")
+    print(f"\n{len(indice)} entradas, {sum(e['bytes'] for e in indice.values()) / 2**20:.2f} MiB")
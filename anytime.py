@@ -0,0 +1,357 @@
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from ILS import iterated_local_search
+from busqueda_local_single import busqueda_local_single, indice_ordenado
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import cap_cost_array
+from evaluador import EvaluadorCFLP
+from lagrangiano import relajacion_lagrangiana
+from modelo_matricial import construir_modelo, crear_highs, extraer_solucion, resolver_highs, vector_inicial
+from modelo_reducido import resolver_reducido
+
+# Fracción máxima del presupuesto para la heurística y para la relajación lagrangiana;
+# lo que no usan pasa a la fase exacta
+FRACCION_HEURISTICA = 0.25
+FRACCION_LAGRANGIANO = 0.15
+
+# Iteraciones globales del ILS por época, y épocas seguidas sin mejorar el incumbente
+# antes de pasar a la fase siguiente
+ITERACIONES_EPOCA = 5
+PACIENCIA_HEURISTICA = 3
+
+# Segundos que se le restan a HiGHS del tiempo que queda. El límite de HiGHS no es
+# estricto: la LP de la raíz y el cierre no consultan el límite en todo momento. Sin las
+# heurísticas de sub-MIP (ver modelo_matricial.HEURISTICAS_SUBMIP), el exceso medido en
+# capb fue de hasta 0.9 s con HiGHS solo y de 1.1 s dentro del conductor
+MARGEN_HIGHS = 1.5
+
+
+class ConductorAnytime:
+    """
+    Resolución anytime con un presupuesto total de tiempo y un gap objetivo.
+
+    El presupuesto se reparte entre fases que se adaptan a lo que se va logrando:
+
+    1. Heurística: épocas cortas del ILS (con caché de evaluaciones) mientras mejoren
+       el incumbente, hasta FRACCION_HEURISTICA del presupuesto.
+    2. Cota: relajación lagrangiana con hasta FRACCION_LAGRANGIANO del tiempo restante
+       (también puede mejorar el incumbente).
+    3. Exacta: HiGHS con el tiempo que queda menos MARGEN_HIGHS, partiendo del
+       incumbente. El branch and bound se interrumpe en cuanto el gap global (su
+       incumbente contra la mejor cota conocida) alcanza el objetivo.
+
+    El presupuesto no es un límite estricto: si HiGHS se pasa, el exceso se informa en
+    el resultado y como último punto de la trayectoria (fase 'exceso').
+
+    El mejor incumbente, la mejor cota y el gap se pueden leer en cualquier momento
+    (también desde otro hilo), y cada mejora se anota en la trayectoria con su tiempo.
+    """
+
+    def __init__(self, instancia, presupuesto, gap_objetivo=1e-4, single_source=False, semilla=0, k_cercanos=None,
+                 instrumentacion=None, verbose=True):
+        """
+        Parámetros:
+        - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+        - presupuesto: Tiempo total en segundos.
+        - gap_objetivo: Gap relativo con el que se detiene.
+        - single_source: Si es True se resuelve CFLPsingle.mod; si no, CFLP.mod.
+        - semilla: Semilla del ILS.
+        - k_cercanos: Si se indica, la fase exacta usa el modelo reducido a los k
+          almacenes más baratos de cada cliente (ver modelo_reducido.py).
+        - instrumentacion: instrumentacion.Instrumentacion que recibe incumbentes,
+          cotas y fases (opcional).
+        - verbose: Si es True se imprime cada mejora.
+        """
+        self.instancia = instancia
+        self.presupuesto = float(presupuesto)
+        self.gap_objetivo = gap_objetivo
+        self.single_source = single_source
+        self.semilla = semilla
+        self.k_cercanos = k_cercanos
+        self.instrumentacion = instrumentacion
+        self.verbose = verbose
+        self._candado = threading.Lock()
+        self._inicio = None
+        self.incumbente = float('inf')
+        self.cota = -float('inf')
+        self.solucion = None  # (abiertos, x en CSR) del incumbente
+        self.trayectoria = []  # (t, incumbente, cota, fase)
+        self.tiempos = {}
+        self.fase = None
+        self._inicio_fase = None
+        self.infactible = False
+        self.agotado = False  # HiGHS terminó por su límite de tiempo
+
+    # --- Estado ---
+
+    def transcurrido(self):
+        return time.perf_counter() - self._inicio
+
+    def restante(self):
+        return max(0.0, self.presupuesto - self.transcurrido())
+
+    @property
+    def gap(self):
+        with self._candado:
+            return self._gap(self.incumbente, self.cota)
+
+    @staticmethod
+    def _gap(incumbente, cota):
+        if not np.isfinite(incumbente) or not np.isfinite(cota):
+            return float('inf')
+        return max(0.0, (incumbente - cota) / abs(incumbente)) if incumbente else 0.0
+
+    def gap_alcanzado(self):
+        return self.gap <= self.gap_objetivo
+
+    def _anotar(self):
+        self.trayectoria.append((self.transcurrido(), self.incumbente, self.cota, self.fase))
+        if self.verbose:
+            print(f"[{self.transcurrido():8.2f} s] {self.fase:<12} incumbente {self.incumbente:.4f}, "
+                  f"cota {self.cota:.4f}, gap {self._gap(self.incumbente, self.cota):.4%}")
+
+    def mejorar(self, costo, abiertos=None, x=None):
+        """Registra un incumbente (con sus almacenes abiertos y x en CSR) si mejora el actual."""
+        with self._candado:
+            if costo >= self.incumbente * (1 - 1e-12):
+                return False
+            self.incumbente = float(costo)
+            if abiertos is not None:
+                self.solucion = (np.asarray(abiertos, dtype=bool).copy(), x)
+            self._anotar()
+        if self.instrumentacion is not None:
+            self.instrumentacion.incumbente(costo, self.fase)
+        return True
+
+    def acotar(self, cota):
+        """Registra una cota inferior si mejora la actual."""
+        with self._candado:
+            if not np.isfinite(cota) or cota <= self.cota + 1e-9 * abs(cota):
+                return False
+            self.cota = float(cota)
+            self._anotar()
+        if self.instrumentacion is not None:
+            self.instrumentacion.evento('cota_inferior', valor=float(cota), fuente=self.fase)
+        return True
+
+    def _iniciar_fase(self, nombre):
+        ahora = time.perf_counter()
+        if self.fase is not None:
+            self.tiempos[self.fase] = self.tiempos.get(self.fase, 0.0) + ahora - self._inicio_fase
+            if self.instrumentacion is not None:
+                self.instrumentacion.fase(self.fase, ahora - self._inicio_fase)
+        self.fase = nombre
+        self._inicio_fase = ahora
+
+    # --- Fases ---
+
+    def _heuristica(self, evaluador):
+        instancia = self.instancia
+        facilities = instancia.s.shape[0]
+        cap_cost = cap_cost_array(instancia)
+        demand_total = float(np.asarray(instancia.demand).sum())
+        cache = CacheEvaluaciones(facilities)
+        indice = indice_ordenado(instancia.c) if self.single_source else None
+        rng = random.Random(self.semilla)
+        limite = FRACCION_HEURISTICA * self.presupuesto
+        actual = None
+        sin_mejora = 0
+        while sin_mejora < PACIENCIA_HEURISTICA and self.transcurrido() < limite:
+            inicio_epoca = time.perf_counter()
+            iterated_local_search(cap_cost, facilities, demand_total, global_iterations=ITERACIONES_EPOCA, seed=rng.getrandbits(32),
+                                  evaluator=evaluador, initial_solution=actual, verbose=False, cache=cache)
+            if self.single_source:
+                abiertos, asignacion, _, _ = busqueda_local_single(instancia, evaluador.abiertos, evaluador.asignacion,
+                                                                indice)
+                evaluador.restaurar((abiertos, asignacion, {}))
+            actual = evaluador.abiertos.copy()
+            if evaluador.factible and evaluador.costo < self.incumbente:
+                self.mejorar(evaluador.costo, evaluador.abiertos, sp.csr_matrix(evaluador.x_inicial()))
+                sin_mejora = 0
+            else:
+                sin_mejora += 1
+            # Si la próxima época no cabe en el tiempo de la fase, no la empezamos
+            if self.transcurrido() + (time.perf_counter() - inicio_epoca) > limite:
+                break
+
+    def _lagrangiano(self, evaluador):
+        limite = FRACCION_LAGRANGIANO * self.restante()
+        resultado = relajacion_lagrangiana(self.instancia, self.single_source, gap_objetivo=self.gap_objetivo,
+                                           limite_tiempo=limite, verbose=False)
+        self.acotar(resultado['cota_inferior'])
+        if resultado['abiertos'] is not None:
+            if resultado['cota_superior'] < self.incumbente:
+                evaluador.restaurar((resultado['abiertos'], resultado['asignacion'], resultado['partes']))
+                self.mejorar(resultado['cota_superior'], evaluador.abiertos, sp.csr_matrix(evaluador.x_inicial()))
+
+    def _exacta(self, evaluador):
+        instancia = self.instancia
+        abiertos, x_inicial = self.solucion if self.solucion is not None else (None, None)
+        if x_inicial is not None:
+            x_inicial = x_inicial.toarray()
+        limite = max(0.0, self.restante() - MARGEN_HIGHS)
+
+        if self.k_cercanos is not None:
+            # El modelo reducido no expone la cota del B&B mientras resuelve: se detiene
+            # cuando el incumbente queda dentro del gap respecto de la mejor cota conocida
+            parada = self.cota / (1 - self.gap_objetivo) if np.isfinite(self.cota) else None
+            modelo, resultado = resolver_reducido(
+                instancia, self.single_source, self.k_cercanos, limite_tiempo=limite,
+                gap=self.gap_objetivo, abiertos_iniciales=abiertos, x_inicial=x_inicial, objetivo_parada=parada
+            )
+            self.infactible = resultado['estado'] == 'Infeasible'
+            self.agotado = resultado['estado'] == 'Time limit reached'
+            if resultado['valores'] is not None:
+                self.mejorar(resultado['objetivo'], *extraer_solucion(modelo, resultado['valores']))
+            if resultado['probado']:
+                # Solo una solución certificada hace válida la cota del modelo reducido
+                self.acotar(resultado['cota'])
+            return
+
+        modelo = construir_modelo(instancia, self.single_source)
+
+        def al_mejorar(costo, valores):
+            self.mejorar(costo, *extraer_solucion(modelo, valores))
+
+        def al_progresar(incumbente, cota):
+            self.acotar(cota)
+            return self.gap_alcanzado() or self.restante() <= 0
+
+        # El presolve de HiGHS no consulta el límite de tiempo ni los callbacks y en las
+        # instancias grandes (capb, capc) tarda más que presupuestos de varios segundos;
+        # sin él, la cota aparece desde el nodo raíz. Aun así el límite no es estricto
+        # (ver MARGEN_HIGHS)
+        h = crear_highs(modelo, gap=self.gap_objetivo)
+        h.setOptionValue('presolve', 'off')
+        valores_iniciales = vector_inicial(modelo, abiertos, x_inicial) if abiertos is not None else None
+        resultado = resolver_highs(modelo, limite_tiempo=limite, gap=self.gap_objetivo,
+                                   valores_iniciales=valores_iniciales, al_mejorar=al_mejorar,
+                                   al_progresar=al_progresar, h=h)
+        self.infactible = resultado['estado'] == 'Infeasible'
+        self.agotado = resultado['estado'] == 'Time limit reached'
+        if resultado['valores'] is not None:
+            self.mejorar(resultado['objetivo'], *extraer_solucion(modelo, resultado['valores']))
+        self.acotar(resultado['cota'])
+
+    def resolver(self):
+        """
+        Ejecuta las fases hasta alcanzar el gap objetivo o agotar el presupuesto.
+
+        Retorna:
+        - Diccionario con objetivo, cota, gap, abiertos, x (matriz dispersa CSR), la
+          trayectoria [(t, incumbente, cota, fase)], los tiempos por fase, el tiempo
+          total, el exceso sobre el presupuesto (0 si no se pasó) y el motivo de término:
+          'gap', 'presupuesto', 'infactible' o 'completo' (la fase exacta terminó sin
+          alcanzar el gap, por ejemplo con el modelo reducido).
+        """
+        self._inicio = time.perf_counter()
+        evaluador = EvaluadorCFLP(self.instancia, self.single_source)
+        motivo = 'completo'
+        for nombre, fase in (('heuristica', self._heuristica), ('lagrangiano', self._lagrangiano),
+                             ('exacta', self._exacta)):
+            if self.gap_alcanzado():
+                motivo = 'gap'
+                break
+            if self.restante() <= 0:
+                motivo = 'presupuesto'
+                break
+            self._iniciar_fase(nombre)
+            fase(evaluador)
+        else:
+            if self.infactible:
+                motivo = 'infactible'
+            elif self.gap_alcanzado():
+                motivo = 'gap'
+            elif self.restante() <= 0 or self.agotado:
+                motivo = 'presupuesto'
+        self._iniciar_fase(None)
+
+        exceso = max(0.0, self.transcurrido() - self.presupuesto)
+        if exceso > 0:
+            with self._candado:
+                self.fase = 'exceso'
+                self._anotar()
+                self.fase = None
+            if self.instrumentacion is not None:
+                self.instrumentacion.evento('exceso', segundos=exceso, presupuesto=self.presupuesto)
+
+        abiertos, x = self.solucion if self.solucion is not None else (None, None)
+        return {
+            'objetivo': self.incumbente,
+            'cota': self.cota,
+            'gap': self.gap,
+            'abiertos': abiertos,
+            'x': x,
+            'trayectoria': list(self.trayectoria),
+            'tiempos': dict(self.tiempos),
+            'tiempo': self.transcurrido(),
+            'exceso': exceso,
+            'motivo': motivo,
+        }
+
+
+def resolver_anytime(instancia, presupuesto, gap_objetivo=1e-4, single_source=False, semilla=0, k_cercanos=None,
+                     instrumentacion=None, verbose=True):
+    """Atajo de ConductorAnytime(...).resolver() (ver ConductorAnytime)."""
+    return ConductorAnytime(instancia, presupuesto, gap_objetivo, single_source, semilla, k_cercanos,
+                            instrumentacion, verbose).resolver()
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+
+    from cache_instancias import cargar_instancia
+    from instrumentacion import Instrumentacion
+    from solucion import guardar_solucion, resumen_solucion
+
+    parser = argparse.ArgumentParser(description="Resolución anytime: un presupuesto total de tiempo repartido entre "
+                                                 "heurística, cota lagrangiana y HiGHS, con parada por gap.")
+    parser.add_argument('-d', '--data', type=str, required=True, help="Ruta al archivo .txt o .dat de la instancia.")
+    parser.add_argument('-t', '--time', type=float, required=True, help="Presupuesto total en segundos.")
+    parser.add_argument('-g', '--gap', type=float, default=1e-4, help="Gap relativo objetivo.")
+    parser.add_argument('--single', action='store_true', help="Resolver CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del ILS.")
+    parser.add_argument('-k', '--k-cercanos', type=int, default=None,
+                        help="Fase exacta con el modelo reducido a los K almacenes más baratos por cliente.")
+    parser.add_argument('--trayectoria', type=str, default=None,
+                        help="Archivo .csv donde guardar la trayectoria (t, incumbente, cota, fase).")
+    parser.add_argument('-o', '--output', type=str, default=None, help="Archivo .npz donde guardar la solución.")
+    parser.add_argument('--traza', type=str, default=None, help="Archivo .jsonl de instrumentación (opcional).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        print(f"Error: El archivo de datos '{args.data}' no existe.")
+        sys.exit(1)
+
+    instrumentacion = Instrumentacion(args.traza) if args.traza else None
+    resultado = resolver_anytime(cargar_instancia(args.data), args.time, args.gap, args.single, args.seed,
+                                 args.k_cercanos, instrumentacion)
+    if instrumentacion is not None:
+        instrumentacion.cerrar()
+
+    print(f"\n--- ANYTIME ({resultado['motivo']}, {resultado['tiempo']:.2f} s de {args.time:.2f} s"
+          + (f", excedido en {resultado['exceso']:.2f} s)" if resultado['exceso'] > 0 else ")"))
+    if resultado['abiertos'] is not None:
+        resumen_solucion(resultado['abiertos'], resultado['x'], resultado['objetivo'], resultado['cota'])
+    for fase, segundos in resultado['tiempos'].items():
+        print(f"{fase:<20} {segundos:10.4f} s")
+
+    if args.trayectoria is not None:
+        with open(args.trayectoria, 'w', newline='') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['t', 'incumbente', 'cota', 'fase'])
+            escritor.writerows(resultado['trayectoria'])
+        print(f"Trayectoria guardada en {args.trayectoria}")
+    if args.output is not None and resultado['abiertos'] is not None:
+        ruta = guardar_solucion(args.output, resultado['abiertos'], resultado['x'], resultado['objetivo'],
+                                resultado['cota'], resultado['tiempos'], instancia=args.data, motivo=resultado['motivo'],
+                                gap_objetivo=args.gap, presupuesto=args.time, exceso=resultado['exceso'])
+        print(f"Solución guardada en {ruta}")
@@ -0,0 +1,353 @@
+import csv
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+from ILS import iterated_local_search
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import cargar_instancia, cap_cost_array, leer_instancia
+from datos_ampl import Cronometro
+from evaluador import EvaluadorCFLP
+from instrumentacion import Instrumentacion
+from lagrangiano import adoptar_primal, relajacion_lagrangiana
+from modelo_matricial import construir_modelo, extraer_solucion, resolver_highs, vector_inicial
+from preproceso import construir_modelo_preprocesado, preprocesar
+from vecindario import Vecindario
+
+# Intervalos de iteraciones locales del ILS en el benchmark (los mismos que usa ILS.py por defecto)
+INTERVALOS_ILS = [10, 20, 30, 40, 50, 60, 80, 90, 100, 110, 120, 130, 140, 150, 160, 170, 180, 190, 200]
+
+# Campos del CSV, en orden
+CAMPOS = ['instancia', 'metodo', 'repeticion', 'semilla', 'objetivo', 'cota', 'gap', 'iteraciones',
+          'movimientos_propuestos', 'movimientos_aceptados', 'tiempo_total', 'memoria_pico']
+
+
+def _ils(instancia, cronometro, semilla, single_source, evaluar, iteraciones, cache=None, vecindario=None):
+    # Retorna el evaluador, la solución, el costo y los contadores de movimientos del ILS.
+    # Las iteraciones son los movimientos que llegaron a evaluarse: los propuestos menos los
+    # omitidos por centro repetido y los descartados por el caché
+    cronometro.fase('heuristica')
+    evaluador = EvaluadorCFLP(instancia, single_source) if evaluar else None
+    instrumentacion = Instrumentacion()
+    solucion, costo = iterated_local_search(
+        cap_cost_array(instancia), instancia.s.shape[0], float(np.asarray(instancia.demand).sum()),
+        global_iterations=iteraciones, time_intervals=INTERVALOS_ILS, seed=semilla, evaluator=evaluador,
+        verbose=False, instrumentation=instrumentacion, cache=cache, neighborhood=vecindario
+    )
+    contadores = instrumentacion.contadores
+    conteo = {
+        'iteraciones': (contadores['movimientos_propuestos'] - contadores['movimientos_omitidos']
+                        - (cache.rechazos if cache is not None else 0)),
+        'movimientos_propuestos': contadores['movimientos_propuestos'],
+        'movimientos_aceptados': contadores['movimientos_aceptados'],
+    }
+    return evaluador, solucion, costo, conteo
+
+
+def metodo_ils(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS sobre el costo total (apertura + asignación)."""
+    _, _, costo, conteo = _ils(instancia, cronometro, semilla, single_source, True, iteraciones)
+    return {'objetivo': costo, **conteo}
+
+
+def metodo_ils_cache(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS sobre el costo total con el caché de evaluaciones (cache_evaluaciones.py)."""
+    cache = CacheEvaluaciones(instancia.s.shape[0])
+    _, _, costo, conteo = _ils(instancia, cronometro, semilla, single_source, True, iteraciones, cache)
+    return {'objetivo': costo, **conteo}
+
+
+def metodo_ils_vecindario(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS cuya fase local explora el vecindario completo en bloque (vecindario.py, best improvement)."""
+    vecindario = Vecindario('mejor', semilla=semilla)
+    _, _, costo, conteo = _ils(instancia, cronometro, semilla, single_source, True, iteraciones,
+                               CacheEvaluaciones(instancia.s.shape[0]), vecindario)
+    return {'objetivo': costo, **conteo, 'iteraciones': vecindario.iteraciones}
+
+
+def metodo_ils_tabu(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS con búsqueda tabú sobre el vecindario completo (vecindario.py, tenencia 7)."""
+    vecindario = Vecindario('mejor', tenencia=7, semilla=semilla)
+    _, _, costo, conteo = _ils(instancia, cronometro, semilla, single_source, True, iteraciones,
+                               CacheEvaluaciones(instancia.s.shape[0]), vecindario)
+    return {'objetivo': costo, **conteo, 'iteraciones': vecindario.iteraciones}
+
+
+def metodo_ils_apertura(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS original, que optimiza solo el costo de apertura."""
+    _, _, costo, conteo = _ils(instancia, cronometro, semilla, single_source, False, iteraciones)
+    return {'objetivo': costo, **conteo}
+
+
+def metodo_lagrangiano(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """Relajación lagrangiana (cota inferior y solución factible)."""
+    cronometro.fase('heuristica')
+    resultado = relajacion_lagrangiana(instancia, single_source, limite_tiempo=limite_tiempo, verbose=False)
+    return {'objetivo': resultado['cota_superior'], 'cota': resultado['cota_inferior'],
+            'iteraciones': resultado['iteraciones']}
+
+
+def _exacto(instancia, cronometro, single_source, limite_tiempo, abiertos=None, x_inicial=None, preproceso=None):
+    cronometro.fase('construccion_modelo')
+    if preproceso is not None:
+        modelo = construir_modelo_preprocesado(instancia, single_source, preproceso)
+    else:
+        modelo = construir_modelo(instancia, single_source)
+    valores_iniciales = vector_inicial(modelo, abiertos, x_inicial) if abiertos is not None else None
+    cronometro.fase('resolucion')
+    resultado = resolver_highs(modelo, limite_tiempo=limite_tiempo, valores_iniciales=valores_iniciales)
+    cronometro.fase('salida')
+    if resultado['valores'] is not None:
+        extraer_solucion(modelo, resultado['valores'])
+    return {'objetivo': resultado['objetivo'], 'cota': resultado['cota'], 'iteraciones': resultado['nodos']}
+
+
+def metodo_exacto(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """Modelo completo con HiGHS, sin solución inicial."""
+    return _exacto(instancia, cronometro, single_source, limite_tiempo)
+
+
+def metodo_exacto_arranque(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """ILS y luego el modelo completo con HiGHS, usando la solución del ILS como arranque."""
+    evaluador, _, _, _ = _ils(instancia, cronometro, semilla, single_source, True, iteraciones)
+    if not evaluador.factible:
+        return _exacto(instancia, cronometro, single_source, limite_tiempo)
+    return _exacto(instancia, cronometro, single_source, limite_tiempo, evaluador.abiertos, evaluador.x_inicial())
+
+
+def _restante(limite_tiempo, inicio):
+    # Límite de tiempo que queda desde inicio (None sin límite)
+    return None if limite_tiempo is None else max(0.0, limite_tiempo - (time.perf_counter() - inicio))
+
+
+def metodo_exacto_preproceso(instancia, cronometro, semilla, single_source=False, limite_tiempo=None, iteraciones=5):
+    """
+    ILS, preproceso por costo reducido (preproceso.py) respecto de la mejor solución entre
+    el ILS y la primal de la relajación lagrangiana, y el modelo reducido con HiGHS. El
+    tiempo de la relajación y del preproceso se descuenta del límite de HiGHS.
+    """
+    evaluador, _, _, _ = _ils(instancia, cronometro, semilla, single_source, True, iteraciones)
+    cronometro.fase('preproceso')
+    inicio = time.perf_counter()
+    relajacion = relajacion_lagrangiana(instancia, single_source, limite_tiempo=limite_tiempo, verbose=False)
+    adoptar_primal(evaluador, relajacion)
+    if not evaluador.factible:
+        return _exacto(instancia, cronometro, single_source, _restante(limite_tiempo, inicio))
+    preproceso = preprocesar(instancia, single_source, evaluador.costo, evaluador.abiertos,
+                             multiplicadores=relajacion['multiplicadores'],
+                             limite_tiempo=_restante(limite_tiempo, inicio), verbose=False)
+    return _exacto(instancia, cronometro, single_source, _restante(limite_tiempo, inicio), evaluador.abiertos,
+                   evaluador.x_inicial(), preproceso)
+
+
+# Métodos disponibles en el benchmark
+METODOS = {
+    'ils': metodo_ils,
+    'ils_cache': metodo_ils_cache,
+    'ils_vecindario': metodo_ils_vecindario,
+    'ils_tabu': metodo_ils_tabu,
+    'ils_apertura': metodo_ils_apertura,
+    'lagrangiano': metodo_lagrangiano,
+    'exacto': metodo_exacto,
+    'exacto_arranque': metodo_exacto_arranque,
+    'exacto_preproceso': metodo_exacto_preproceso,
+}
+
+
+def ejecutar_benchmark(instancias, metodos, repeticiones=1, semilla=0, single_source=False, limite_tiempo=None,
+                       iteraciones=5, verbose=True):
+    """
+    Ejecuta cada método sobre cada instancia, con semillas fijas y repeticiones.
+
+    Por cada ejecución se registra el tiempo y el pico de memoria (tracemalloc) de cada
+    fase: lectura del texto (parse), carga desde el caché, heurística, construcción del
+    modelo, resolución y salida.
+
+    Parámetros:
+    - instancias: Lista de rutas a archivos .txt o .dat.
+    - metodos: Lista de nombres de METODOS.
+    - repeticiones: Número de repeticiones de cada par (instancia, método); la
+      repetición r usa la semilla semilla + r.
+    - semilla: Semilla base.
+    - single_source: Si es True se resuelve CFLPsingle.mod; si no, CFLP.mod.
+    - limite_tiempo: Límite de tiempo de cada resolución en segundos (opcional).
+    - iteraciones: Iteraciones globales del ILS.
+    - verbose: Si es True se imprime una línea por ejecución.
+
+    Retorna:
+    - Lista de registros (diccionarios) con los campos de CAMPOS más 'fases'.
+    """
+    registros = []
+    for ruta in instancias:
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        for metodo in metodos:
+            for repeticion in range(repeticiones):
+                cronometro = Cronometro(memoria=True)
+                cronometro.fase('parse')
+                leer_instancia(ruta)
+                cronometro.fase('carga_instancia')
+                instancia = cargar_instancia(ruta)
+                resultado = METODOS[metodo](instancia, cronometro, semilla + repeticion, single_source,
+                                            limite_tiempo, iteraciones)
+                cronometro.detener()
+
+                objetivo = resultado.get('objetivo')
+                cota = resultado.get('cota')
+                gap = None
+                if objetivo is not None and cota is not None and np.isfinite(objetivo) and objetivo != 0:
+                    gap = (objetivo - cota) / abs(objetivo)
+                registro = {
+                    'instancia': nombre,
+                    'metodo': metodo,
+                    'repeticion': repeticion,
+                    'semilla': semilla + repeticion,
+                    'objetivo': objetivo,
+                    'cota': cota,
+                    'gap': gap,
+                    'iteraciones': resultado.get('iteraciones'),
+                    'movimientos_propuestos': resultado.get('movimientos_propuestos'),
+                    'movimientos_aceptados': resultado.get('movimientos_aceptados'),
+                    'tiempo_total': sum(cronometro.tiempos.values()),
+                    'memoria_pico': max(cronometro.memoria.values(), default=0),
+                    'fases': {fase: {'tiempo': cronometro.tiempos[fase], 'memoria_pico': cronometro.memoria.get(fase, 0)}
+                              for fase in cronometro.tiempos},
+                }
+                registros.append(registro)
+                if verbose:
+                    print(f"{nombre:<12} {metodo:<16} rep {repeticion}: objetivo {objetivo}, "
+                          f"tiempo {registro['tiempo_total']:.3f} s, memoria {registro['memoria_pico'] / 2**20:.2f} MiB")
+    return registros
+
+
+def guardar_resultados(registros, ruta_json=None, ruta_csv=None):
+    """
+    Guarda los registros en JSON (con el detalle por fase) y/o en CSV (una fila por
+    ejecución y columnas tiempo_<fase> y memoria_<fase>).
+    """
+    if ruta_json is not None:
+        with open(ruta_json, 'w') as archivo:
+            json.dump({
+                'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'plataforma': platform.platform(),
+                'memoria_maxima_proceso_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                'registros': registros,
+            }, archivo, indent=2)
+
+    if ruta_csv is not None:
+        fases = list(dict.fromkeys(fase for registro in registros for fase in registro['fases']))
+        columnas = CAMPOS + [f'tiempo_{fase}' for fase in fases] + [f'memoria_{fase}' for fase in fases]
+        with open(ruta_csv, 'w', newline='') as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=columnas)
+            escritor.writeheader()
+            for registro in registros:
+                fila = {campo: registro[campo] for campo in CAMPOS}
+                for fase, valores in registro['fases'].items():
+                    fila[f'tiempo_{fase}'] = valores['tiempo']
+                    fila[f'memoria_{fase}'] = valores['memoria_pico']
+                escritor.writerow(fila)
+
+
+def _agrupar(registros):
+    # Resume las repeticiones de cada (instancia, método): mediana del tiempo y mejor objetivo
+    grupos = {}
+    for registro in registros:
+        grupos.setdefault((registro['instancia'], registro['metodo']), []).append(registro)
+    resumen = {}
+    for clave, grupo in grupos.items():
+        objetivos = [r['objetivo'] for r in grupo if r['objetivo'] is not None and np.isfinite(r['objetivo'])]
+        resumen[clave] = {
+            'tiempo': float(np.median([r['tiempo_total'] for r in grupo])),
+            'memoria': max(r['memoria_pico'] for r in grupo),
+            'objetivo': min(objetivos) if objetivos else None,
+        }
+    return resumen
+
+
+def comparar_con_linea_base(registros, linea_base, tolerancia_tiempo=0.25, tolerancia_memoria=0.25,
+                            tolerancia_objetivo=1e-6, tiempo_minimo=0.05):
+    """
+    Compara los registros con una línea base (registros de una ejecución anterior).
+
+    Se marca una regresión cuando, para un mismo par (instancia, método):
+    - la mediana del tiempo total sube más que tolerancia_tiempo (relativo), si el
+      tiempo base supera tiempo_minimo (los tiempos muy cortos son solo ruido);
+    - el pico de memoria sube más que tolerancia_memoria (relativo);
+    - el mejor objetivo empeora más que tolerancia_objetivo (relativo).
+
+    Retorna:
+    - Lista de mensajes, uno por regresión (vacía si no hay).
+    """
+    actual = _agrupar(registros)
+    base = _agrupar(linea_base)
+    regresiones = []
+    for clave in sorted(actual.keys() & base.keys()):
+        a, b = actual[clave], base[clave]
+        nombre = f"{clave[0]} / {clave[1]}"
+        if b['tiempo'] >= tiempo_minimo and a['tiempo'] > b['tiempo'] * (1 + tolerancia_tiempo):
+            regresiones.append(f"{nombre}: tiempo {b['tiempo']:.3f} s -> {a['tiempo']:.3f} s")
+        if b['memoria'] > 0 and a['memoria'] > b['memoria'] * (1 + tolerancia_memoria):
+            regresiones.append(f"{nombre}: memoria {b['memoria'] / 2**20:.2f} MiB -> {a['memoria'] / 2**20:.2f} MiB")
+        if b['objetivo'] is not None:
+            if a['objetivo'] is None or a['objetivo'] > b['objetivo'] + tolerancia_objetivo * abs(b['objetivo']):
+                regresiones.append(f"{nombre}: objetivo {b['objetivo']} -> {a['objetivo']}")
+    return regresiones
+
+
+def cargar_linea_base(ruta):
+    """Lee los registros de un JSON generado por guardar_resultados."""
+    with open(ruta) as archivo:
+        return json.load(archivo)['registros']
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de métodos sobre un conjunto de instancias.")
+    parser.add_argument('-i', '--instancias', type=str, nargs='+', default=['instancias/*.txt'],
+                        help="Rutas o patrones glob de las instancias (por defecto: instancias/*.txt).")
+    parser.add_argument('-M', '--metodos', type=str, nargs='+', choices=sorted(METODOS), default=['ils', 'exacto_arranque'],
+                        help="Métodos a ejecutar.")
+    parser.add_argument('-r', '--repeticiones', type=int, default=1, help="Repeticiones por instancia y método.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla base.")
+    parser.add_argument('--single', action='store_true', help="Resolver CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('-t', '--time', type=float, default=None, help="Límite de tiempo de cada resolución.")
+    parser.add_argument('-g', '--iteraciones', type=int, default=5, help="Iteraciones globales del ILS.")
+    parser.add_argument('-o', '--output', type=str, default='benchmark',
+                        help="Prefijo de los archivos de salida (<prefijo>.json y <prefijo>.csv).")
+    parser.add_argument('-b', '--baseline', type=str, default=None,
+                        help="JSON de una ejecución anterior con el que comparar.")
+    parser.add_argument('--tolerancia-tiempo', type=float, default=0.25,
+                        help="Aumento relativo de tiempo que se marca como regresión.")
+    args = parser.parse_args()
+
+    rutas = []
+    for patron in args.instancias:
+        encontradas = sorted(glob.glob(patron))
+        if not encontradas:
+            print(f"Error: No se encontraron instancias para '{patron}'.")
+            sys.exit(1)
+        rutas.extend(encontradas)
+    if args.baseline is not None and not os.path.exists(args.baseline):
+        print(f"Error: El archivo de línea base '{args.baseline}' no existe.")
+        sys.exit(1)
+
+    registros = ejecutar_benchmark(rutas, args.metodos, args.repeticiones, args.seed, args.single, args.time,
+                                   args.iteraciones)
+    guardar_resultados(registros, f"{args.output}.json", f"{args.output}.csv")
+    print(f"\nResultados guardados en {args.output}.json y {args.output}.csv")
+
+    if args.baseline is not None:
+        regresiones = comparar_con_linea_base(registros, cargar_linea_base(args.baseline), args.tolerancia_tiempo)
+        print("\n--- REGRESIONES")
+        for mensaje in regresiones:
+            print(mensaje)
+        if regresiones:
+            sys.exit(1)
+        print("Sin regresiones respecto de la línea base.")
@@ -0,0 +1,155 @@
+import numpy as np
+
+# Tolerancia para comparar cargas, capacidades y mejoras
+EPS = 1e-9
+
+
+def indice_ordenado(c):
+    """
+    Precalcula, para cada cliente, los almacenes ordenados de menor a mayor costo.
+
+    Parámetros:
+    - c: Matriz de costos de asignación (n, m).
+
+    Retorna:
+    - orden: Array (n, m) con orden[i, r] = almacén en la posición r del cliente i.
+    - rango: Array (n, m) con rango[i, j] = posición del almacén j para el cliente i.
+    """
+    c = np.asarray(c)
+    n, m = c.shape
+    orden = np.argsort(c, axis=1, kind='stable').astype(np.int32)
+    rango = np.empty_like(orden)
+    rango[np.arange(n)[:, None], orden] = np.arange(m, dtype=np.int32)
+    return orden, rango
+
+
+def costo_single(instancia, abiertos, asignacion) -> float:
+    """
+    Calcula el costo de CFLPsingle.mod de una asignación. Cada cliente sin asignar
+    suma la misma penalización que en evaluador.EvaluadorCFLP.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - abiertos: Array booleano (m,) con los almacenes abiertos.
+    - asignacion: Array (n,) con el almacén asignado a cada cliente (-1 si no está asignado).
+
+    Retorna:
+    - Costo total (apertura + asignación + penalización).
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    completos = asignacion >= 0
+    costo = float(f[abiertos].sum() + c[np.flatnonzero(completos), asignacion[completos]].sum())
+    faltantes = int(c.shape[0] - completos.sum())
+    if faltantes:
+        costo += faltantes * 2.0 * (f.sum() + c.max(axis=1).sum())
+    return costo
+
+
+def busqueda_local_single(instancia, abiertos, asignacion, indice=None, profundidad=10, max_pasadas=50,
+                          cerrar_vacios=True):
+    """
+    Búsqueda local para CFLPsingle.mod con vecindarios shift y swap.
+
+    - shift: mueve un cliente a un almacén abierto más barato con capacidad residual.
+    - swap: intercambia los almacenes de dos clientes si baja el costo y ambas
+      capacidades lo permiten.
+
+    Los candidatos de cada cliente se toman del índice ordenado por costo, solo
+    entre los almacenes más baratos que el actual (como máximo `profundidad`), de
+    modo que cada exploración es barata. Se repiten las pasadas hasta que no haya
+    mejoras. Los clientes sin asignar se ubican primero en su almacén más barato con
+    espacio, abriéndolo si es necesario. Si un cliente no cabe en ningún almacén (ni
+    abriéndolos todos), queda sin asignar: la solución es infactible y su costo lleva
+    la misma penalización por cliente que evaluador.EvaluadorCFLP.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - abiertos: Array booleano (m,) con los almacenes abiertos iniciales.
+    - asignacion: Array (n,) con el almacén de cada cliente (-1 si no está asignado).
+    - indice: Tupla (orden, rango) de indice_ordenado (opcional, se calcula si falta).
+    - profundidad: Número máximo de almacenes más baratos a revisar por cliente.
+    - max_pasadas: Número máximo de pasadas sobre todos los clientes.
+    - cerrar_vacios: Si es True, se cierran los almacenes que quedan sin clientes.
+
+    Retorna:
+    - abiertos: Array booleano (m,) con los almacenes abiertos.
+    - asignacion: Array (n,) con el almacén asignado a cada cliente (-1 si quedó sin asignar).
+    - costo: Costo total de la solución (con penalización si es infactible).
+    - factible: True si todos los clientes quedaron asignados.
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    s = np.asarray(instancia.s, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    n, m = c.shape
+    orden, rango = indice if indice is not None else indice_ordenado(c)
+
+    abiertos = np.array(abiertos, dtype=bool)
+    asignacion = np.array(asignacion, dtype=np.int64)
+    asignados = asignacion >= 0
+    residual = s - np.bincount(asignacion[asignados], weights=demand[asignados], minlength=m)
+
+    # Ubicamos los clientes sin asignar en su almacén más barato con espacio (abriéndolo si hace falta)
+    for i in np.flatnonzero(~asignados).tolist():
+        for abrir in (False, True):
+            candidatos = orden[i][(abiertos[orden[i]] | abrir) & (residual[orden[i]] >= demand[i] - EPS)]
+            if candidatos.size:
+                j = int(candidatos[0])
+                abiertos[j] = True
+                asignacion[i] = j
+                residual[j] -= demand[i]
+                break
+
+    candidatos = orden[:, :profundidad].tolist()
+    demanda = demand.tolist()
+
+    for _ in range(max_pasadas):
+        mejora = False
+
+        # Vecindario shift
+        for i in range(n):
+            j0 = asignacion[i]
+            if j0 < 0:
+                continue
+            for j in candidatos[i][:rango[i, j0]]:
+                if abiertos[j] and residual[j] >= demanda[i] - EPS:
+                    residual[j0] += demanda[i]
+                    residual[j] -= demanda[i]
+                    asignacion[i] = j
+                    mejora = True
+                    break
+
+        # Vecindario swap
+        for i1 in range(n):
+            j1 = asignacion[i1]
+            if j1 < 0:
+                continue
+            for j2 in candidatos[i1][:rango[i1, j1]]:
+                if not abiertos[j2]:
+                    continue
+                miembros = np.flatnonzero(asignacion == j2)
+                if not miembros.size:
+                    continue
+                delta = c[i1, j2] - c[i1, j1] + c[miembros, j1] - c[miembros, j2]
+                cabe = ((residual[j2] + demand[miembros] >= demanda[i1] - EPS)
+                        & (residual[j1] + demanda[i1] >= demand[miembros] - EPS))
+                delta = np.where(cabe, delta, np.inf)
+                k = int(np.argmin(delta))
+                if delta[k] < -EPS:
+                    i2 = int(miembros[k])
+                    residual[j1] += demanda[i1] - demanda[i2]
+                    residual[j2] += demanda[i2] - demanda[i1]
+                    asignacion[i1], asignacion[i2] = j2, j1
+                    mejora = True
+                    break
+
+        if not mejora:
+            break
+
+    if cerrar_vacios:
+        usados = np.zeros(m, dtype=bool)
+        usados[asignacion[asignacion >= 0]] = True
+        abiertos &= usados
+
+    return abiertos, asignacion, costo_single(instancia, abiertos, asignacion), bool((asignacion >= 0).all())
@@ -0,0 +1,156 @@
+import random
+from collections import OrderedDict
+
+import numpy as np
+
+# Memoria aproximada de una entrada sin asignación (objetos de Python y del diccionario)
+BYTES_ENTRADA = 200
+
+
+class CacheEvaluaciones:
+    """
+    Caché de evaluaciones de conjuntos de centros abiertos con desalojo LRU.
+
+    Cada conjunto se codifica de forma canónica como un bitset empaquetado (un bit por
+    centro, en el orden de np.packbits) y se indexa por su hash de Zobrist: el XOR de
+    una clave aleatoria de 64 bits por centro abierto. El hash se actualiza en O(1) al
+    abrir o cerrar un centro, así que el ILS puede consultar el vecino de un swap sin
+    construirlo. El bitset se guarda en la entrada y se compara en cada consulta, de
+    modo que una colisión de hash cuenta como fallo y nunca entrega un costo ajeno.
+
+    Cada entrada guarda el costo total, el costo fijo, el costo de asignación, si la
+    solución es factible y, opcionalmente, la instantánea de la asignación del
+    evaluador (asignación en int32 y clientes divididos), con la que se puede
+    restaurar la solución sin volver a asignar. La memoria ocupada se estima por
+    entrada y, al superar el límite, se desalojan las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, facilities, max_bytes=64 * 2**20, max_entradas=None, semilla=0):
+        """
+        Parámetros:
+        - facilities: Número de centros de la instancia.
+        - max_bytes: Memoria máxima aproximada de las entradas.
+        - max_entradas: Número máximo de entradas (opcional).
+        - semilla: Semilla de las claves de Zobrist.
+        """
+        rng = random.Random(semilla)
+        self.facilities = facilities
+        self.zobrist = [rng.getrandbits(64) for _ in range(facilities)]
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # hash -> (bits, costo, costo_fijo, costo_asignacion, factible, instantanea)
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.colisiones = 0
+        self.desalojos = 0
+        self.rechazos = 0  # Movimientos descartados solo con el costo del caché
+        self.restauraciones = 0  # Evaluaciones desde cero reemplazadas por una instantánea
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def clave(self, mascara):
+        """
+        Calcula la codificación canónica de una máscara de centros abiertos.
+
+        Retorna:
+        - Tupla (hash de Zobrist, bitset empaquetado en bytes).
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        h = 0
+        for j in np.flatnonzero(mascara).tolist():
+            h ^= self.zobrist[j]
+        return h, np.packbits(mascara).tobytes()
+
+    def buscar(self, h, bits):
+        """
+        Busca un conjunto por su hash y su bitset.
+
+        Retorna:
+        - Tupla (costo, costo_fijo, costo_asignacion, factible, instantanea) o None.
+        """
+        entrada = self._entradas.get(h)
+        if entrada is None or entrada[0] != bits:
+            if entrada is not None:
+                self.colisiones += 1
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(h)
+        self.aciertos += 1
+        return entrada[1:6]
+
+    def guardar(self, h, bits, evaluador, instantanea=False):
+        """
+        Guarda la evaluación actual del evaluador para el conjunto (h, bits).
+
+        Si el conjunto ya estaba, se conserva la evaluación de menor costo (la
+        asignación del evaluador depende del camino por el que se llegó al conjunto).
+
+        Parámetros:
+        - h, bits: Clave del conjunto (ver clave).
+        - evaluador: evaluador.EvaluadorCFLP cargado con la solución del conjunto.
+        - instantanea: Si es True se guarda también la asignación para poder restaurarla.
+        """
+        costo = evaluador.costo
+        anterior = self._entradas.get(h)
+        if anterior is not None and anterior[0] == bits:
+            if anterior[1] < costo or (anterior[1] == costo and (anterior[5] is not None or not instantanea)):
+                self._entradas.move_to_end(h)
+                return
+        guardada = None
+        tamano = BYTES_ENTRADA + len(bits)
+        if instantanea:
+            asignacion = evaluador.asignacion.astype(np.int32)
+            partes = dict(evaluador.partes)
+            guardada = (asignacion, partes)
+            tamano += asignacion.nbytes + sum(BYTES_ENTRADA + centros.nbytes + cantidades.nbytes
+                                              for centros, cantidades in partes.values())
+        self._quitar(h)
+        self._entradas[h] = (bits, costo, evaluador.costo_fijo, evaluador.costo_asignacion, evaluador.factible,
+                             guardada, tamano)
+        self.bytes += tamano
+        while self._entradas and (self.bytes > self.max_bytes
+                                  or (self.max_entradas is not None and len(self._entradas) > self.max_entradas)):
+            _, entrada = self._entradas.popitem(last=False)
+            self.bytes -= entrada[6]
+            self.desalojos += 1
+
+    def _quitar(self, h):
+        entrada = self._entradas.pop(h, None)
+        if entrada is not None:
+            self.bytes -= entrada[6]
+
+    def restaurar(self, h, bits, evaluador, mascara):
+        """
+        Carga en el evaluador la asignación guardada del conjunto, si la hay.
+
+        Retorna:
+        - True si se restauró; False si el conjunto no está o no tiene asignación guardada.
+        """
+        entrada = self.buscar(h, bits)
+        if entrada is None or entrada[4] is None:
+            return False
+        asignacion, partes = entrada[4]
+        evaluador.restaurar((mascara, asignacion, partes))
+        self.restauraciones += 1
+        return True
+
+    @property
+    def tasa_aciertos(self) -> float:
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def estadisticas(self):
+        """Retorna un diccionario con los contadores del caché."""
+        return {
+            'entradas': len(self._entradas),
+            'bytes': self.bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.tasa_aciertos,
+            'colisiones': self.colisiones,
+            'desalojos': self.desalojos,
+            'rechazos': self.rechazos,
+            'restauraciones': self.restauraciones,
+        }
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from conversor import leer_instancia_txt
+
+# Directorio por defecto del caché binario (junto a los scripts del proyecto)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_instancias")
+
+# Arrays que componen una instancia en el caché
+ARRAYS = ('s', 'f', 'demand', 'c')
+
+# Instancia CFLP en forma de arrays:
+# - s: Capacidades de los almacenes (m,).
+# - f: Costos fijos de los almacenes (m,).
+# - demand: Demandas de los clientes (n,).
+# - c: Matriz de costos de asignación (n, m), c[i, j] = costo del cliente i en el almacén j.
+# - clave: Hash del archivo de origen con el que se indexa el caché.
+Instancia = namedtuple('Instancia', ['s', 'f', 'demand', 'c', 'clave'])
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyéndolo por bloques.
+
+    Parámetros:
+    - ruta: Ruta al archivo.
+    - bloque: Tamaño de cada bloque de lectura en bytes.
+
+    Retorna:
+    - Hash hexadecimal del archivo.
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for trozo in iter(lambda: archivo.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def leer_instancia_dat(dat_path):
+    """
+    Lee un archivo .dat generado por conversor.py y retorna sus arrays.
+
+    Parámetros:
+    - dat_path: Ruta al archivo .dat.
+
+    Retorna:
+    - Tupla (s, f, demand, c) de arrays de NumPy.
+    """
+    with open(dat_path, 'r') as archivo:
+        tokens = archivo.read().replace(';', ' ; ').split()
+
+    C, D = [], []
+    params = {}
+    k = 0
+    while k < len(tokens):
+        token = tokens[k]
+        if token == 'set':
+            nombre = tokens[k + 1]
+            k += 3  # 'set', nombre, ':='
+            elementos = C if nombre == 'C' else D
+            while tokens[k] != ';':
+                elementos.append(tokens[k])
+                k += 1
+        elif token == 'param' and tokens[k + 2] == ':':
+            # Parámetro en forma de tabla: param c : j1 j2 ... := i1 v11 v12 ...
+            nombre = tokens[k + 1]
+            k += 3
+            columnas = []
+            while tokens[k] != ':=':
+                columnas.append(tokens[k])
+                k += 1
+            k += 1
+            filas = []
+            while tokens[k] != ';':
+                filas.append(tokens[k + 1:k + 1 + len(columnas)])
+                k += 1 + len(columnas)
+            params[nombre] = np.array(filas, dtype=np.float64)
+        elif token == 'param':
+            nombre = tokens[k + 1]
+            k += 3  # 'param', nombre, ':='
+            valores = []
+            while tokens[k] != ';':
+                valores.append(tokens[k + 1])
+                k += 2
+            params[nombre] = np.array(valores, dtype=np.float64)
+        k += 1
+
+    m, n = len(C), len(D)
+    c = params['c'].reshape(n, m)
+    return params['s'], params['f'], params['demand'], c
+
+
+def leer_instancia(ruta):
+    """
+    Lee una instancia desde un .txt (OR Library) o un .dat (conversor.py).
+
+    Parámetros:
+    - ruta: Ruta al archivo de la instancia.
+
+    Retorna:
+    - Tupla (s, f, demand, c) de arrays de NumPy.
+    """
+    if os.path.splitext(ruta)[1].lower() == '.dat':
+        return leer_instancia_dat(ruta)
+
+    m, n, almacenes, clientes = leer_instancia_txt(ruta)
+    almacenes = np.array(almacenes, dtype=np.float64).reshape(m, 2)
+    demand = np.fromiter((demanda for demanda, _ in clientes), dtype=np.float64, count=n)
+    c = np.array([costos[:m] for _, costos in clientes], dtype=np.float64).reshape(n, m)
+    return almacenes[:, 0].copy(), almacenes[:, 1].copy(), demand, c
+
+
+def _leer_indice(cache_dir):
+    ruta = os.path.join(cache_dir, 'indice.json')
+    try:
+        with open(ruta, 'r') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_indice(cache_dir, indice):
+    ruta = os.path.join(cache_dir, 'indice.json')
+    tmp = ruta + f'.{os.getpid()}.tmp'
+    with open(tmp, 'w') as archivo:
+        json.dump(indice, archivo, indent=1)
+    os.replace(tmp, ruta)
+
+
+def _clave_archivo(ruta, cache_dir):
+    """
+    Obtiene la clave (hash) de un archivo, reutilizando el índice del caché
+    si el tamaño y la fecha de modificación no cambiaron.
+    """
+    ruta_abs = os.path.abspath(ruta)
+    stat = os.stat(ruta_abs)
+    indice = _leer_indice(cache_dir)
+    entrada = indice.get(ruta_abs)
+    if entrada and entrada['mtime_ns'] == stat.st_mtime_ns and entrada['size'] == stat.st_size:
+        return entrada['clave'], indice, None
+
+    clave = hash_archivo(ruta_abs)
+    anterior = entrada['clave'] if entrada else None
+    indice[ruta_abs] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'clave': clave}
+    return clave, indice, anterior
+
+
+def _abrir_entrada(directorio, clave, mmap=True):
+    modo = 'r' if mmap else None
+    arrays = [np.load(os.path.join(directorio, f'{nombre}.npy'), mmap_mode=modo) for nombre in ARRAYS]
+    return Instancia(*arrays, clave)
+
+
+def cargar_instancia(ruta, cache_dir=CACHE_DIR, mmap=True):
+    """
+    Carga una instancia como arrays de NumPy usando un caché binario en disco.
+
+    La primera vez se parsea el archivo y se guardan los arrays en formato .npy
+    bajo una carpeta con el hash del archivo. Las siguientes cargas abren los
+    arrays como memoria mapeada, sin parsear ni copiar. Si el archivo cambia,
+    su hash cambia y la entrada anterior se descarta automáticamente.
+
+    Parámetros:
+    - ruta: Ruta al archivo .txt o .dat de la instancia.
+    - cache_dir: Directorio del caché (por defecto, .cache_instancias).
+    - mmap: Si es True, los arrays se abren como memoria mapeada de solo lectura.
+
+    Retorna:
+    - Instancia con los arrays s, f, demand, c y la clave del archivo.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    clave, indice, anterior = _clave_archivo(ruta, cache_dir)
+    directorio = os.path.join(cache_dir, clave[:32])
+
+    if not os.path.exists(os.path.join(directorio, 'meta.json')):
+        s, f, demand, c = leer_instancia(ruta)
+
+        # Escribimos en un directorio temporal y lo renombramos para que sea atómico
+        tmp = directorio + f'.{os.getpid()}.tmp'
+        os.makedirs(tmp, exist_ok=True)
+        for nombre, array in zip(ARRAYS, (s, f, demand, c)):
+            np.save(os.path.join(tmp, f'{nombre}.npy'), np.ascontiguousarray(array, dtype=np.float64))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as archivo:
+            json.dump({'origen': os.path.abspath(ruta), 'clave': clave,
+                       'm': int(s.shape[0]), 'n': int(demand.shape[0])}, archivo)
+        try:
+            os.rename(tmp, directorio)
+        except OSError:
+            # Otro proceso generó la misma entrada primero
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if anterior is not None and anterior != clave:
+        # El archivo cambió: eliminamos la entrada obsoleta si nadie más la usa
+        if all(e['clave'] != anterior for e in indice.values()):
+            shutil.rmtree(os.path.join(cache_dir, anterior[:32]), ignore_errors=True)
+    _escribir_indice(cache_dir, indice)
+
+    return _abrir_entrada(directorio, clave, mmap)
+
+
+def cap_cost_array(instancia):
+    """
+    Construye el array de capacidades y costos fijos que usa la heurística ILS.
+
+    Parámetros:
+    - instancia: Instancia cargada con cargar_instancia.
+
+    Retorna:
+    - Array (m, 2) con la capacidad en la columna 0 y el costo fijo en la columna 1.
+    """
+    return np.column_stack((instancia.s, instancia.f))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Genera (o reutiliza) el caché binario de una instancia OR Library.")
+    parser.add_argument('-i', '--input', type=str, required=True, help="Ruta al archivo .txt o .dat de la instancia.")
+    parser.add_argument('--cache', type=str, default=CACHE_DIR, help="Directorio del caché.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: El archivo de entrada '{args.input}' no existe.")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    instancia = cargar_instancia(args.input, args.cache)
+    print(f"Instancia cargada en {time.perf_counter() - inicio:.4f} s: "
+          f"m={instancia.s.shape[0]}, n={instancia.demand.shape[0]}, clave={instancia.clave[:12]}")
@@ -1,99 +1,341 @@
+import glob
+import json
+import multiprocessing as mp
 import os
+import shutil
 import sys
+import time
 
-def convertir_txt_a_dat_mod(txt_path, dat_path):
+def leer_instancia_txt(txt_path):
+    """
+    Lee un archivo .txt en formato OR Library.
+
+    Parámetros:
+    - txt_path: Ruta al archivo .txt de entrada.
+
+    Retorna:
+    - m: Número de almacenes.
+    - n: Número de clientes.
+    - almacenes: Lista de tuplas (capacidad, costo_fijo).
+    - clientes: Lista de tuplas (demanda, lista de costos de asignación).
+    """
+    with open(txt_path, 'r') as file:
+        lines = file.readlines()
+
+    idx = 0  # Índice para recorrer las líneas
+    total_lines = len(lines)
+
+    def line_gen():
+        nonlocal idx
+        while idx < total_lines:
+            line = lines[idx].strip()
+            idx += 1
+            if line:  # Saltar líneas vacías
+                yield line
+
+    generator = line_gen()
+
+    # Leer m y n
+    first_line = next(generator)
+    m, n = map(int, first_line.split())
+    print(f"Instancia encontrada: m={m}, n={n}")
+
+    almacenes = []
+    for _ in range(m):
+        line = next(generator)
+        capacidad, costo_fijo = map(float, line.split())
+        almacenes.append((capacidad, costo_fijo))
+
+    primera = next(generator)
+    segunda = next(generator) if n > 1 else None
+    lineas = (linea for fuente in ([primera] + ([segunda] if segunda is not None else []), generator)
+              for linea in fuente)
+    clientes = []
+    if es_por_bloques(primera, segunda, m):
+        demandas = list(map(float, _valores(lineas, n)))
+        for demanda in demandas:
+            clientes.append((demanda, list(map(float, _valores(lineas, m)))))
+        return m, n, almacenes, clientes
+
+    for _ in range(n):
+        demanda = float(next(lineas))
+        costos = []
+        while len(costos) < m:
+            costos.extend(map(float, next(lineas).split()))
+        clientes.append((demanda, costos))
+
+    return m, n, almacenes, clientes
+
+
+def es_por_bloques(primera, segunda, m):
+    """
+    Reconoce el formato de la sección de clientes a partir de sus dos primeras líneas.
+
+    En el formato intercalado (capX, 500x500) a la demanda de un cliente le sigue una
+    línea de costos; en el formato por bloques (5000x500) las demandas van todas juntas
+    antes de las filas de costos.
+
+    Retorna:
+    - True si el formato es por bloques.
+    """
+    if len(primera.split()) > 1:
+        return True
+    return m > 1 and segunda is not None and len(segunda.split()) == 1
+
+def _lineas(archivo):
+    """Genera las líneas no vacías de un archivo abierto, sin espacios en los extremos."""
+    for line in archivo:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _valores(lineas, cantidad, primera=None):
+    """
+    Lee exactamente `cantidad` números desde el generador de líneas, sin importar
+    cuántos haya en cada línea. `primera` es una línea ya leída (opcional).
+    """
+    valores = [] if primera is None else primera.split()
+    while len(valores) < cantidad:
+        valores.extend(next(lineas).split())
+    if len(valores) != cantidad:
+        raise ValueError(f"se esperaban {cantidad} valores y la línea tiene {len(valores)}")
+    return [repr(float(v)) for v in valores]
+
+
+def convertir_txt_a_dat_mod(txt_path, dat_path, verbose=True):
     """
     Convierte un archivo .txt en formato OR Library a un archivo .dat compatible con el nuevo CFLP.mod.
+
+    La conversión es por streaming: la entrada se lee línea a línea y cada fila de
+    costos se escribe apenas se lee, así que en memoria solo quedan los m almacenes y
+    las n demandas. Se reconocen los dos formatos de instancias del proyecto:
+    - Intercalado (capX, 500x500): por cada cliente, su demanda en una línea y luego sus
+      m costos, en una o varias líneas.
+    - Por bloques (5000x500): las n demandas primero y después las n filas de costos.
+
+    El .dat se escribe en un archivo temporal y se renombra al terminar, de modo que
+    nunca queda un .dat a medio escribir.
+
+    Parámetros:
+    - txt_path: Ruta al archivo .txt de entrada.
+    - dat_path: Ruta al archivo .dat de salida.
+    - verbose: Si es True se imprime el progreso.
+
+    Retorna:
+    - True si la conversión terminó bien; False si hubo un error.
     """
+    tmp = dat_path + f'.{os.getpid()}.tmp'
+    tmp_costos = tmp + '.c'
     try:
-        with open(txt_path, 'r') as file:
-            lines = file.readlines()
-        
-        idx = 0  # Índice para recorrer las líneas
-        total_lines = len(lines)
-        
-        def line_gen():
-            nonlocal idx
-            while idx < total_lines:
-                line = lines[idx].strip()
-                idx += 1
-                if line:  # Saltar líneas vacías
-                    yield line
-        
-        generator = line_gen()
-        
-        # Leer m y n
-        first_line = next(generator)
-        m, n = map(int, first_line.split())
-        print(f"Instancia encontrada: m={m}, n={n}")
-        
-        almacenes = []
-        for _ in range(m):
-            line = next(generator)
-            capacidad, costo_fijo = map(float, line.split())
-            almacenes.append((capacidad, costo_fijo))
-        
-        clientes = []
-        for _ in range(n):
-            demanda = float(next(generator))
-            costos = []
-            while len(costos) < m:
-                costos.extend(map(float, next(generator).split()))
-            clientes.append((demanda, costos))
-        
-        with open(dat_path, 'w') as dat_file:
-            # Definir conjuntos
-            C = ' '.join([f"j{j+1}" for j in range(m)])
-            D = ' '.join([f"i{i+1}" for i in range(n)])
-            dat_file.write(f"set C := {C};\n")
-            dat_file.write(f"set D := {D};\n\n")
-            
-            # Capacidad de almacenes
-            dat_file.write("param s :=\n")
-            for j in range(m):
-                dat_file.write(f"j{j+1} {almacenes[j][0]}\n")
-            dat_file.write(";\n\n")
-            
-            # Costo fijo de almacenes
-            dat_file.write("param f :=\n")
-            for j in range(m):
-                dat_file.write(f"j{j+1} {almacenes[j][1]}\n")
-            dat_file.write(";\n\n")
-            
-            # Demanda de clientes
-            dat_file.write("param demand :=\n")
-            for i in range(n):
-                dat_file.write(f"i{i+1} {clientes[i][0]}\n")
-            dat_file.write(";\n\n")
-            
-            # Costos de asignación
-            dat_file.write("param c : ")
-            dat_file.write(' '.join([f"j{j+1}" for j in range(m)]))
-            dat_file.write(" :=\n")
-            for i in range(n):
-                dat_file.write(f"i{i+1} {' '.join(map(str, clientes[i][1]))}\n")
-            dat_file.write(";\n")
-        
-        print(f"Archivo {dat_path} generado exitosamente.")
+        with open(txt_path, 'r') as entrada:
+            lineas = _lineas(entrada)
+            m, n = map(int, next(lineas).split())
+            if verbose:
+                print(f"Instancia encontrada: m={m}, n={n}")
+            almacenes = [_valores(lineas, 2) for _ in range(m)]
+
+            with open(tmp, 'w') as dat_file:
+                # Definir conjuntos
+                C = ' '.join([f"j{j+1}" for j in range(m)])
+                D = ' '.join([f"i{i+1}" for i in range(n)])
+                dat_file.write(f"set C := {C};\n")
+                dat_file.write(f"set D := {D};\n\n")
+
+                # Capacidad de almacenes
+                dat_file.write("param s :=\n")
+                for j in range(m):
+                    dat_file.write(f"j{j+1} {almacenes[j][0]}\n")
+                dat_file.write(";\n\n")
+
+                # Costo fijo de almacenes
+                dat_file.write("param f :=\n")
+                for j in range(m):
+                    dat_file.write(f"j{j+1} {almacenes[j][1]}\n")
+                dat_file.write(";\n\n")
+
+                # El formato se reconoce por las dos primeras líneas de clientes
+                primera = next(lineas)
+                segunda = next(lineas) if n > 1 else None
+                if es_por_bloques(primera, segunda, m):
+                    pendientes = iter([primera] + ([segunda] if segunda is not None else []))
+                    lineas_demanda = (linea for fuente in (pendientes, lineas) for linea in fuente)
+                    demandas = _valores(lineas_demanda, n)
+                    costos = _filas_costos(lineas_demanda, n, m)
+                    _escribir_demanda(dat_file, demandas)
+                    _escribir_costos(dat_file, costos, m)
+                else:
+                    # La demanda de cada cliente llega junto a sus costos: las filas de
+                    # costos van a un archivo auxiliar y se copian después de la demanda
+                    demandas = []
+                    with open(tmp_costos, 'w') as auxiliar:
+                        linea = primera
+                        for i in range(n):
+                            if i:
+                                linea = next(lineas)
+                            demandas.extend(_valores(lineas, 1, linea))
+                            siguiente = segunda if i == 0 else None
+                            auxiliar.write(f"i{i+1} {' '.join(_valores(lineas, m, siguiente))}\n")
+                    _escribir_demanda(dat_file, demandas)
+                    dat_file.write("param c : ")
+                    dat_file.write(' '.join([f"j{j+1}" for j in range(m)]))
+                    dat_file.write(" :=\n")
+                    with open(tmp_costos, 'r') as auxiliar:
+                        shutil.copyfileobj(auxiliar, dat_file, 1 << 20)
+                    dat_file.write(";\n")
+        os.replace(tmp, dat_path)
+
+        if verbose:
+            print(f"Archivo {dat_path} generado exitosamente.")
+        return True
     except Exception as e:
-        print(f"Error durante la conversión: {e}")
+        print(f"Error durante la conversión de {txt_path}: {e}")
+        return False
+    finally:
+        for ruta in (tmp, tmp_costos):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def _filas_costos(lineas, n, m):
+    """Genera las n filas de m costos del formato por bloques."""
+    for _ in range(n):
+        yield _valores(lineas, m)
+
+
+def _escribir_demanda(dat_file, demandas):
+    # Demanda de clientes
+    dat_file.write("param demand :=\n")
+    for i, demanda in enumerate(demandas):
+        dat_file.write(f"i{i+1} {demanda}\n")
+    dat_file.write(";\n\n")
+
+
+def _escribir_costos(dat_file, filas, m):
+    # Costos de asignación
+    dat_file.write("param c : ")
+    dat_file.write(' '.join([f"j{j+1}" for j in range(m)]))
+    dat_file.write(" :=\n")
+    for i, costos in enumerate(filas):
+        dat_file.write(f"i{i+1} {' '.join(costos)}\n")
+    dat_file.write(";\n")
+
+
+def _indice_lote(output_dir):
+    ruta = os.path.join(output_dir, '.conversor.json')
+    try:
+        with open(ruta, 'r') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def expandir_entradas(patrones):
+    """
+    Expande una lista de archivos, directorios y patrones glob a las rutas .txt que
+    contienen (sin repetir y en orden).
+    """
+    rutas = []
+    for patron in patrones:
+        if os.path.isdir(patron):
+            candidatos = sorted(glob.glob(os.path.join(patron, '*.txt')))
+        else:
+            candidatos = sorted(glob.glob(patron)) or [patron]
+        for ruta in candidatos:
+            if ruta not in rutas:
+                rutas.append(ruta)
+    return rutas
+
+
+def _convertir_tarea(tarea):
+    txt_path, dat_path = tarea
+    inicio = time.perf_counter()
+    ok = convertir_txt_a_dat_mod(txt_path, dat_path, verbose=False)
+    return txt_path, dat_path, ok, time.perf_counter() - inicio
+
+
+def convertir_lote(patrones, output_dir="datos_dat", trabajadores=None, comparar='mtime', forzar=False):
+    """
+    Convierte en paralelo todas las instancias .txt de los directorios o patrones dados.
+
+    Las salidas al día se omiten. Con comparar='mtime' un .dat está al día si es más
+    nuevo que su .txt; con comparar='hash' se compara el SHA-256 del .txt con el de la
+    última conversión, guardado en output_dir/.conversor.json (útil cuando las fechas
+    no son confiables, por ejemplo tras un checkout).
+
+    Parámetros:
+    - patrones: Lista de archivos .txt, directorios o patrones glob.
+    - output_dir: Directorio de salida de los .dat.
+    - trabajadores: Número de procesos (por defecto, el número de núcleos).
+    - comparar: 'mtime' o 'hash'.
+    - forzar: Si es True se convierten todas las entradas.
+
+    Retorna:
+    - Lista de tuplas (txt, dat, estado, segundos) con estado 'convertido', 'al día' o 'error'.
+    """
+    from cache_instancias import hash_archivo
+
+    os.makedirs(output_dir, exist_ok=True)
+    indice = _indice_lote(output_dir)
+    resultados, tareas, hashes = [], [], {}
+    for txt_path in expandir_entradas(patrones):
+        nombre = os.path.splitext(os.path.basename(txt_path))[0]
+        dat_path = os.path.join(output_dir, f"{nombre}.dat")
+        al_dia = False
+        if not forzar and os.path.exists(dat_path):
+            if comparar == 'hash':
+                hashes[dat_path] = hash_archivo(txt_path)
+                al_dia = indice.get(os.path.basename(dat_path)) == hashes[dat_path]
+            else:
+                al_dia = os.path.getmtime(dat_path) >= os.path.getmtime(txt_path)
+        if al_dia:
+            resultados.append((txt_path, dat_path, 'al día', 0.0))
+        else:
+            tareas.append((txt_path, dat_path))
+
+    if tareas:
+        trabajadores = min(trabajadores or os.cpu_count() or 1, len(tareas))
+        # Las instancias más grandes primero para repartir mejor la carga
+        tareas.sort(key=lambda t: os.path.getsize(t[0]), reverse=True)
+        with mp.Pool(trabajadores) as pool:
+            for txt_path, dat_path, ok, segundos in pool.imap_unordered(_convertir_tarea, tareas):
+                resultados.append((txt_path, dat_path, 'convertido' if ok else 'error', segundos))
+                if ok:
+                    indice[os.path.basename(dat_path)] = hashes.get(dat_path) or hash_archivo(txt_path)
+
+    ruta_indice = os.path.join(output_dir, '.conversor.json')
+    with open(ruta_indice + '.tmp', 'w') as archivo:
+        json.dump(indice, archivo, indent=1)
+    os.replace(ruta_indice + '.tmp', ruta_indice)
+    return resultados
+
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Convertidor de archivos OR Library .txt a .dat para CFLP.mod.")
-    parser.add_argument('-i', '--input', type=str, required=True, help="Ruta al archivo .txt de entrada.")
+    parser.add_argument('-i', '--input', type=str, nargs='+', required=True,
+                        help="Archivos .txt, directorios (p. ej. instancias/) o patrones glob de entrada.")
+    parser.add_argument('-o', '--output-dir', type=str, default="datos_dat", help="Directorio de salida de los .dat.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Número de procesos (por defecto, núcleos disponibles).")
+    parser.add_argument('--comparar', choices=('mtime', 'hash'), default='mtime',
+                        help="Criterio para omitir salidas al día: fecha de modificación o hash del .txt.")
+    parser.add_argument('--force', action='store_true', help="Convertir aunque la salida esté al día.")
     args = parser.parse_args()
 
-    if not os.path.exists(args.input):
-        print(f"Error: El archivo de entrada '{args.input}' no existe.")
+    entradas = expandir_entradas(args.input)
+    faltantes = [ruta for ruta in entradas if not os.path.exists(ruta)]
+    if faltantes:
+        print(f"Error: El archivo de entrada '{faltantes[0]}' no existe.")
         sys.exit(1)
 
-    output_dir = "datos_dat"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    input_filename = os.path.splitext(os.path.basename(args.input))[0]
-    dat_path = os.path.join(output_dir, f"{input_filename}.dat")
-
-    convertir_txt_a_dat_mod(args.input, dat_path)
+    inicio = time.perf_counter()
+    resultados = convertir_lote(entradas, args.output_dir, args.workers, args.comparar, args.force)
+    for txt_path, dat_path, estado, segundos in sorted(resultados):
+        print(f"{txt_path:<30} -> {dat_path:<30} {estado:<11} {segundos:8.2f} s")
+    convertidos = sum(estado == 'convertido' for *_, estado, _ in resultados)
+    errores = sum(estado == 'error' for *_, estado, _ in resultados)
+    print(f"{convertidos} convertidos, {len(resultados) - convertidos - errores} al día, {errores} con error "
+          f"en {time.perf_counter() - inicio:.2f} s")
+    if errores:
+        sys.exit(1)
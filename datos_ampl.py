@@ -0,0 +1,158 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+def nombres_conjuntos(instancia):
+    """
+    Genera los nombres de los conjuntos C y D con la misma convención que conversor.py.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+
+    Retorna:
+    - C: Lista de nombres de almacenes ('j1', 'j2', ...).
+    - D: Lista de nombres de clientes ('i1', 'i2', ...).
+    """
+    C = [f"j{j+1}" for j in range(instancia.s.shape[0])]
+    D = [f"i{i+1}" for i in range(instancia.demand.shape[0])]
+    return C, D
+
+
+def cargar_datos_ampl(ampl, instancia):
+    """
+    Carga los conjuntos y parámetros de una instancia en AMPL directamente desde
+    los arrays de NumPy, sin pasar por un archivo .dat de texto.
+
+    Parámetros:
+    - ampl: Objeto AMPL con el modelo ya leído.
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+
+    Retorna:
+    - C: Lista de nombres de almacenes.
+    - D: Lista de nombres de clientes.
+    """
+    C, D = nombres_conjuntos(instancia)
+    ampl.getSet('C').setValues(C)
+    ampl.getSet('D').setValues(D)
+
+    ampl.getParameter('s').setValues(dict(zip(C, instancia.s.tolist())))
+    ampl.getParameter('f').setValues(dict(zip(C, instancia.f.tolist())))
+    ampl.getParameter('demand').setValues(dict(zip(D, instancia.demand.tolist())))
+
+    # La matriz de costos se envía en una sola llamada como tabla larga (i, j) -> c
+    indice = pd.MultiIndex.from_product([D, C], names=['D', 'C'])
+    ampl.setData(pd.DataFrame({'c': np.asarray(instancia.c).ravel()}, index=indice))
+    return C, D
+
+
+def fijar_arranque(ampl, C, D, abiertos, x_inicial, fijar=True):
+    """
+    Establece en bloque los valores iniciales de y y x en AMPL.
+
+    Parámetros:
+    - ampl: Objeto AMPL con el modelo y los datos cargados.
+    - C: Lista de nombres de almacenes.
+    - D: Lista de nombres de clientes.
+    - abiertos: Array booleano (m,) con los almacenes abiertos.
+    - x_inicial: Array (n, m) con los valores iniciales de x.
+    - fijar: Si es True, las variables y quedan fijas en los valores dados.
+    """
+    abiertos = np.asarray(abiertos, dtype=bool)
+    ampl.getVariable('y').setValues(dict(zip(C, abiertos.astype(float).tolist())))
+
+    indice = pd.MultiIndex.from_product([D, C], names=['D', 'C'])
+    ampl.getVariable('x').setValues(pd.DataFrame({'x': np.asarray(x_inicial, dtype=float).ravel()}, index=indice))
+
+    if fijar:
+        # Fijamos todas las y en sus valores actuales con una sola instrucción
+        ampl.eval('fix y;')
+
+
+def fijar_preproceso(ampl, instancia, C, D, preproceso, single_source=False):
+    """
+    Aplica en AMPL las fijaciones de preproceso.py sin modificar el .mod: fija en 0 las y
+    cerradas y las x eliminadas y en 1 las y abiertas, y declara las cotas de x (solo
+    CFLP.mod) y las restricciones de dominancia como conjuntos y restricciones nuevas.
+
+    Parámetros:
+    - ampl: Objeto AMPL con el modelo y los datos cargados.
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - C: Lista de nombres de almacenes.
+    - D: Lista de nombres de clientes.
+    - preproceso: preproceso.Preproceso.
+    - single_source: Si es True el modelo es CFLPsingle.mod (x binaria, sin cotas que agregar).
+    """
+    C = np.asarray(C, dtype=object)
+    D = np.asarray(D, dtype=object)
+    ampl.eval('set CerradosPreproceso within C; set AbiertosPreproceso within C;'
+              'set ParesEliminados within {D, C}; set Dominancia within {C, C};'
+              'subject to DominanciaPreproceso {(j, k) in Dominancia}: y[j] <= y[k];')
+    ampl.getSet('CerradosPreproceso').setValues(C[preproceso.y_sup < 0.5].tolist())
+    ampl.getSet('AbiertosPreproceso').setValues(C[preproceso.y_inf > 0.5].tolist())
+    filas, columnas = np.nonzero(preproceso.x_sup == 0)
+    ampl.getSet('ParesEliminados').setValues(list(zip(D[filas].tolist(), C[columnas].tolist())))
+    ampl.getSet('Dominancia').setValues([tuple(par) for par in C[preproceso.dominancia].tolist()])
+
+    if not single_source:
+        # Solo las cotas más ajustadas que min(demand[i], s[j]), en una tabla larga (i, j) -> cota
+        trivial = np.minimum(np.asarray(instancia.demand)[:, None], np.asarray(instancia.s)[None, :])
+        filas, columnas = np.nonzero((preproceso.x_sup > 0) & (preproceso.x_sup < trivial))
+        ampl.eval('set ParesAcotados within {D, C}; param cota_x {ParesAcotados} >= 0;'
+                  'subject to CotaPreproceso {(i, j) in ParesAcotados}: x[i, j] <= cota_x[i, j];')
+        indice = pd.MultiIndex.from_arrays([D[filas], C[columnas]], names=['D', 'C'])
+        ampl.setData(pd.DataFrame({'cota_x': preproceso.x_sup[filas, columnas]}, index=indice), 'ParesAcotados')
+
+    ampl.eval('fix {j in CerradosPreproceso} y[j] := 0; fix {j in AbiertosPreproceso} y[j] := 1;'
+              'fix {(i, j) in ParesEliminados} x[i, j] := 0;')
+
+class Cronometro:
+    """
+    Registra el tiempo de cada fase del flujo y muestra un resumen al final.
+
+    Con memoria=True también registra el pico de memoria de Python (tracemalloc) de
+    cada fase. Las reservas internas de los solvers (HiGHS, Gurobi) no se cuentan.
+    Con una instrumentacion.Instrumentacion, cada fase cerrada se emite como evento.
+    """
+
+    def __init__(self, memoria=False, instrumentacion=None):
+        self.tiempos = {}
+        self.instrumentacion = instrumentacion
+        self.memoria = {} if memoria else None
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._inicio = time.perf_counter()
+        self._fase = None
+
+    def fase(self, nombre):
+        """Cierra la fase actual (si la hay) y comienza una nueva."""
+        ahora = time.perf_counter()
+        if self._fase is not None:
+            self.tiempos[self._fase] = self.tiempos.get(self._fase, 0.0) + ahora - self._inicio
+            if self.instrumentacion is not None:
+                self.instrumentacion.fase(self._fase, ahora - self._inicio)
+            if self.memoria is not None:
+                pico = tracemalloc.get_traced_memory()[1]
+                self.memoria[self._fase] = max(self.memoria.get(self._fase, 0), pico)
+        if self.memoria is not None:
+            tracemalloc.reset_peak()
+        self._fase = nombre
+        self._inicio = time.perf_counter()
+
+    def detener(self):
+        """Cierra la fase actual."""
+        self.fase(None)
+        return self.tiempos
+
+    def resumen(self):
+        """Imprime el tiempo de cada fase y su porcentaje del total."""
+        total = sum(self.tiempos.values()) or 1.0
+        print("\n--- TIEMPOS")
+        for nombre, segundos in self.tiempos.items():
+            linea = f"{nombre:<20} {segundos:10.4f} s {100 * segundos / total:6.1f} %"
+            if self.memoria is not None:
+                linea += f" {self.memoria.get(nombre, 0) / 2**20:10.2f} MiB"
+            print(linea)
+        print(f"{'total':<20} {total:10.4f} s")
@@ -0,0 +1,512 @@
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from ILS import iterated_local_search
+from busqueda_local_single import busqueda_local_single, indice_ordenado
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import CACHE_DIR, Instancia, cargar_instancia, cap_cost_array
+from evaluador import DIVIDIDO, EPS, SIN_ASIGNAR, EvaluadorCFLP
+from modelo_matricial import construir_modelo, extraer_solucion, resolver_highs, vector_inicial
+from vecindario import Vecindario
+
+# Métodos para resolver cada región (y la instancia completa en la comparación):
+# - heuristica: ILS con caché de evaluaciones (más búsqueda local en CFLPsingle.mod).
+# - exacto: la heurística como arranque y luego el modelo completo de la región con HiGHS.
+METODOS = ('heuristica', 'exacto')
+
+# Almacenes por región cuando no se indica el número de regiones
+ALMACENES_POR_REGION = 25
+
+# Holgura mínima de capacidad que conserva cada región al repartir los clientes
+# (menor si la instancia completa no la tiene)
+HOLGURA_CAPACIDAD = 0.1
+
+# Partición de la instancia en regiones:
+# - almacenes: Array (m,) con la región de cada almacén.
+# - clientes: Array (n,) con la región de cada cliente.
+# - medoides: Array (R,) con el almacén medoide de cada región.
+Particion = namedtuple('Particion', ['almacenes', 'clientes', 'medoides'])
+
+
+def k_medoides(distancias, k, semilla=0, max_iteraciones=100):
+    """
+    Agrupa puntos en k grupos con k-medoids (inicialización k-medoids++ y
+    alternancia entre asignar cada punto a su medoide y elegir como medoide el punto
+    de menor distancia total dentro de su grupo).
+
+    Parámetros:
+    - distancias: Matriz (m, m) de distancias entre los puntos.
+    - k: Número de grupos.
+    - semilla: Semilla de la inicialización.
+    - max_iteraciones: Número máximo de iteraciones.
+
+    Retorna:
+    - medoides: Array (k,) con el índice del medoide de cada grupo.
+    - etiquetas: Array (m,) con el grupo de cada punto.
+    """
+    m = distancias.shape[0]
+    rng = np.random.default_rng(semilla)
+    medoides = [int(rng.integers(m))]
+    cercania = distancias[medoides[0]].copy()
+    for _ in range(1, k):
+        pesos = cercania ** 2
+        pesos[medoides] = 0.0
+        if pesos.sum() > 0:
+            nuevo = int(rng.choice(m, p=pesos / pesos.sum()))
+        else:
+            nuevo = int(rng.choice(np.setdiff1d(np.arange(m), medoides)))
+        medoides.append(nuevo)
+        cercania = np.minimum(cercania, distancias[nuevo])
+    medoides = np.array(medoides)
+
+    for _ in range(max_iteraciones):
+        etiquetas = np.argmin(distancias[:, medoides], axis=1)
+        # Un medoide siempre pertenece a su grupo (aunque otro esté a la misma distancia)
+        etiquetas[medoides] = np.arange(k)
+        nuevos = medoides.copy()
+        for r in range(k):
+            miembros = np.flatnonzero(etiquetas == r)
+            nuevos[r] = miembros[np.argmin(distancias[np.ix_(miembros, miembros)].sum(axis=1))]
+        if np.array_equal(nuevos, medoides):
+            break
+        medoides = nuevos
+    etiquetas = np.argmin(distancias[:, medoides], axis=1)
+    etiquetas[medoides] = np.arange(k)
+    return medoides, etiquetas
+
+
+def particionar(instancia, regiones, semilla=0):
+    """
+    Divide almacenes y clientes en regiones a partir de la matriz de costos.
+
+    Los almacenes se agrupan con k-medoids sobre las columnas de c (dos almacenes
+    son cercanos si atienden a los mismos clientes con costos parecidos). Cada cliente
+    va a la región con el almacén más barato para él y, después, los clientes de las
+    regiones con demanda de más pasan a la región vecina que menos encarece su
+    atención, hasta que cada región conserve al menos HOLGURA_CAPACIDAD de su
+    capacidad libre (o la holgura de la instancia completa, si es menor).
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - regiones: Número de regiones.
+    - semilla: Semilla de k-medoids.
+
+    Retorna:
+    - Particion.
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    s = np.asarray(instancia.s, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    n, m = c.shape
+    regiones = min(regiones, m)
+
+    # Distancias euclidianas entre columnas de c, con el producto de Gram
+    gram = c.T @ c
+    normas = np.diag(gram)
+    distancias = np.sqrt(np.maximum(normas[:, None] + normas[None, :] - 2.0 * gram, 0.0))
+    medoides, almacenes = k_medoides(distancias, regiones, semilla)
+
+    # Costo de cada cliente en su almacén más barato de cada región
+    costo_region = np.column_stack([c[:, almacenes == r].min(axis=1) for r in range(regiones)])
+    clientes = np.argmin(costo_region, axis=1)
+
+    capacidad = np.bincount(almacenes, weights=s, minlength=regiones)
+    utilizacion = max(demand.sum() / s.sum(), 1.0 - HOLGURA_CAPACIDAD)
+    limite = capacidad * min(utilizacion, 1.0)
+    carga = np.bincount(clientes, weights=demand, minlength=regiones)
+    for _ in range(n):
+        exceso = carga - limite
+        r = int(np.argmax(exceso))
+        if exceso[r] <= EPS:
+            break
+        # Movemos el cliente que menos encarece su atención a una región donde quepa
+        miembros = np.flatnonzero(clientes == r)
+        delta = costo_region[miembros] - costo_region[miembros, r][:, None]
+        cabe = (demand[miembros][:, None] <= (limite - carga)[None, :] + EPS)
+        delta = np.where(cabe, delta, np.inf)
+        delta[:, r] = np.inf
+        k = int(np.argmin(delta))
+        if not np.isfinite(delta.flat[k]):
+            break
+        i, destino = miembros[k // regiones], k % regiones
+        clientes[i] = destino
+        carga[r] -= demand[i]
+        carga[destino] += demand[i]
+    return Particion(almacenes, clientes, medoides)
+
+
+def subinstancia(instancia, clientes, almacenes):
+    """
+    Retorna la Instancia restringida a los clientes y almacenes dados (índices).
+    """
+    return Instancia(np.asarray(instancia.s)[almacenes], np.asarray(instancia.f)[almacenes],
+                     np.asarray(instancia.demand)[clientes], np.asarray(instancia.c)[np.ix_(clientes, almacenes)],
+                     None)
+
+
+def estado_desde_x(x, demand, single_source=False):
+    """
+    Convierte una matriz x (CSR) en la asignación del evaluador: el centro de cada
+    cliente (SIN_ASIGNAR si no tiene) y, en CFLP.mod, las partes de los clientes
+    divididos entre varios centros.
+
+    Retorna:
+    - asignacion: Array (n,) con el centro de cada cliente (o SIN_ASIGNAR / DIVIDIDO).
+    - partes: Diccionario i -> (centros, cantidades) de los clientes divididos.
+    """
+    n = x.shape[0]
+    asignacion = np.full(n, SIN_ASIGNAR, dtype=np.int64)
+    partes = {}
+    por_fila = np.diff(x.indptr)
+    unicos = np.flatnonzero(por_fila == 1)
+    asignacion[unicos] = x.indices[x.indptr[unicos]]
+    for i in np.flatnonzero(por_fila > 1).tolist():
+        centros = x.indices[x.indptr[i]:x.indptr[i + 1]]
+        cantidades = x.data[x.indptr[i]:x.indptr[i + 1]]
+        if single_source:
+            asignacion[i] = centros[np.argmax(cantidades)]
+        else:
+            asignacion[i] = DIVIDIDO
+            # Ajustamos la última parte para que sumen exactamente la demanda
+            cantidades = cantidades.copy()
+            cantidades[-1] += demand[i] - cantidades.sum()
+            partes[i] = (centros.copy(), cantidades)
+    return asignacion, partes
+
+
+def _heuristica(instancia, single_source, iteraciones, semilla, cache_mb=64):
+    # ILS con el vecindario completo (más búsqueda local en CFLPsingle.mod); retorna el
+    # evaluador con la mejor solución. Es la misma heurística en las regiones y en la
+    # instancia completa, para que la comparación de reportar_instancia sea pareja
+    m = instancia.s.shape[0]
+    evaluador = EvaluadorCFLP(instancia, single_source)
+    iterated_local_search(cap_cost_array(instancia), m, float(np.asarray(instancia.demand).sum()),
+                          global_iterations=iteraciones, seed=semilla, evaluator=evaluador, verbose=False,
+                          neighborhood=Vecindario('mejor', semilla=semilla),
+                          cache=CacheEvaluaciones(m, max_bytes=cache_mb * 2**20) if cache_mb > 0 else None)
+    if single_source:
+        abiertos, asignacion, _, _ = busqueda_local_single(instancia, evaluador.abiertos, evaluador.asignacion)
+        evaluador.restaurar((abiertos, asignacion, {}))
+    return evaluador
+
+
+def resolver_instancia(instancia, metodo='heuristica', single_source=False, limite_tiempo=None, iteraciones=5,
+                       semilla=0, cache_mb=64):
+    """
+    Resuelve una instancia (una región o la instancia completa) con uno de METODOS.
+
+    Retorna:
+    - Diccionario con abiertos, asignacion y partes (en el formato del evaluador),
+      costo, factible, estado ('heuristica' o el estado de HiGHS) y cota (None sin HiGHS).
+    """
+    evaluador = _heuristica(instancia, single_source, iteraciones, semilla, cache_mb)
+    resultado = {
+        'abiertos': evaluador.abiertos.copy(),
+        'asignacion': evaluador.asignacion.copy(),
+        'partes': dict(evaluador.partes),
+        'costo': evaluador.costo,
+        'factible': evaluador.factible,
+        'estado': 'heuristica',
+        'cota': None,
+    }
+    if metodo == 'exacto':
+        modelo = construir_modelo(instancia, single_source)
+        valores_iniciales = (vector_inicial(modelo, evaluador.abiertos, evaluador.x_inicial())
+                             if evaluador.factible else None)
+        highs = resolver_highs(modelo, limite_tiempo=limite_tiempo, valores_iniciales=valores_iniciales)
+        resultado['estado'] = highs['estado']
+        resultado['cota'] = highs['cota']
+        if highs['valores'] is not None and (not evaluador.factible or highs['objetivo'] < evaluador.costo):
+            abiertos, x = extraer_solucion(modelo, highs['valores'])
+            asignacion, partes = estado_desde_x(x, np.asarray(instancia.demand), single_source)
+            resultado.update(abiertos=abiertos, asignacion=asignacion, partes=partes, costo=highs['objetivo'],
+                             factible=True)
+    return resultado
+
+
+# Estado de cada proceso trabajador (se inicializa una vez por proceso)
+_trabajador = {}
+
+
+def _inicializar_trabajador(ruta, cache_dir):
+    # La instancia se abre desde el caché como memoria mapeada, compartida entre procesos
+    _trabajador['instancia'] = cargar_instancia(ruta, cache_dir)
+
+
+def _resolver_region(argumentos):
+    """
+    Resuelve una región en un proceso trabajador y traduce su solución a índices
+    globales de clientes y almacenes.
+    """
+    region, clientes, almacenes, metodo, single_source, limite_tiempo, iteraciones, semilla, cache_mb = argumentos
+    inicio = time.perf_counter()
+    instancia = subinstancia(_trabajador['instancia'], clientes, almacenes)
+    resultado = resolver_instancia(instancia, metodo, single_source, limite_tiempo, iteraciones, semilla, cache_mb)
+
+    asignacion = resultado['asignacion']
+    enteros = asignacion >= 0
+    asignacion_global = np.where(enteros, almacenes[np.maximum(asignacion, 0)], asignacion)
+    partes = {int(clientes[i]): (almacenes[centros], cantidades)
+              for i, (centros, cantidades) in resultado['partes'].items()}
+    return {
+        'region': region,
+        'clientes': clientes,
+        'almacenes': almacenes,
+        'abiertos': almacenes[resultado['abiertos']],
+        'asignacion': asignacion_global,
+        'partes': partes,
+        'costo': resultado['costo'],
+        'factible': resultado['factible'],
+        'estado': resultado['estado'],
+        'tiempo': time.perf_counter() - inicio,
+    }
+
+
+def unir_soluciones(evaluador, soluciones):
+    """
+    Carga en el evaluador la unión de las soluciones de las regiones y repara la
+    factibilidad: los clientes que su región no pudo atender se ubican con la
+    capacidad libre de las demás o abriendo almacenes (ver EvaluadorCFLP.reparar).
+
+    Parámetros:
+    - evaluador: EvaluadorCFLP de la instancia completa.
+    - soluciones: Lista de resultados de _resolver_region.
+
+    Retorna:
+    - costo_unido: Costo de la unión antes de reparar (con penalización si hay clientes sin atender).
+    - sin_asignar: Número de clientes sin atender antes de reparar.
+    """
+    abiertos = np.zeros(evaluador.m, dtype=bool)
+    asignacion = np.full(evaluador.n, SIN_ASIGNAR, dtype=np.int64)
+    partes = {}
+    for solucion in soluciones:
+        abiertos[solucion['abiertos']] = True
+        asignacion[solucion['clientes']] = solucion['asignacion']
+        partes.update(solucion['partes'])
+    costo_unido = evaluador.restaurar((abiertos, asignacion, partes))
+    sin_asignar = int((evaluador.asignacion == SIN_ASIGNAR).sum())
+    evaluador.reparar()
+    return costo_unido, sin_asignar
+
+
+def mejorar_solucion(instancia, evaluador, single_source=False, iteraciones=5, semilla=0, cache_mb=64):
+    """
+    Pasada final de mejora sobre la solución unida: búsqueda local (CFLPsingle.mod) y
+    ILS con el vecindario completo partiendo de sus almacenes abiertos. El evaluador queda con la mejor solución
+    encontrada, que nunca es peor que la de entrada.
+
+    Retorna:
+    - Costo de la mejor solución.
+    """
+    m = instancia.s.shape[0]
+    indice = indice_ordenado(instancia.c) if single_source else None
+    if single_source:
+        abiertos, asignacion, _, _ = busqueda_local_single(instancia, evaluador.abiertos, evaluador.asignacion, indice)
+        evaluador.restaurar((abiertos, asignacion, {}))
+    mejor = evaluador.instantanea()
+    mejor_costo = evaluador.costo if evaluador.factible else float('inf')
+
+    iterated_local_search(cap_cost_array(instancia), m, float(np.asarray(instancia.demand).sum()),
+                          global_iterations=iteraciones, seed=semilla, evaluator=evaluador,
+                          initial_solution=mejor[0].copy(), verbose=False,
+                          neighborhood=Vecindario('mejor', semilla=semilla),
+                          cache=CacheEvaluaciones(m, max_bytes=cache_mb * 2**20) if cache_mb > 0 else None)
+    if single_source:
+        abiertos, asignacion, _, _ = busqueda_local_single(instancia, evaluador.abiertos, evaluador.asignacion, indice)
+        evaluador.restaurar((abiertos, asignacion, {}))
+    if not evaluador.factible or evaluador.costo > mejor_costo:
+        evaluador.restaurar(mejor)
+    return evaluador.costo
+
+
+def resolver_descompuesto(ruta, regiones=None, metodo='heuristica', trabajadores=None, single_source=False,
+                          limite_tiempo=None, iteraciones=5, semilla=0, cache_dir=CACHE_DIR, cache_mb=64,
+                          verbose=True):
+    """
+    Resuelve una instancia grande por descomposición en regiones:
+
+    1. Partición de almacenes (k-medoids sobre las columnas de c) y clientes (ver particionar).
+    2. Resolución de cada región en un pool de procesos, con la heurística o con HiGHS.
+    3. Unión de las soluciones y reparación de los clientes que quedaron sin atender.
+    4. Pasada final de mejora sobre la instancia completa (ver mejorar_solucion).
+
+    Parámetros:
+    - ruta: Ruta al archivo .txt o .dat de la instancia.
+    - regiones: Número de regiones (por defecto, una cada ALMACENES_POR_REGION almacenes).
+    - metodo: Método de cada región, uno de METODOS.
+    - trabajadores: Número de procesos (por defecto, el número de núcleos).
+    - single_source: Si es True se resuelve CFLPsingle.mod; si no, CFLP.mod.
+    - limite_tiempo: Límite de tiempo de HiGHS en cada región (solo metodo='exacto').
+    - iteraciones: Iteraciones globales del ILS en cada región y en la mejora final.
+    - semilla: Semilla base; la región r usa semilla + r.
+    - cache_dir: Directorio del caché de instancias.
+    - cache_mb: Memoria máxima en MB del caché de evaluaciones de cada ILS (0 lo desactiva).
+    - verbose: Si es True se imprime el resultado de cada región.
+
+    Retorna:
+    - Diccionario con objetivo, abiertos, asignacion, partes, x (matriz dispersa CSR),
+      factible, costos de cada etapa (costo_unido, costo_reparado), clientes sin
+      atender tras la unión, las estadísticas de cada región y los tiempos por etapa.
+    """
+    inicio = time.perf_counter()
+    tiempos = {}
+    instancia = cargar_instancia(ruta, cache_dir)
+    m = instancia.s.shape[0]
+    regiones = regiones or max(1, round(m / ALMACENES_POR_REGION))
+    trabajadores = trabajadores or os.cpu_count() or 1
+
+    particion = particionar(instancia, regiones, semilla)
+    regiones = particion.medoides.size
+    tiempos['particion'] = time.perf_counter() - inicio
+
+    # Las regiones más grandes van primero para repartir mejor la carga del pool
+    tareas = []
+    for r in range(regiones):
+        clientes = np.flatnonzero(particion.clientes == r)
+        almacenes = np.flatnonzero(particion.almacenes == r)
+        if clientes.size:
+            tareas.append((r, clientes, almacenes, metodo, single_source, limite_tiempo, iteraciones, semilla + r,
+                           cache_mb))
+    tareas.sort(key=lambda tarea: -tarea[1].size * tarea[2].size)
+
+    marca = time.perf_counter()
+    with mp.Pool(min(trabajadores, len(tareas)), initializer=_inicializar_trabajador,
+                 initargs=(ruta, cache_dir)) as pool:
+        soluciones = pool.map(_resolver_region, tareas, chunksize=1)
+    soluciones.sort(key=lambda solucion: solucion['region'])
+    tiempos['regiones'] = time.perf_counter() - marca
+    if verbose:
+        for solucion in soluciones:
+            print(f"Región {solucion['region']:>3}: {solucion['clientes'].size} clientes, "
+                  f"{solucion['almacenes'].size} almacenes ({solucion['abiertos'].size} abiertos), "
+                  f"costo {solucion['costo']:.4f} ({solucion['estado']}"
+                  f"{'' if solucion['factible'] else ', infactible'}), {solucion['tiempo']:.2f} s")
+
+    marca = time.perf_counter()
+    evaluador = EvaluadorCFLP(instancia, single_source)
+    costo_unido, sin_asignar = unir_soluciones(evaluador, soluciones)
+    costo_reparado = evaluador.costo
+    tiempos['union'] = time.perf_counter() - marca
+
+    marca = time.perf_counter()
+    mejorar_solucion(instancia, evaluador, single_source, iteraciones, semilla, cache_mb)
+    tiempos['mejora'] = time.perf_counter() - marca
+
+    return {
+        'objetivo': evaluador.costo,
+        'abiertos': evaluador.abiertos.copy(),
+        'asignacion': evaluador.asignacion.copy(),
+        'partes': dict(evaluador.partes),
+        'x': sp.csr_matrix(evaluador.x_inicial()),
+        'factible': evaluador.factible,
+        'costo_unido': costo_unido,
+        'costo_reparado': costo_reparado,
+        'sin_asignar': sin_asignar,
+        'regiones': soluciones,
+        'tiempos': tiempos,
+        'tiempo': time.perf_counter() - inicio,
+    }
+
+
+# Columnas del reporte por instancia
+CAMPOS = ['instancia', 'clientes', 'almacenes', 'regiones', 'metodo', 'objetivo_descompuesto', 'costo_unido',
+          'costo_reparado', 'sin_asignar', 'tiempo_particion', 'tiempo_regiones', 'tiempo_union', 'tiempo_mejora',
+          'tiempo_descompuesto', 'objetivo_monolitico', 'estado_monolitico', 'tiempo_monolitico', 'diferencia']
+
+
+def reportar_instancia(ruta, regiones=None, metodo='heuristica', trabajadores=None, single_source=False,
+                       limite_tiempo=None, iteraciones=5, semilla=0, monolitico=True):
+    """
+    Resuelve una instancia por descomposición y, si monolitico es True, también
+    completa con el mismo método (y el mismo límite de tiempo para HiGHS), para
+    comparar calidad y tiempo.
+
+    Retorna:
+    - Diccionario con los campos de CAMPOS (diferencia es el exceso relativo del
+      costo descompuesto sobre el monolítico).
+    """
+    resultado = resolver_descompuesto(ruta, regiones, metodo, trabajadores, single_source, limite_tiempo,
+                                      iteraciones, semilla, verbose=False)
+    instancia = cargar_instancia(ruta)
+    registro = {
+        'instancia': os.path.splitext(os.path.basename(ruta))[0],
+        'clientes': instancia.demand.shape[0],
+        'almacenes': instancia.s.shape[0],
+        'regiones': len(resultado['regiones']),
+        'metodo': metodo,
+        'objetivo_descompuesto': resultado['objetivo'],
+        'costo_unido': resultado['costo_unido'],
+        'costo_reparado': resultado['costo_reparado'],
+        'sin_asignar': resultado['sin_asignar'],
+        'tiempo_particion': resultado['tiempos']['particion'],
+        'tiempo_regiones': resultado['tiempos']['regiones'],
+        'tiempo_union': resultado['tiempos']['union'],
+        'tiempo_mejora': resultado['tiempos']['mejora'],
+        'tiempo_descompuesto': resultado['tiempo'],
+    }
+    if monolitico:
+        inicio = time.perf_counter()
+        completo = resolver_instancia(instancia, metodo, single_source, limite_tiempo, iteraciones, semilla)
+        registro['objetivo_monolitico'] = completo['costo']
+        registro['estado_monolitico'] = completo['estado']
+        registro['tiempo_monolitico'] = time.perf_counter() - inicio
+        registro['diferencia'] = (resultado['objetivo'] - completo['costo']) / abs(completo['costo'])
+    return registro
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import glob
+
+    parser = argparse.ArgumentParser(description="Descomposición por regiones (k-medoids sobre los costos) resuelta "
+                                                 "en paralelo, con unión, reparación y mejora final; compara con la "
+                                                 "resolución de la instancia completa.")
+    parser.add_argument('-i', '--instancias', type=str, nargs='+', required=True,
+                        help="Rutas o patrones glob de las instancias.")
+    parser.add_argument('-r', '--regiones', type=int, default=None,
+                        help=f"Número de regiones (por defecto, una cada {ALMACENES_POR_REGION} almacenes).")
+    parser.add_argument('-M', '--metodo', type=str, choices=METODOS, default='heuristica',
+                        help="Método de cada región y de la resolución completa.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Número de procesos (por defecto, núcleos disponibles).")
+    parser.add_argument('--single', action='store_true', help="Resolver CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('-t', '--time', type=float, default=None, help="Límite de tiempo de HiGHS (por región y completo).")
+    parser.add_argument('-g', '--iteraciones', type=int, default=5, help="Iteraciones globales del ILS.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla base.")
+    parser.add_argument('--sin-monolitico', action='store_true', help="No resolver la instancia completa para comparar.")
+    parser.add_argument('-o', '--output', type=str, default=None, help="Archivo .csv del reporte (opcional).")
+    args = parser.parse_args()
+
+    rutas = []
+    for patron in args.instancias:
+        encontradas = sorted(glob.glob(patron))
+        if not encontradas:
+            print(f"Error: No se encontraron instancias para '{patron}'.")
+            sys.exit(1)
+        rutas.extend(encontradas)
+
+    registros = []
+    for ruta in rutas:
+        registro = reportar_instancia(ruta, args.regiones, args.metodo, args.workers, args.single, args.time,
+                                      args.iteraciones, args.seed, not args.sin_monolitico)
+        registros.append(registro)
+        linea = (f"{registro['instancia']:<12} {registro['regiones']} regiones: {registro['objetivo_descompuesto']:.4f} "
+                 f"en {registro['tiempo_descompuesto']:.2f} s (unión {registro['costo_unido']:.4f}, "
+                 f"{registro['sin_asignar']} clientes reparados)")
+        if not args.sin_monolitico:
+            linea += (f"; completo {registro['objetivo_monolitico']:.4f} en {registro['tiempo_monolitico']:.2f} s "
+                      f"({registro['diferencia']:+.4%})")
+        print(linea)
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=CAMPOS)
+            escritor.writeheader()
+            escritor.writerows(registros)
+        print(f"\nReporte guardado en {args.output}")
@@ -0,0 +1,260 @@
+import os
+import sys
+
+import numpy as np
+
+from evaluador import EPS
+
+
+def generar_escenarios(instancia, cantidad, cv_demanda=0.1, cv_capacidad=0.0, semilla=0):
+    """
+    Genera escenarios de demanda y capacidad multiplicando los valores de la instancia
+    por factores lognormales de media 1.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - cantidad: Número de escenarios.
+    - cv_demanda: Coeficiente de variación de la demanda de cada cliente.
+    - cv_capacidad: Coeficiente de variación de la capacidad de cada almacén (0 la deja fija).
+    - semilla: Semilla del generador aleatorio.
+
+    Retorna:
+    - demandas: Array (S, n).
+    - capacidades: Array (S, m).
+    """
+    rng = np.random.default_rng(semilla)
+
+    def _factores(cv, forma):
+        if cv <= 0:
+            return np.ones(forma)
+        sigma = np.sqrt(np.log1p(cv ** 2))
+        return rng.lognormal(-sigma ** 2 / 2, sigma, size=forma)
+
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    s = np.asarray(instancia.s, dtype=np.float64)
+    return demand * _factores(cv_demanda, (cantidad, demand.size)), s * _factores(cv_capacidad, (cantidad, s.size))
+
+
+def _asignar_escenarios(c_abiertos, demandas, capacidades, single_source):
+    """
+    Asigna los clientes en todos los escenarios a la vez para un conjunto abierto.
+
+    Los clientes se recorren en un orden común (mayor arrepentimiento primero, como en
+    evaluador.EvaluadorCFLP) y, para cada uno, se toma en todos los escenarios a la vez
+    la capacidad residual de sus centros abiertos del más barato al más caro. En
+    CFLP.mod la demanda se divide entre centros si hace falta; en CFLPsingle.mod va
+    completa al primer centro donde cabe.
+
+    Parámetros:
+    - c_abiertos: Matriz (n, k) de costos hacia los centros abiertos (por unidad en
+      CFLP.mod, por cliente completo en CFLPsingle.mod).
+    - demandas: Array (S, n).
+    - capacidades: Array (S, k) de los centros abiertos.
+    - single_source: Formulación de CFLPsingle.mod.
+
+    Retorna:
+    - costo: Array (S,) con el costo de asignación.
+    - faltante: Array (S,) con la demanda que no se pudo asignar.
+    - residual: Array (S, k) con la capacidad sobrante de cada centro abierto.
+    """
+    n, k = c_abiertos.shape
+    escenarios = demandas.shape[0]
+    residual = np.array(capacidades, dtype=np.float64)
+    costo = np.zeros(escenarios)
+    faltante = np.zeros(escenarios)
+    preferencias = np.argsort(c_abiertos, axis=1, kind='stable')
+    if k > 1:
+        ordenados = np.take_along_axis(c_abiertos, preferencias[:, :2], axis=1)
+        orden = np.argsort(-(ordenados[:, 1] - ordenados[:, 0]), kind='stable')
+    else:
+        orden = np.arange(n)
+    filas = np.arange(escenarios)
+
+    for i in orden.tolist():
+        p = preferencias[i]
+        d = demandas[:, i]
+        r = residual[:, p]
+        if single_source:
+            cabe = r >= d[:, None] - EPS
+            primero = np.argmax(cabe, axis=1)
+            asignado = cabe[filas, primero]
+            destino = p[primero[asignado]]
+            residual[filas[asignado], destino] -= d[asignado]
+            costo[asignado] += c_abiertos[i, destino]
+            faltante[~asignado] += d[~asignado]
+        else:
+            previo = np.cumsum(r, axis=1) - r
+            toma = np.clip(d[:, None] - previo, 0.0, r)
+            residual[:, p] = r - toma
+            costo += toma @ c_abiertos[i, p]
+            faltante += np.maximum(d - toma.sum(axis=1), 0.0)
+    return costo, faltante, residual
+
+
+def evaluar_escenarios(instancia, abiertos, demandas=None, capacidades=None, single_source=False):
+    """
+    Evalúa uno o más conjuntos de centros abiertos bajo un lote de escenarios de demanda
+    y capacidad, con operaciones vectorizadas sobre la matriz de costos compartida.
+
+    Para cada conjunto y escenario se calcula una asignación factible con la misma
+    regla que evaluador.EvaluadorCFLP (una cota superior del costo de asignación
+    óptimo) y una cota inferior que asigna cada cliente a su centro abierto más barato
+    sin mirar capacidades. Un escenario se queda sin capacidad si parte de la demanda
+    no se pudo asignar; en ese caso su costo es infinito.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - abiertos: Array booleano (m,) o (K, m) con uno o más conjuntos abiertos.
+    - demandas: Array (S, n) con la demanda de cada escenario (por defecto, la de la instancia).
+    - capacidades: Array (S, m) con las capacidades de cada escenario (por defecto, las de la instancia).
+    - single_source: Si es True se usa el costo de CFLPsingle.mod; si no, el de CFLP.mod.
+
+    Retorna:
+    - Diccionario con arrays (K, S): costo (total, inf si falta capacidad),
+      costo_asignacion, cota_inferior (apertura + asignación sin capacidades),
+      faltante (demanda sin asignar) y factible; costo_fijo (K,); utilizacion
+      (K, S, m) con la fracción de capacidad usada de cada centro; y
+      sin_capacidad, la lista de índices de escenarios sin capacidad suficiente de
+      cada conjunto.
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    n, m = c.shape
+    abiertos = np.atleast_2d(np.asarray(abiertos, dtype=bool))
+    demandas = np.atleast_2d(np.asarray(instancia.demand if demandas is None else demandas, dtype=np.float64))
+    capacidades = np.atleast_2d(np.asarray(instancia.s if capacidades is None else capacidades, dtype=np.float64))
+    if demandas.shape[0] == 1 and capacidades.shape[0] > 1:
+        demandas = np.repeat(demandas, capacidades.shape[0], axis=0)
+    if capacidades.shape[0] == 1 and demandas.shape[0] > 1:
+        capacidades = np.repeat(capacidades, demandas.shape[0], axis=0)
+    if demandas.shape != (capacidades.shape[0], n) or capacidades.shape[1] != m:
+        raise ValueError(f"Escenarios con forma inválida: demandas {demandas.shape}, capacidades {capacidades.shape}")
+    escenarios = demandas.shape[0]
+    conjuntos = abiertos.shape[0]
+
+    costo_asignacion = np.zeros((conjuntos, escenarios))
+    cota = np.zeros((conjuntos, escenarios))
+    faltante = np.zeros((conjuntos, escenarios))
+    utilizacion = np.zeros((conjuntos, escenarios, m))
+    costo_fijo = abiertos.astype(np.float64) @ f
+    for k, mascara in enumerate(abiertos):
+        centros = np.flatnonzero(mascara)
+        if centros.size == 0:
+            faltante[k] = demandas.sum(axis=1)
+            continue
+        c_abiertos = c[:, centros]
+        costo_asignacion[k], faltante[k], residual = _asignar_escenarios(
+            c_abiertos, demandas, capacidades[:, centros], single_source
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uso = 1.0 - residual / capacidades[:, centros]
+        utilizacion[k][:, centros] = np.nan_to_num(uso)
+        minimo = c_abiertos.min(axis=1)
+        cota[k] = minimo.sum() if single_source else demandas @ minimo
+
+    # Tolerancia relativa a la demanda total para los errores de redondeo del reparto
+    factible = faltante <= EPS * np.maximum(1.0, demandas.sum(axis=1))
+    costo = np.where(factible, costo_fijo[:, None] + costo_asignacion, np.inf)
+    return {
+        'costo': costo,
+        'costo_fijo': costo_fijo,
+        'costo_asignacion': costo_asignacion,
+        'cota_inferior': costo_fijo[:, None] + cota,
+        'faltante': faltante,
+        'factible': factible,
+        'utilizacion': utilizacion,
+        'sin_capacidad': [np.flatnonzero(~fila).tolist() for fila in factible],
+    }
+
+
+def resumen_distribucion(costos):
+    """
+    Resume la distribución de costos de un conjunto abierto sobre los escenarios.
+
+    Retorna:
+    - Diccionario con escenarios, factibles, media, desviación, mínimo, percentiles
+      5, 50 y 95 y máximo (sobre los escenarios factibles).
+    """
+    costos = np.asarray(costos, dtype=np.float64)
+    finitos = costos[np.isfinite(costos)]
+    resumen = {'escenarios': int(costos.size), 'factibles': int(finitos.size)}
+    if finitos.size:
+        p5, p50, p95 = np.percentile(finitos, [5, 50, 95])
+        resumen.update(media=float(finitos.mean()), desviacion=float(finitos.std()), minimo=float(finitos.min()),
+                       p5=float(p5), p50=float(p50), p95=float(p95), maximo=float(finitos.max()))
+    return resumen
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from ILS import iterated_local_search
+    from cache_evaluaciones import CacheEvaluaciones
+    from cache_instancias import cap_cost_array, cargar_instancia
+    from evaluador import EvaluadorCFLP
+    from solucion import cargar_solucion
+
+    parser = argparse.ArgumentParser(description="Evalúa conjuntos de centros abiertos bajo muchos escenarios de "
+                                                 "demanda y capacidad.")
+    parser.add_argument('-d', '--data', type=str, required=True, help="Ruta al archivo .txt o .dat de la instancia.")
+    parser.add_argument('--solucion', type=str, nargs='*', default=[],
+                        help="Soluciones .npz (ver solucion.py) cuyos centros abiertos se evalúan. "
+                             "Sin soluciones se usa la del ILS.")
+    parser.add_argument('-S', '--escenarios', type=int, default=500, help="Número de escenarios generados.")
+    parser.add_argument('--cv', type=float, default=0.1, help="Coeficiente de variación de la demanda.")
+    parser.add_argument('--cv-capacidad', type=float, default=0.0, help="Coeficiente de variación de la capacidad.")
+    parser.add_argument('--demandas', type=str, default=None, help="Archivo .npy (S, n) con las demandas de cada escenario.")
+    parser.add_argument('--capacidades', type=str, default=None,
+                        help="Archivo .npy (S, m) con las capacidades de cada escenario.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los escenarios (y del ILS).")
+    parser.add_argument('--single', action='store_true', help="Evaluar con el costo de CFLPsingle.mod.")
+    parser.add_argument('-o', '--output', type=str, default=None, help="Archivo .json con el resumen por conjunto.")
+    args = parser.parse_args()
+
+    for ruta in [args.data, *args.solucion, args.demandas, args.capacidades]:
+        if ruta is not None and not os.path.exists(ruta):
+            print(f"Error: El archivo '{ruta}' no existe.")
+            sys.exit(1)
+
+    instancia = cargar_instancia(args.data)
+    if args.solucion:
+        conjuntos = [cargar_solucion(ruta)[0] for ruta in args.solucion]
+        nombres = args.solucion
+    else:
+        facilities = instancia.s.shape[0]
+        evaluador = EvaluadorCFLP(instancia, args.single)
+        iterated_local_search(cap_cost_array(instancia), facilities, float(np.asarray(instancia.demand).sum()),
+                              seed=args.seed, evaluator=evaluador, verbose=False,
+                              cache=CacheEvaluaciones(facilities))
+        conjuntos = [evaluador.abiertos.copy()]
+        nombres = ['ils']
+
+    if args.demandas is not None or args.capacidades is not None:
+        demandas = np.load(args.demandas) if args.demandas is not None else None
+        capacidades = np.load(args.capacidades) if args.capacidades is not None else None
+    else:
+        demandas, capacidades = generar_escenarios(instancia, args.escenarios, args.cv, args.cv_capacidad, args.seed)
+
+    resultado = evaluar_escenarios(instancia, np.array(conjuntos), demandas, capacidades, args.single)
+    resumenes = []
+    for k, nombre in enumerate(nombres):
+        resumen = resumen_distribucion(resultado['costo'][k])
+        resumen['conjunto'] = nombre
+        resumen['abiertos'] = [f"j{j+1}" for j in np.flatnonzero(conjuntos[k])]
+        resumen['sin_capacidad'] = resultado['sin_capacidad'][k]
+        resumenes.append(resumen)
+        print(f"--- {nombre}: {len(resumen['abiertos'])} centros abiertos")
+        print(f"Escenarios factibles: {resumen['factibles']} de {resumen['escenarios']}")
+        if resumen['factibles']:
+            print(f"Costo medio {resumen['media']:.2f} (desviación {resumen['desviacion']:.2f}), "
+                  f"p5 {resumen['p5']:.2f}, p50 {resumen['p50']:.2f}, p95 {resumen['p95']:.2f}, "
+                  f"máximo {resumen['maximo']:.2f}")
+        if resumen['sin_capacidad']:
+            print(f"Escenarios sin capacidad: {resumen['sin_capacidad'][:20]}"
+                  + (" ..." if len(resumen['sin_capacidad']) > 20 else ""))
+
+    if args.output is not None:
+        with open(args.output, 'w') as archivo:
+            json.dump(resumenes, archivo, indent=1)
+        print(f"\nResumen guardado en {args.output}")
@@ -0,0 +1,419 @@
+import numpy as np
+
+# Tolerancia para comparar cargas con capacidades
+EPS = 1e-9
+
+# Valores especiales de la asignación
+SIN_ASIGNAR = -1
+DIVIDIDO = -2
+
+
+class EvaluadorCFLP:
+    """
+    Evalúa el costo total de CFLP (apertura + asignación) de un conjunto de centros abiertos.
+
+    Para CFLPsingle.mod cada cliente se asigna completo a un único centro (x binaria,
+    costo c[i, j]). Para CFLP.mod la demanda se mide en unidades (costo c[i, j] por
+    unidad): cada cliente va completo a un centro siempre que quepa y solo se divide
+    entre varios centros cuando no cabe entero en ninguno. El resultado es una
+    solución factible del problema de transporte, es decir, una cota superior de su
+    costo de asignación óptimo.
+
+    La asignación se calcula con operaciones vectorizadas sobre la matriz de costos:
+    cada cliente va a su centro abierto más barato con capacidad residual y, cuando
+    varios compiten por un centro, entran primero los de mayor arrepentimiento
+    (regret). Al abrir o cerrar un centro solo se reasignan los clientes afectados,
+    partiendo de la asignación anterior. Los cambios se anotan en un registro para
+    poder deshacerlos.
+
+    En CFLPsingle.mod, un cliente que no cabe entero en la capacidad residual de
+    ningún centro puede entrar igual si se trasladan a otros centros algunos de los
+    clientes ya asignados (ver _expulsar). Un cliente que no cabe en los centros
+    abiertos ni así queda sin asignar y suma una penalización mayor que el costo de cualquier solución factible, de modo que la
+    búsqueda siempre prefiere recuperar la factibilidad.
+    """
+
+    def __init__(self, instancia, single_source=False):
+        """
+        Parámetros:
+        - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+        - single_source: Si es True se usa el costo de CFLPsingle.mod; si no, el de CFLP.mod.
+        """
+        self.single_source = single_source
+        self.s = np.asarray(instancia.s, dtype=np.float64)
+        self.f = np.asarray(instancia.f, dtype=np.float64)
+        self.demand = np.asarray(instancia.demand, dtype=np.float64)
+        self.c = np.asarray(instancia.c, dtype=np.float64)
+        # Costo de asignar el cliente i completo al centro j
+        self.costos = self.c if single_source else self.c * self.demand[:, None]
+        self.n, self.m = self.costos.shape
+        self._clientes = np.arange(self.n)
+        # Penalización por cliente sin asignar: supera el costo de cualquier solución factible
+        self.penalizacion = 2.0 * (self.f.sum() + self.costos.max(axis=1).sum())
+
+        self.abiertos = np.zeros(self.m, dtype=bool)
+        self.asignacion = np.full(self.n, SIN_ASIGNAR, dtype=np.int64)
+        self.partes = {}  # Clientes divididos (solo CFLP.mod): i -> (centros, cantidades)
+        self.carga = np.zeros(self.m)
+        self._costo_cliente = np.full(self.n, self.penalizacion)  # Costo actual de cada cliente
+        self.costo_fijo = 0.0
+        self.costo_asignacion = self.penalizacion * self.n
+        self._registro = []
+
+    def copia(self):
+        """Retorna un evaluador nuevo que comparte los datos de la instancia pero no el estado."""
+        nuevo = object.__new__(EvaluadorCFLP)
+        nuevo.__dict__.update(self.__dict__)
+        nuevo.abiertos = self.abiertos.copy()
+        nuevo.asignacion = self.asignacion.copy()
+        nuevo.partes = dict(self.partes)
+        nuevo.carga = self.carga.copy()
+        nuevo._costo_cliente = self._costo_cliente.copy()
+        nuevo._registro = []
+        return nuevo
+
+    @property
+    def factible(self) -> bool:
+        return not (self.asignacion == SIN_ASIGNAR).any()
+
+    @property
+    def costo(self) -> float:
+        """Costo total de la solución actual (con penalización si algún cliente no cabe)."""
+        return self.costo_fijo + self.costo_asignacion
+
+    # --- Evaluación desde cero ---
+
+    def evaluar(self, abiertos) -> float:
+        """
+        Calcula desde cero la asignación y el costo de un conjunto de centros abiertos.
+
+        Parámetros:
+        - abiertos: Array booleano (m,) con los centros abiertos.
+
+        Retorna:
+        - Costo total de la solución.
+        """
+        self.abiertos[:] = abiertos
+        self.asignacion.fill(SIN_ASIGNAR)
+        self.partes = {}
+        self.carga.fill(0.0)
+        self._costo_cliente.fill(self.penalizacion)
+        self.costo_fijo = float(self.f[self.abiertos].sum())
+        self.costo_asignacion = self.penalizacion * self.n
+        if self.abiertos.any():
+            self._asignar(self._clientes)
+        self._registro.clear()
+        return self.costo
+
+    def instantanea(self):
+        """Retorna una copia de la solución actual (centros abiertos, asignación y partes)."""
+        return self.abiertos.copy(), self.asignacion.copy(), dict(self.partes)
+
+    def restaurar(self, instantanea) -> float:
+        """
+        Carga una solución ya conocida (de instantanea) sin recalcular la asignación.
+
+        Retorna:
+        - Costo total de la solución.
+        """
+        abiertos, asignacion, partes = instantanea
+        self.abiertos[:] = abiertos
+        self.asignacion[:] = asignacion
+        self.partes = dict(partes)
+        self.recalcular()
+        self._registro.clear()
+        return self.costo
+
+    def recalcular(self):
+        """Recalcula cargas y costos desde la asignación actual (elimina errores de redondeo)."""
+        enteros = self.asignacion >= 0
+        self.carga = np.bincount(self.asignacion[enteros], weights=self.demand[enteros], minlength=self.m)
+        self._costo_cliente.fill(self.penalizacion)
+        self._costo_cliente[enteros] = self.costos[self._clientes[enteros], self.asignacion[enteros]]
+        for i, (centros, cantidades) in self.partes.items():
+            self.carga[centros] += cantidades
+            self._costo_cliente[i] = float(self.c[i, centros] @ cantidades)
+        self.costo_fijo = float(self.f[self.abiertos].sum())
+        self.costo_asignacion = float(self._costo_cliente.sum())
+
+    # --- Movimientos incrementales ---
+
+    def abrir(self, j: int) -> float:
+        """
+        Abre el centro j y le traslada los clientes que ahorran costo, mientras quepan.
+
+        Retorna:
+        - Costo total tras el movimiento.
+        """
+        self._registro.append((j, False))
+        self.abiertos[j] = True
+        self.costo_fijo += self.f[j]
+
+        # Ahorro de cada cliente al pasar al centro j (los sin asignar ahorran la penalización)
+        ahorro = self._costo_cliente - self.costos[:, j]
+        candidatos = np.flatnonzero(ahorro > 0)
+        if candidatos.size:
+            candidatos = candidatos[np.argsort(-ahorro[candidatos], kind='stable')]
+            acumulado = np.cumsum(self.demand[candidatos])
+            candidatos = candidatos[acumulado <= self.s[j] - self.carga[j] + EPS]
+            if candidatos.size:
+                self._mover(candidatos, np.full(candidatos.size, j))
+
+        # Si quedan clientes sin asignar, intentamos ubicarlos con la capacidad liberada
+        sin_asignar = np.flatnonzero(self.asignacion == SIN_ASIGNAR)
+        if sin_asignar.size:
+            self._asignar(sin_asignar)
+        return self.costo
+
+    def cerrar(self, j: int) -> float:
+        """
+        Cierra el centro j y reasigna solo sus clientes.
+
+        Retorna:
+        - Costo total tras el movimiento.
+        """
+        self._registro.append((j, True))
+        self.abiertos[j] = False
+        self.costo_fijo -= self.f[j]
+
+        clientes = np.flatnonzero(self.asignacion == j)
+        if self.partes:
+            divididos = [i for i, (centros, _) in self.partes.items() if (centros == j).any()]
+            if divididos:
+                clientes = np.concatenate((clientes, np.array(divididos, dtype=np.int64)))
+        if clientes.size:
+            self._mover(clientes, np.full(clientes.size, SIN_ASIGNAR))
+            self._asignar(clientes)
+        return self.costo
+
+    def intercambiar(self, cerrar: int, abrir: int) -> float:
+        """Abre el centro abrir y cierra el centro cerrar."""
+        self.abrir(abrir)
+        return self.cerrar(cerrar)
+
+    def reparar(self) -> float:
+        """
+        Ubica los clientes sin asignar con la capacidad residual de los centros abiertos
+        y, mientras alguno no quepa, abre el centro cerrado más barato por unidad de la
+        demanda pendiente que puede cubrir. Acepta los cambios (commit).
+
+        Retorna:
+        - Costo total tras la reparación (con penalización si ni abriendo todo cabe).
+        """
+        pendientes = np.flatnonzero(self.asignacion == SIN_ASIGNAR)
+        if pendientes.size:
+            self._asignar(pendientes)
+        while not self.factible and not self.abiertos.all():
+            pendientes = np.flatnonzero(self.asignacion == SIN_ASIGNAR)
+            demanda = float(self.demand[pendientes].sum())
+            cubierta = np.minimum(self.s, demanda)
+            unitario = (self.f + self.costos[pendientes].sum(axis=0) * cubierta / demanda) / np.maximum(cubierta, EPS)
+            self.abrir(int(np.argmin(np.where(self.abiertos, np.inf, unitario))))
+        self.commit()
+        return self.costo
+
+    # --- Registro para deshacer ---
+
+    def checkpoint(self):
+        """Retorna una marca del registro para poder deshacer hasta ese punto."""
+        return (len(self._registro), self.costo_fijo, self.costo_asignacion)
+
+    def rollback(self, marca):
+        """Deshace los cambios posteriores a la marca, restaurando la asignación anterior."""
+        largo, costo_fijo, costo_asignacion = marca
+        registro = self._registro
+        while len(registro) > largo:
+            entrada = registro.pop()
+            if len(entrada) == 3:
+                clientes, anteriores, partes = entrada
+                self._aplicar(clientes, anteriores, partes)
+            else:
+                j, estado = entrada
+                self.abiertos[j] = estado
+        self.costo_fijo = costo_fijo
+        self.costo_asignacion = costo_asignacion
+
+    def commit(self):
+        """Acepta los cambios registrados y vacía el registro."""
+        self._registro.clear()
+
+    # --- Auxiliares ---
+
+    def _aplicar(self, clientes, destinos, partes=None):
+        # Cambia la asignación de los clientes y actualiza cargas y costos por cliente.
+        # Los clientes con destino DIVIDIDO toman sus partes del diccionario partes.
+        origen = self.asignacion[clientes]
+        enteros = origen >= 0
+        if enteros.any():
+            np.subtract.at(self.carga, origen[enteros], self.demand[clientes[enteros]])
+        for i in clientes[origen == DIVIDIDO].tolist():
+            centros, cantidades = self.partes.pop(i)
+            self.carga[centros] -= cantidades
+
+        nuevos = destinos >= 0
+        if nuevos.any():
+            np.add.at(self.carga, destinos[nuevos], self.demand[clientes[nuevos]])
+        self.asignacion[clientes] = destinos
+        self._costo_cliente[clientes] = np.where(nuevos, self.costos[clientes, np.maximum(destinos, 0)], self.penalizacion)
+        for i in clientes[destinos == DIVIDIDO].tolist():
+            centros, cantidades = partes[i]
+            self.partes[i] = (centros, cantidades)
+            self.carga[centros] += cantidades
+            self._costo_cliente[i] = float(self.c[i, centros] @ cantidades)
+
+    def _mover(self, clientes, destinos, partes=None):
+        # Reasigna clientes (-1 = sin asignar, -2 = dividido según partes) dejando registro
+        anteriores = self.asignacion[clientes].copy()
+        partes_anteriores = {i: self.partes[i] for i in clientes[anteriores == DIVIDIDO].tolist()}
+        self._registro.append((clientes, anteriores, partes_anteriores))
+        antes = self._costo_cliente[clientes].sum()
+        self._aplicar(clientes, destinos, partes)
+        self.costo_asignacion += self._costo_cliente[clientes].sum() - antes
+
+    def _asignar(self, clientes):
+        """
+        Asigna clientes sin centro al centro abierto más barato con capacidad residual.
+
+        Trabaja por rondas vectorizadas: cada cliente pendiente propone su mejor centro
+        factible; en cada centro se aceptan, en orden de mayor arrepentimiento, los que
+        caben, y el resto vuelve a proponer con las capacidades actualizadas. Para
+        CFLP.mod, los clientes que no caben enteros en ningún centro se dividen; para
+        CFLPsingle.mod, se intenta hacerles espacio trasladando otros clientes.
+
+        Retorna:
+        - True si todos los clientes quedaron asignados.
+        """
+        residual = self.s - self.carga
+        pendientes = clientes
+        asignados = []
+        destinos = []
+        while pendientes.size:
+            demanda = self.demand[pendientes]
+            sub = np.where(self.abiertos & (residual >= demanda[:, None] - EPS), self.costos[pendientes], np.inf)
+            mejor = np.argmin(sub, axis=1)
+            ubicables = np.isfinite(sub[np.arange(pendientes.size), mejor])
+            if not ubicables.any():
+                break
+            if self.m > 1:
+                dos = np.partition(sub, 1, axis=1)[:, :2]
+                with np.errstate(invalid='ignore'):
+                    arrepentimiento = np.where(np.isfinite(dos[:, 1]), dos[:, 1] - dos[:, 0], np.inf)
+            else:
+                arrepentimiento = np.zeros(pendientes.size)
+
+            # Agrupamos por centro propuesto y, dentro de cada centro, por arrepentimiento
+            orden = np.lexsort((-arrepentimiento, mejor))
+            orden = orden[ubicables[orden]]
+            centro = mejor[orden]
+            acumulado = np.cumsum(demanda[orden])
+            inicio_grupo = np.r_[True, centro[1:] != centro[:-1]]
+            base = np.maximum.accumulate(np.where(inicio_grupo, acumulado - demanda[orden], 0.0))
+            elegidos = orden[(acumulado - base) <= residual[centro] + EPS]
+
+            asignados.append(pendientes[elegidos])
+            destinos.append(mejor[elegidos])
+            residual -= np.bincount(mejor[elegidos], weights=demanda[elegidos], minlength=self.m)
+
+            # Los no ubicables ya no cabrán enteros: la capacidad residual solo disminuye
+            resto = ubicables.copy()
+            resto[elegidos] = False
+            pendientes = pendientes[resto]
+
+        asignados = np.concatenate(asignados) if asignados else clientes[:0]
+        destinos = np.concatenate(destinos) if destinos else np.zeros(0, dtype=np.int64)
+        faltantes = np.setdiff1d(clientes, asignados, assume_unique=True)
+        if faltantes.size:
+            asignados = np.concatenate((asignados, faltantes))
+            destinos = np.concatenate((destinos, np.full(faltantes.size, SIN_ASIGNAR)))
+
+        partes = {}
+        if faltantes.size and not self.single_source:
+            # Dividimos la demanda de los que no cupieron enteros, del centro más barato al más caro
+            total = float(np.clip(residual[self.abiertos], 0.0, None).sum())
+            for k in range(asignados.size - faltantes.size, asignados.size):
+                i = int(asignados[k])
+                if total < self.demand[i] - EPS:
+                    continue
+                total -= self.demand[i]
+                disponibles = np.flatnonzero(self.abiertos & (residual > EPS))
+                disponibles = disponibles[np.argsort(self.c[i, disponibles], kind='stable')]
+                acumulado = np.cumsum(residual[disponibles])
+                usados = disponibles[:np.searchsorted(acumulado, self.demand[i] - EPS) + 1]
+                cantidades = residual[usados].copy()
+                cantidades[-1] -= cantidades.sum() - self.demand[i]
+                residual[usados] -= cantidades
+                partes[i] = (usados, cantidades)
+                destinos[k] = DIVIDIDO
+
+        if asignados.size:
+            self._mover(asignados, destinos, partes)
+        if faltantes.size and self.single_source:
+            return self._expulsar(faltantes)
+        return not (destinos == SIN_ASIGNAR).any()
+
+    def _expulsar(self, clientes):
+        """
+        Ubica clientes de CFLPsingle.mod que no caben enteros en la capacidad residual
+        de ningún centro abierto. Para cada uno (de mayor a menor demanda) se busca un
+        centro con capacidad suficiente y se liberan en él los clientes que pueden
+        pasar a otro centro abierto con espacio, los de menor costo adicional por
+        unidad primero. Los centros se prueban del más barato al más caro para el cliente
+        y se usa el primero donde la maniobra es posible.
+
+        Retorna:
+        - True si todos los clientes quedaron asignados.
+        """
+        for i in clientes[np.argsort(-self.demand[clientes], kind='stable')].tolist():
+            demanda = self.demand[i]
+            residual = self.s - self.carga
+            if residual[self.abiertos].sum() < demanda - EPS:
+                continue
+            candidatos = np.flatnonzero(self.abiertos & (self.s >= demanda - EPS))
+            for j in candidatos[np.argsort(self.costos[i, candidatos], kind='stable')].tolist():
+                maniobra = self._liberar(j, demanda - residual[j], residual.copy())
+                if maniobra is not None:
+                    self._mover(*maniobra)
+                    self._mover(np.array([i]), np.array([j]))
+                    break
+        return not (self.asignacion[clientes] == SIN_ASIGNAR).any()
+
+    def _liberar(self, j, falta, residual):
+        # Elige clientes de j que pasan a otro centro abierto con espacio hasta liberar
+        # falta unidades. Retorna (clientes, destinos) o None
+        miembros = np.flatnonzero(self.asignacion == j)
+        if not miembros.size:
+            return None
+        demanda = self.demand[miembros]
+        sub = np.where(self.abiertos & (residual >= demanda[:, None] - EPS), self.costos[miembros], np.inf)
+        sub[:, j] = np.inf
+        extra = sub.min(axis=1) - self.costos[miembros, j]
+        movidos, destinos = [], []
+        for k in np.argsort(extra / np.maximum(demanda, EPS), kind='stable').tolist():
+            if falta <= EPS or not np.isfinite(extra[k]):
+                break
+            # El destino se vuelve a elegir con las capacidades ya ocupadas por los anteriores
+            cabe = self.abiertos & (residual >= demanda[k] - EPS)
+            cabe[j] = False
+            if not cabe.any():
+                continue
+            destino = int(np.argmin(np.where(cabe, self.costos[miembros[k]], np.inf)))
+            residual[destino] -= demanda[k]
+            falta -= demanda[k]
+            movidos.append(miembros[k])
+            destinos.append(destino)
+        if falta > EPS:
+            return None
+        return np.array(movidos, dtype=np.int64), np.array(destinos, dtype=np.int64)
+
+    def x_inicial(self):
+        """
+        Construye la matriz x (n, m) de la asignación actual, en las unidades del modelo:
+        demanda asignada para CFLP.mod o 0/1 para CFLPsingle.mod.
+        """
+        x = np.zeros((self.n, self.m))
+        enteros = self.asignacion >= 0
+        valores = 1.0 if self.single_source else self.demand[enteros]
+        x[self._clientes[enteros], self.asignacion[enteros]] = valores
+        for i, (centros, cantidades) in self.partes.items():
+            x[i, centros] = cantidades
+        return x
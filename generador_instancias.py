@@ -0,0 +1,197 @@
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from cache_instancias import cargar_instancia
+
+# Estructuras de costos de las instancias sintéticas:
+# - geometrico: clientes y almacenes en el cuadrado unitario; el costo de asignar todo el
+#   cliente i al almacén j es 10 * demanda_i * distancia(i, j) (como en Cornuéjols et al.).
+# - aleatorio: costos uniformes independientes, sin estructura espacial.
+COSTOS = ('geometrico', 'aleatorio')
+
+
+def _escribir_instancia(ruta, s, f, bloques, n, decimales=5):
+    """
+    Escribe una instancia en formato OR Library (intercalado) por bloques de clientes.
+
+    Parámetros:
+    - ruta: Ruta del archivo .txt de salida.
+    - s, f: Capacidades y costos fijos de los almacenes (m,).
+    - bloques: Iterable de tuplas (demandas (b,), costos (b, m)) con los clientes en orden.
+    - n: Número total de clientes.
+    - decimales: Decimales con que se escriben los costos.
+    """
+    m = s.shape[0]
+    formato = f'%.{decimales}f'
+    tmp = ruta + f'.{os.getpid()}.tmp'
+    with open(tmp, 'w') as salida:
+        salida.write(f"{m} {n}\n")
+        for capacidad, costo_fijo in zip(s, f):
+            salida.write(f"{capacidad:.10g} {costo_fijo:.10g}\n")
+        escritos = 0
+        for demandas, costos in bloques:
+            texto = io.StringIO()
+            np.savetxt(texto, costos, fmt=formato, delimiter=' ')
+            filas = texto.getvalue().splitlines()
+            salida.write(''.join(f"{demanda:.10g}\n{fila}\n" for demanda, fila in zip(demandas, filas)))
+            escritos += len(demandas)
+        if escritos != n:
+            raise RuntimeError(f"se escribieron {escritos} clientes de {n}")
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def _ajustar_capacidades(s, demanda_total, holgura):
+    """Escala las capacidades para que sumen holgura veces la demanda total."""
+    return s * (holgura * demanda_total / s.sum())
+
+
+def generar_instancia(ruta, n, m, semilla=0, holgura=3.0, costos='geometrico', bloque=1000):
+    """
+    Genera una instancia sintética de CFLP y la escribe en formato OR Library.
+
+    La matriz de costos se genera y escribe por bloques de clientes, de modo que la
+    memoria usada es O(bloque * m) aunque la instancia tenga millones de pares.
+
+    Parámetros:
+    - ruta: Ruta del archivo .txt de salida.
+    - n: Número de clientes.
+    - m: Número de almacenes.
+    - semilla: Semilla del generador aleatorio.
+    - holgura: Capacidad total / demanda total (mientras más cerca de 1, más ajustada).
+    - costos: 'geometrico' o 'aleatorio' (ver COSTOS).
+    - bloque: Número de clientes generados y escritos por bloque.
+
+    Retorna:
+    - Ruta del archivo escrito.
+    """
+    if costos not in COSTOS:
+        raise ValueError(f"Estructura de costos desconocida: {costos}")
+    if holgura < 1:
+        raise ValueError("La holgura debe ser al menos 1 para que la instancia sea factible")
+    rng = np.random.default_rng(semilla)
+
+    demand = rng.integers(5, 36, size=n).astype(np.float64)
+    s = _ajustar_capacidades(rng.uniform(10, 160, size=m), demand.sum(), holgura)
+    s = np.maximum(np.ceil(s), demand.max())
+    if costos == 'geometrico':
+        almacenes = rng.random((m, 2))
+        clientes = rng.random((n, 2))
+        # Costo fijo creciente con la capacidad, con economías de escala
+        f = rng.uniform(0, 90, size=m) + rng.uniform(100, 110, size=m) * np.sqrt(s)
+    else:
+        f = rng.uniform(0.5, 1.5, size=m) * np.sqrt(s) * 100
+
+    def _bloques():
+        for inicio in range(0, n, bloque):
+            fin = min(inicio + bloque, n)
+            if costos == 'geometrico':
+                distancias = np.sqrt(((clientes[inicio:fin, None, :] - almacenes[None, :, :]) ** 2).sum(axis=2))
+                c = 10 * demand[inicio:fin, None] * distancias
+            else:
+                c = rng.uniform(0, 100, size=(fin - inicio, m)) * demand[inicio:fin, None]
+            yield demand[inicio:fin], c
+
+    return _escribir_instancia(ruta, s, np.round(f, 3), _bloques(), n)
+
+
+def transformar_instancia(origen, ruta, n=None, m=None, semilla=0, holgura=None, ruido=0.0, bloque=1000):
+    """
+    Crea una instancia a partir de otra (por ejemplo capA14000 o 500x500) eligiendo
+    un subconjunto de clientes y almacenes, o ampliándola por remuestreo.
+
+    - Si n (o m) es menor o igual que el tamaño original, se eligen sin repetición.
+    - Si es mayor, se remuestrea con repetición; con ruido > 0 las copias se perturban
+      multiplicando costos y demandas por un factor uniforme en [1 - ruido, 1 + ruido].
+    - Las capacidades se escalan para conservar la holgura (capacidad total / demanda
+      total) del origen, o para alcanzar la holgura pedida.
+
+    El origen puede estar en cualquiera de los formatos que lee cache_instancias (capX,
+    500x500, 5000x500 por bloques o .dat). La salida siempre usa el formato intercalado,
+    de modo que esta función también sirve para reordenar una instancia por bloques.
+
+    Parámetros:
+    - origen: Ruta de la instancia original.
+    - ruta: Ruta del archivo .txt de salida.
+    - n: Número de clientes (por defecto, los del origen).
+    - m: Número de almacenes (por defecto, los del origen).
+    - semilla: Semilla del generador aleatorio.
+    - holgura: Capacidad total / demanda total de la salida (por defecto, la del origen).
+    - ruido: Perturbación relativa de las copias remuestreadas.
+    - bloque: Número de clientes escritos por bloque.
+
+    Retorna:
+    - Ruta del archivo escrito.
+    """
+    instancia = cargar_instancia(origen)
+    n_origen, m_origen = instancia.c.shape
+    n = n or n_origen
+    m = m or m_origen
+    rng = np.random.default_rng(semilla)
+
+    def _elegir(total, cantidad):
+        if cantidad == total:
+            return np.arange(total)
+        if cantidad < total:
+            return np.sort(rng.choice(total, cantidad, replace=False))
+        return np.concatenate((np.arange(total), rng.choice(total, cantidad - total, replace=True)))
+
+    filas = _elegir(n_origen, n)
+    columnas = _elegir(m_origen, m)
+    factor = np.ones(n)
+    if ruido > 0:
+        factor[n_origen:] = rng.uniform(1 - ruido, 1 + ruido, size=max(0, n - n_origen))
+
+    demand = np.asarray(instancia.demand)[filas] * factor
+    s = np.asarray(instancia.s, dtype=np.float64)[columnas]
+    f = np.asarray(instancia.f, dtype=np.float64)[columnas]
+    if holgura is None:
+        holgura = float(np.sum(instancia.s) / np.sum(instancia.demand))
+    s = _ajustar_capacidades(s, demand.sum(), holgura)
+
+    def _bloques():
+        for inicio in range(0, n, bloque):
+            fin = min(inicio + bloque, n)
+            c = np.asarray(instancia.c)[filas[inicio:fin]][:, columnas] * factor[inicio:fin, None]
+            yield demand[inicio:fin], c
+
+    return _escribir_instancia(ruta, s, f, _bloques(), n)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera instancias CFLP sintéticas o transforma instancias existentes "
+                                                 "(formato OR Library).")
+    parser.add_argument('-o', '--output', type=str, required=True, help="Ruta del archivo .txt de salida.")
+    parser.add_argument('-i', '--input', type=str, default=None,
+                        help="Instancia de origen a submuestrear o ampliar (si se omite, se genera una sintética).")
+    parser.add_argument('-n', '--clientes', type=int, default=None, help="Número de clientes.")
+    parser.add_argument('-m', '--almacenes', type=int, default=None, help="Número de almacenes.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del generador aleatorio.")
+    parser.add_argument('--holgura', type=float, default=None,
+                        help="Capacidad total / demanda total (por defecto 3 en las sintéticas y la del origen al transformar).")
+    parser.add_argument('--costos', choices=COSTOS, default='geometrico', help="Estructura de costos de las sintéticas.")
+    parser.add_argument('--ruido', type=float, default=0.0, help="Perturbación relativa de los clientes remuestreados.")
+    parser.add_argument('--bloque', type=int, default=1000, help="Clientes escritos por bloque.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.input is not None:
+        if not os.path.exists(args.input):
+            print(f"Error: El archivo de entrada '{args.input}' no existe.")
+            sys.exit(1)
+        ruta = transformar_instancia(args.input, args.output, args.clientes, args.almacenes, args.seed,
+                                     args.holgura, args.ruido, args.bloque)
+    else:
+        if args.clientes is None or args.almacenes is None:
+            print("Error: Para generar una instancia sintética se necesitan -n y -m.")
+            sys.exit(1)
+        ruta = generar_instancia(args.output, args.clientes, args.almacenes, args.seed,
+                                 3.0 if args.holgura is None else args.holgura, args.costos, args.bloque)
+    print(f"Instancia {ruta} escrita en {time.perf_counter() - inicio:.2f} s "
+          f"({os.path.getsize(ruta) / 2**20:.1f} MB)")
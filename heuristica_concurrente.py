@@ -0,0 +1,92 @@
+import random
+import threading
+
+import numpy as np
+
+from ILS import iterated_local_search
+from busqueda_local_single import busqueda_local_single, indice_ordenado
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import cap_cost_array
+from evaluador import EvaluadorCFLP
+
+
+class HeuristicaConcurrente(threading.Thread):
+    """
+    Ejecuta épocas de ILS en un hilo mientras el solver resuelve el MIP.
+
+    Cada época parte del mejor conjunto de centros abiertos conocido (propio o del
+    solver). Si la época mejora el incumbente, la solución (y, x) queda pendiente para
+    que el solver la tome con siguiente(). HiGHS libera el GIL mientras resuelve, así
+    que el ILS corre en paralelo con el branch and bound.
+    """
+
+    def __init__(self, instancia, single_source, abiertos, costo, semilla=0, iteraciones_por_epoca=2):
+        """
+        Parámetros:
+        - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+        - single_source: Si es True se evalúa con el costo de CFLPsingle.mod.
+        - abiertos: Array booleano (m,) con los centros abiertos de la solución inicial.
+        - costo: Costo de la solución inicial.
+        - semilla: Semilla del generador aleatorio.
+        - iteraciones_por_epoca: Iteraciones globales del ILS en cada época.
+        """
+        super().__init__(daemon=True)
+        self.instancia = instancia
+        self.single_source = single_source
+        self.iteraciones_por_epoca = iteraciones_por_epoca
+        self._rng = random.Random(semilla)
+        self._candado = threading.Lock()
+        self._detener = threading.Event()
+        self._mejor_abiertos = np.array(abiertos, dtype=bool)
+        self._mejor_costo = float(costo)
+        self._pendiente = None
+        self.epocas = 0
+        self.publicadas = 0
+
+    def run(self):
+        instancia = self.instancia
+        cap_cost = cap_cost_array(instancia)
+        facilities = cap_cost.shape[0]
+        demand_total = float(np.asarray(instancia.demand).sum())
+        evaluador = EvaluadorCFLP(instancia, self.single_source)
+        indice = indice_ordenado(instancia.c) if self.single_source else None
+        # Las épocas parten casi siempre del mismo incumbente: el caché evita reevaluar sus vecinos
+        cache = CacheEvaluaciones(facilities)
+
+        while not self._detener.is_set():
+            with self._candado:
+                inicial = self._mejor_abiertos.copy()
+            iterated_local_search(cap_cost, facilities, demand_total, global_iterations=self.iteraciones_por_epoca,
+                                  seed=self._rng.getrandbits(32), evaluator=evaluador, initial_solution=inicial,
+                                  verbose=False, cache=cache)
+            if self.single_source:
+                abiertos, asignacion, _, _ = busqueda_local_single(instancia, evaluador.abiertos, evaluador.asignacion,
+                                                                indice)
+                evaluador.restaurar((abiertos, asignacion, {}))
+            self.epocas += 1
+            if not evaluador.factible:
+                continue
+            with self._candado:
+                if evaluador.costo < self._mejor_costo * (1 - 1e-9):
+                    self._mejor_costo = evaluador.costo
+                    self._mejor_abiertos = evaluador.abiertos.copy()
+                    self._pendiente = (evaluador.abiertos.copy(), evaluador.x_inicial(), evaluador.costo)
+                    self.publicadas += 1
+
+    def siguiente(self):
+        """Retorna la solución pendiente (abiertos, x, costo) y la marca como tomada, o None."""
+        with self._candado:
+            pendiente, self._pendiente = self._pendiente, None
+        return pendiente
+
+    def incorporar(self, abiertos, costo):
+        """Registra un incumbente del solver para que la próxima época parta desde él."""
+        with self._candado:
+            if costo < self._mejor_costo:
+                self._mejor_costo = float(costo)
+                self._mejor_abiertos = np.array(abiertos, dtype=bool)
+
+    def detener(self):
+        """Detiene el hilo al terminar la época en curso."""
+        self._detener.set()
+        self.join()
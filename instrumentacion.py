@@ -0,0 +1,71 @@
+import json
+import time
+from collections import defaultdict
+
+
+class Instrumentacion:
+    """
+    Registro estructurado de eventos del ILS y del flujo de resolución.
+
+    Cada evento es un diccionario con el tiempo desde la creación ('t'), su tipo
+    ('evento') y sus datos. Los eventos se escriben como JSON lines en el destino (si
+    hay uno) y se entregan a los callbacks suscritos. Tipos de evento:
+
+    - 'incumbente': nuevo mejor costo (costo, fuente y datos adicionales).
+    - 'contadores': contadores acumulados de una fuente (por ejemplo, una ejecución del ILS).
+    - 'fase': duración de una fase del flujo (nombre, segundos).
+    - 'resumen': contadores totales y mejor costo, al cerrar.
+
+    Para desactivar la instrumentación basta con no crear el objeto: las funciones
+    que lo reciben usan None por defecto y en ese caso no emiten nada.
+    """
+
+    def __init__(self, destino=None):
+        """
+        Parámetros:
+        - destino: Ruta de un archivo .jsonl (se abre en modo agregar) o un objeto
+          archivo ya abierto (opcional).
+        """
+        self._propio = isinstance(destino, str)
+        self._archivo = open(destino, 'a') if self._propio else destino
+        self._callbacks = []
+        self._inicio = time.perf_counter()
+        self.contadores = defaultdict(int)
+        self.mejor = float('inf')
+
+    def suscribir(self, callback):
+        """Registra una función que recibe cada evento (diccionario)."""
+        self._callbacks.append(callback)
+
+    def evento(self, tipo, **datos):
+        """Emite un evento con los datos dados."""
+        registro = {'t': round(time.perf_counter() - self._inicio, 6), 'evento': tipo, **datos}
+        if self._archivo is not None:
+            self._archivo.write(json.dumps(registro, default=float) + '\n')
+        for callback in self._callbacks:
+            callback(registro)
+
+    def incumbente(self, costo, fuente, **datos):
+        """Emite un evento 'incumbente' si el costo mejora el mejor registrado."""
+        costo = float(costo)
+        if costo < self.mejor:
+            self.mejor = costo
+            self.evento('incumbente', costo=costo, fuente=fuente, **datos)
+
+    def sumar(self, fuente, **contadores):
+        """Acumula contadores y emite un evento 'contadores' con los valores de esta fuente."""
+        for nombre, valor in contadores.items():
+            self.contadores[nombre] += valor
+        self.evento('contadores', fuente=fuente, **contadores)
+
+    def fase(self, nombre, segundos):
+        """Emite la duración de una fase."""
+        self.evento('fase', nombre=nombre, segundos=segundos)
+
+    def cerrar(self):
+        """Emite el resumen y cierra el archivo si fue abierto aquí."""
+        self.evento('resumen', contadores=dict(self.contadores), mejor=self.mejor)
+        if self._archivo is not None:
+            self._archivo.flush()
+            if self._propio:
+                self._archivo.close()
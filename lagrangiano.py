@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+from cache_instancias import cargar_instancia
+from evaluador import EvaluadorCFLP
+
+
+def mochilas_almacenes(reducidos, demand, s, f):
+    """
+    Resuelve la mochila fraccionaria de cada almacén del subproblema lagrangiano: el
+    almacén toma, hasta llenar su capacidad, los clientes de costo reducido negativo
+    ordenados por costo reducido por unidad.
+
+    Parámetros:
+    - reducidos: Array (n, m) con el costo de asignar cada cliente completo menos su multiplicador.
+    - demand, s, f: Demandas (n,), capacidades (m,) y costos fijos (m,).
+
+    Retorna:
+    - v: Array (m,) con el valor de abrir cada almacén (costo fijo más su mochila).
+    - x: Array (n, m) con la fracción de cada cliente que toma cada almacén si se abre.
+    """
+    orden = np.argsort(reducidos / demand[:, None], axis=0, kind='stable')
+    r_orden = np.take_along_axis(reducidos, orden, axis=0)
+    d_orden = demand[orden]
+    negativos = r_orden < 0
+    peso = np.where(negativos, d_orden, 0.0)
+    acumulado = np.cumsum(peso, axis=0)
+    fraccion = np.clip((s[None, :] - (acumulado - peso)) / d_orden, 0.0, 1.0) * negativos
+    v = f + (fraccion * r_orden).sum(axis=0)
+
+    x = np.zeros(reducidos.shape)
+    np.put_along_axis(x, orden, fraccion, axis=0)
+    return v, x
+
+
+def _subproblema(costos, demand, s, f, demanda_total, u):
+    """
+    Resuelve el subproblema lagrangiano para unos multiplicadores u.
+
+    Con la restricción de demanda dualizada, el problema se separa por almacén: cada
+    almacén abierto elige los clientes de costo reducido negativo que caben en su
+    capacidad (mochila fraccionaria). Luego se eligen los almacenes con la relajación
+    lineal de la mochila de capacidad total (sum s[j] y[j] >= demanda total).
+
+    Retorna:
+    - cota: Valor del subproblema (cota inferior válida).
+    - x: Array (n, m) con la fracción de cada cliente tomada por cada almacén abierto.
+    - y: Array (m,) con la apertura (fraccionaria como mucho en un almacén).
+    - v: Array (m,) con el valor de abrir cada almacén.
+    """
+    v, x = mochilas_almacenes(costos - u[:, None], demand, s, f)
+
+    # Relajación lineal de la mochila de apertura: primero los de valor negativo y,
+    # si falta capacidad, los de menor valor por unidad de capacidad
+    y = (v < 0).astype(float)
+    capacidad = s @ y
+    if capacidad < demanda_total:
+        resto = np.flatnonzero(v >= 0)
+        resto = resto[np.argsort(v[resto] / s[resto], kind='stable')]
+        for j in resto.tolist():
+            y[j] = min(1.0, (demanda_total - capacidad) / s[j])
+            capacidad += s[j] * y[j]
+            if capacidad >= demanda_total:
+                break
+
+    cota = float(u.sum() + v @ y)
+    return cota, x * y[None, :], y, v
+
+
+def _heuristica_primal(evaluador, y, v, s, demanda_total):
+    """
+    Construye una solución factible a partir del subproblema: abre los almacenes con
+    y > 0 y, si no alcanza, agrega almacenes por valor lagrangiano hasta que todos los
+    clientes queden asignados.
+    """
+    abiertos = y > 0
+    orden = np.argsort(v, kind='stable')
+    k = 0
+    while s[abiertos].sum() < demanda_total and k < orden.size:
+        abiertos[orden[k]] = True
+        k += 1
+    evaluador.evaluar(abiertos)
+    while not evaluador.factible and k < orden.size:
+        if not evaluador.abiertos[orden[k]]:
+            evaluador.abrir(orden[k])
+            evaluador.commit()
+        k += 1
+    # Cerramos los almacenes que quedaron sin clientes
+    vacios = np.flatnonzero(evaluador.abiertos & (evaluador.carga <= 0))
+    for j in vacios.tolist():
+        evaluador.cerrar(j)
+        evaluador.commit()
+    return evaluador.costo
+
+
+def relajacion_lagrangiana(instancia, single_source=False, max_iteraciones=500, gap_objetivo=1e-4,
+                           limite_tiempo=None, frecuencia_primal=10, lam_inicial=2.0, paciencia=20,
+                           verbose=True):
+    """
+    Relajación lagrangiana de CFLP.mod / CFLPsingle.mod con optimización por subgradiente.
+
+    Se dualiza la restricción de demanda de cada cliente (AssignDemand o SingleSource).
+    Para CFLP.mod se usa la cota x[i, j] <= demand[i], válida en el óptimo porque los
+    costos son no negativos; para CFLPsingle.mod la mochila binaria de cada almacén se
+    relaja a fraccionaria. En ambos casos el valor obtenido es una cota inferior válida.
+    Cada cierto número de iteraciones se construye una solución factible con el
+    evaluador de la heurística, que da la cota superior.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - single_source: Si es True se relaja CFLPsingle.mod; si no, CFLP.mod.
+    - max_iteraciones: Número máximo de iteraciones del subgradiente.
+    - gap_objetivo: Se detiene al alcanzar este gap relativo.
+    - limite_tiempo: Límite de tiempo en segundos (opcional).
+    - frecuencia_primal: Cada cuántas iteraciones se ejecuta la heurística primal.
+    - lam_inicial: Factor inicial del paso de Polyak.
+    - paciencia: Iteraciones sin mejorar la cota antes de reducir el paso a la mitad.
+    - verbose: Si es False no se imprime el progreso.
+
+    Retorna:
+    - Diccionario con la cota inferior, la cota superior, el gap, la mejor solución
+      (abiertos y asignación), los multiplicadores, las iteraciones y el tiempo.
+    """
+    inicio = time.perf_counter()
+    s = np.asarray(instancia.s, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    evaluador = EvaluadorCFLP(instancia, single_source)
+    costos = evaluador.costos
+    demanda_total = float(demand.sum())
+
+    # Multiplicadores iniciales: costo de asignación más barato de cada cliente
+    u = costos.min(axis=1)
+    cota_inferior = -np.inf
+    cota_superior = np.inf
+    mejor_solucion = None
+    mejor_u = u.copy()
+    lam = lam_inicial
+    sin_mejora = 0
+    iteracion = 0
+
+    for iteracion in range(1, max_iteraciones + 1):
+        cota, x, y, v = _subproblema(costos, demand, s, f, demanda_total, u)
+        if cota > cota_inferior + 1e-9 * abs(cota):
+            cota_inferior, mejor_u = cota, u.copy()
+            sin_mejora = 0
+        else:
+            sin_mejora += 1
+            if sin_mejora >= paciencia:
+                lam /= 2
+                sin_mejora = 0
+
+        if iteracion == 1 or iteracion % frecuencia_primal == 0:
+            costo = _heuristica_primal(evaluador, y.copy(), v, s, demanda_total)
+            if evaluador.factible and costo < cota_superior:
+                cota_superior = costo
+                mejor_solucion = evaluador.instantanea()
+
+        gap = (cota_superior - cota_inferior) / abs(cota_superior) if np.isfinite(cota_superior) else np.inf
+        if verbose and (iteracion == 1 or iteracion % 50 == 0):
+            print(f"Iteración {iteracion}: cota inferior {cota_inferior:.2f}, cota superior {cota_superior:.2f}, gap {gap:.4%}")
+        if gap <= gap_objetivo or lam < 1e-6:
+            break
+        if limite_tiempo is not None and time.perf_counter() - inicio >= limite_tiempo:
+            break
+
+        # Paso de subgradiente (Polyak) sobre la restricción de demanda dualizada
+        subgradiente = 1.0 - x.sum(axis=1)
+        norma = float(subgradiente @ subgradiente)
+        if norma == 0:
+            break
+        objetivo = cota_superior if np.isfinite(cota_superior) else cota * 1.05 + 1.0
+        u = u + lam * (objetivo - cota) / norma * subgradiente
+        if not single_source:
+            np.maximum(u, 0.0, out=u)
+
+    gap = (cota_superior - cota_inferior) / abs(cota_superior) if np.isfinite(cota_superior) else np.inf
+    abiertos, asignacion, partes = mejor_solucion if mejor_solucion is not None else (None, None, None)
+    return {
+        'cota_inferior': cota_inferior,
+        'cota_superior': cota_superior,
+        'gap': gap,
+        'abiertos': abiertos,
+        'asignacion': asignacion,
+        'partes': partes,
+        'multiplicadores': mejor_u,
+        'iteraciones': iteracion,
+        'tiempo': time.perf_counter() - inicio,
+    }
+
+
+def adoptar_primal(evaluador, relajacion):
+    """
+    Deja en el evaluador la solución primal de la relajación lagrangiana si es mejor
+    que la que tiene (o si la del evaluador es infactible). Con una mala solución
+    inicial, la cota superior lagrangiana es la que permite fijar variables en el
+    preproceso.
+
+    Parámetros:
+    - evaluador: EvaluadorCFLP de la misma instancia y formulación.
+    - relajacion: Resultado de relajacion_lagrangiana.
+
+    Retorna:
+    - True si se adoptó la solución de la relajación.
+    """
+    if relajacion['abiertos'] is None:
+        return False
+    if evaluador.factible and relajacion['cota_superior'] >= evaluador.costo:
+        return False
+    evaluador.restaurar((relajacion['abiertos'], relajacion['asignacion'], relajacion['partes']))
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cotas inferiores y soluciones heurísticas por relajación lagrangiana.")
+    parser.add_argument('-d', '--data', type=str, required=True, help="Ruta al archivo .txt o .dat de la instancia.")
+    parser.add_argument('--single', action='store_true', help="Relajar CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('-k', '--iterations', type=int, default=500, help="Número máximo de iteraciones.")
+    parser.add_argument('-g', '--gap', type=float, default=1e-4, help="Gap relativo objetivo.")
+    parser.add_argument('-t', '--time', type=float, default=None, help="Límite de tiempo en segundos.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        print(f"Error: El archivo de datos '{args.data}' no existe.")
+        sys.exit(1)
+
+    instancia = cargar_instancia(args.data)
+    resultado = relajacion_lagrangiana(instancia, args.single, args.iterations, args.gap, args.time)
+
+    print("\n--- LAGRANGIANO")
+    if resultado['abiertos'] is not None:
+        print(f"Centros abiertos: {np.flatnonzero(resultado['abiertos']).tolist()}")
+    print(f"Cota inferior: {resultado['cota_inferior']}")
+    print(f"Cota superior: {resultado['cota_superior']}")
+    print(f"Gap: {resultado['gap']:.4%}")
+    print(f"Iteraciones: {resultado['iteraciones']}, tiempo: {resultado['tiempo']:.2f} s")
@@ -0,0 +1,286 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+# Modelo CFLP en forma matricial: min costo @ v  s.t.  fila_inf <= A v <= fila_sup, col_inf <= v <= col_sup.
+# Las variables son primero x[i, j] para cada par (pares_i, pares_j) y luego y[j] para cada almacén.
+ModeloMatricial = namedtuple('ModeloMatricial', [
+    'costo', 'A', 'fila_inf', 'fila_sup', 'col_inf', 'col_sup', 'enteras',
+    'pares_i', 'pares_j', 'n', 'm', 'single_source',
+])
+
+# Heurísticas de HiGHS que resuelven un MIP auxiliar. El presolve de ese sub-MIP no
+# consulta el límite de tiempo ni los callbacks: en capb (CFLP.mod, con MIP start y sin
+# presolve) un límite de 12 s terminaba a los 15-20 s. Con límite de tiempo se desactivan
+# y el exceso medido queda por debajo de 0.9 s (límites de 2 a 12 s)
+HEURISTICAS_SUBMIP = ('mip_heuristic_run_rins', 'mip_heuristic_run_rens', 'mip_heuristic_run_root_reduced_cost')
+
+
+def todos_los_pares(n, m):
+    """Retorna los índices (i, j) de todos los pares cliente-almacén, en orden de filas."""
+    return np.repeat(np.arange(n), m), np.tile(np.arange(m), n)
+
+
+def construir_modelo(instancia, single_source=False, pares=None):
+    """
+    Construye CFLP.mod o CFLPsingle.mod como matriz de restricciones dispersa.
+
+    La matriz se arma en bloque a partir de arrays de índices (formato COO), sin ciclos
+    de Python por elemento. Las filas siguen el orden de las restricciones del .mod.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - single_source: Si es True se construye CFLPsingle.mod; si no, CFLP.mod.
+    - pares: Tupla (pares_i, pares_j) con los pares x[i, j] a incluir (por defecto, todos).
+
+    Retorna:
+    - ModeloMatricial con la matriz en formato CSC.
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    s = np.asarray(instancia.s, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    n, m = c.shape
+    pares_i, pares_j = pares if pares is not None else todos_los_pares(n, m)
+    pares_i = np.asarray(pares_i, dtype=np.int64)
+    pares_j = np.asarray(pares_j, dtype=np.int64)
+    p = pares_i.size
+    col_x = np.arange(p)
+    col_y = p + np.arange(m)
+
+    if single_source:
+        # SingleSource: sum_j x[i, j] = 1
+        # CapacityLimit: sum_i demand[i] x[i, j] - s[j] y[j] <= 0
+        # OpenFacility: x[i, j] - y[j] <= 0
+        filas = np.concatenate((pares_i, n + pares_j, n + np.arange(m), n + m + col_x, n + m + col_x))
+        columnas = np.concatenate((col_x, col_x, col_y, col_x, p + pares_j))
+        valores = np.concatenate((np.ones(p), demand[pares_i], -s, np.ones(p), -np.ones(p)))
+        fila_inf = np.concatenate((np.ones(n), np.full(m, -np.inf), np.full(p, -np.inf)))
+        fila_sup = np.concatenate((np.ones(n), np.zeros(m), np.zeros(p)))
+        col_sup = np.ones(p + m)
+        enteras = np.ones(p + m, dtype=bool)
+    else:
+        # AssignDemand: sum_j x[i, j] >= demand[i]
+        # CapacityLimit: sum_i x[i, j] - s[j] y[j] <= 0
+        # SufficientCapacity: sum_j s[j] y[j] >= sum_i demand[i]
+        filas = np.concatenate((pares_i, n + pares_j, n + np.arange(m), np.full(m, n + m)))
+        columnas = np.concatenate((col_x, col_x, col_y, col_y))
+        valores = np.concatenate((np.ones(p), np.ones(p), -s, s))
+        fila_inf = np.concatenate((demand, np.full(m, -np.inf), [demand.sum()]))
+        fila_sup = np.concatenate((np.full(n, np.inf), np.zeros(m), [np.inf]))
+        col_sup = np.concatenate((np.full(p, np.inf), np.ones(m)))
+        enteras = np.concatenate((np.zeros(p, dtype=bool), np.ones(m, dtype=bool)))
+
+    A = sp.csc_matrix((valores, (filas, columnas)), shape=(fila_inf.size, p + m))
+    costo = np.concatenate((c[pares_i, pares_j], f))
+    return ModeloMatricial(costo, A, fila_inf, fila_sup, np.zeros(p + m), col_sup, enteras,
+                           pares_i, pares_j, n, m, single_source)
+
+
+def vector_inicial(modelo, abiertos, x_inicial):
+    """
+    Arma el vector de valores iniciales (x de los pares del modelo, luego y).
+
+    Parámetros:
+    - modelo: ModeloMatricial.
+    - abiertos: Array booleano (m,) con los almacenes abiertos.
+    - x_inicial: Array (n, m) con los valores iniciales de x.
+    """
+    x = np.asarray(x_inicial, dtype=np.float64)[modelo.pares_i, modelo.pares_j]
+    return np.concatenate((x, np.asarray(abiertos, dtype=np.float64)))
+
+
+def crear_highs(modelo, gap=1e-4, y_fijo=None, relajar=False, verbose=False):
+    """
+    Crea un objeto Highs con el ModeloMatricial cargado, listo para resolver o para
+    agregarle columnas y filas.
+
+    Parámetros:
+    - modelo: ModeloMatricial.
+    - gap: Gap relativo de término del MIP.
+    - y_fijo: Array (m,) con valores para fijar las variables y (opcional).
+    - relajar: Si es True se carga la relajación lineal.
+    - verbose: Si es True se muestra el log de HiGHS.
+    """
+    import highspy
+
+    A = modelo.A
+    p = modelo.pares_i.size
+    col_inf = modelo.col_inf.copy()
+    col_sup = modelo.col_sup.copy()
+    if y_fijo is not None:
+        col_inf[p:] = col_sup[p:] = np.asarray(y_fijo, dtype=np.float64)
+
+    inf = highspy.kHighsInf
+    lp = highspy.HighsLp()
+    lp.num_col_ = A.shape[1]
+    lp.num_row_ = A.shape[0]
+    lp.col_cost_ = modelo.costo
+    lp.col_lower_ = col_inf
+    lp.col_upper_ = np.where(np.isinf(col_sup), inf, col_sup)
+    lp.row_lower_ = np.where(np.isinf(modelo.fila_inf), -inf, modelo.fila_inf)
+    lp.row_upper_ = np.where(np.isinf(modelo.fila_sup), inf, modelo.fila_sup)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    if not relajar:
+        lp.integrality_ = np.where(modelo.enteras, highspy.HighsVarType.kInteger,
+                                   highspy.HighsVarType.kContinuous).tolist()
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', bool(verbose))
+    h.setOptionValue('mip_rel_gap', float(gap))
+    h.passModel(lp)
+    return h
+
+
+def resolver_highs(modelo, limite_tiempo=None, max_nodos=None, gap=1e-4, valores_iniciales=None, y_fijo=None,
+                   objetivo_parada=None, al_mejorar=None, proveedor=None, relajar=False, verbose=False, h=None,
+                   al_progresar=None):
+    """
+    Resuelve un ModeloMatricial con HiGHS.
+
+    Parámetros:
+    - modelo: ModeloMatricial.
+    - limite_tiempo: Límite de tiempo en segundos (opcional). Con límite se desactivan
+      las heurísticas de HEURISTICAS_SUBMIP, que no lo respetan.
+    - max_nodos: Número máximo de nodos del branch and bound (opcional).
+    - gap: Gap relativo de término.
+    - valores_iniciales: Vector con una solución inicial (MIP start) (opcional).
+    - y_fijo: Array (m,) con valores para fijar las variables y (opcional).
+    - objetivo_parada: Se detiene en cuanto el incumbente alcanza este valor (opcional),
+      como BestObjStop de Gurobi.
+    - al_mejorar: Función que recibe el costo y el vector de valores de cada nuevo
+      incumbente del MIP (opcional).
+    - proveedor: Función sin argumentos que retorna una solución heurística nueva
+      (abiertos, x_inicial, costo) o None. Se consulta durante el branch and bound y
+      sus soluciones se inyectan como incumbentes (opcional).
+    - relajar: Si es True se resuelve la relajación lineal (entrega duales).
+    - verbose: Si es True se muestra el log de HiGHS.
+    - al_progresar: Función que recibe el incumbente y la cota del branch and bound
+      cada vez que HiGHS consulta si debe interrumpir; si retorna True, la
+      resolución se detiene (opcional).
+    - h: Objeto Highs creado con crear_highs(modelo) para reutilizarlo entre
+      resoluciones (opcional). Las opciones de esta llamada reemplazan a las
+      anteriores, y y_fijo y los callbacks se retiran al terminar, así que el objeto
+      queda listo para la siguiente. relajar no se aplica a un objeto reutilizado.
+
+    Retorna:
+    - Diccionario con estado, objetivo, cota, valores, duales de filas y columnas
+      (solo si relajar=True) y tiempo.
+    """
+    inicio = time.perf_counter()
+    if h is None:
+        h = crear_highs(modelo, gap=gap, y_fijo=y_fijo, relajar=relajar, verbose=verbose)
+        reutilizado = False
+    else:
+        import highspy
+
+        reutilizado = True
+        h.clearSolver()
+        h.setOptionValue('output_flag', bool(verbose))
+        h.setOptionValue('mip_rel_gap', float(gap))
+        h.setOptionValue('time_limit', highspy.kHighsInf)
+        h.setOptionValue('mip_max_nodes', highspy.kHighsIInf)
+        if y_fijo is not None:
+            p = modelo.pares_i.size
+            y_fijo = np.asarray(y_fijo, dtype=np.float64)
+            h.changeColsBounds(modelo.m, np.arange(p, p + modelo.m, dtype=np.int32), y_fijo, y_fijo)
+    if limite_tiempo is not None:
+        h.setOptionValue('time_limit', float(limite_tiempo))
+    for opcion in HEURISTICAS_SUBMIP:
+        h.setOptionValue(opcion, limite_tiempo is None)
+    if max_nodos is not None:
+        h.setOptionValue('mip_max_nodes', int(max_nodos))
+    suscritos = []
+
+    if objetivo_parada is not None and not relajar:
+        def _parar(evento):
+            if evento.data_out.objective_function_value <= objetivo_parada:
+                evento.interrupt()
+        h.cbMipInterrupt += _parar
+        suscritos.append((h.cbMipInterrupt, _parar))
+
+    if al_progresar is not None and not relajar:
+        def _progreso(evento):
+            if al_progresar(evento.data_out.mip_primal_bound, evento.data_out.mip_dual_bound):
+                evento.interrupt()
+        h.cbMipInterrupt += _progreso
+        suscritos.append((h.cbMipInterrupt, _progreso))
+
+    if al_mejorar is not None and not relajar:
+        def _mejorar(evento):
+            al_mejorar(evento.data_out.objective_function_value, np.asarray(evento.data_out.mip_solution))
+        h.cbMipImprovingSolution += _mejorar
+        suscritos.append((h.cbMipImprovingSolution, _mejorar))
+
+    if proveedor is not None and not relajar:
+        def _inyectar(evento):
+            solucion = proveedor()
+            if solucion is None or solucion[2] >= evento.data_out.mip_primal_bound:
+                return
+            abiertos, x_inicial, _ = solucion
+            valores = vector_inicial(modelo, abiertos, x_inicial)
+            # En un modelo reducido la solución puede usar pares que no están en el modelo
+            if valores[:modelo.pares_i.size].sum() >= np.asarray(x_inicial).sum() - 1e-6:
+                evento.data_in.setSolution(valores)
+        h.cbMipUserSolution += _inyectar
+        suscritos.append((h.cbMipUserSolution, _inyectar))
+
+    if valores_iniciales is not None and not relajar:
+        import highspy
+
+        solucion = highspy.HighsSolution()
+        solucion.col_value = np.asarray(valores_iniciales, dtype=np.float64).tolist()
+        solucion.value_valid = True
+        h.setSolution(solucion)
+
+    try:
+        h.run()
+        info = h.getInfo()
+        solucion = h.getSolution()
+        valores = np.array(solucion.col_value) if solucion.value_valid else None
+        resultado = {
+            'estado': h.modelStatusToString(h.getModelStatus()),
+            'objetivo': info.objective_function_value if valores is not None else float('inf'),
+            'cota': info.objective_function_value if relajar else info.mip_dual_bound,
+            'valores': valores,
+            'duales_filas': np.array(solucion.row_dual) if relajar and solucion.dual_valid else None,
+            'duales_columnas': np.array(solucion.col_dual) if relajar and solucion.dual_valid else None,
+            'nodos': info.mip_node_count,
+            'tiempo': time.perf_counter() - inicio,
+        }
+    finally:
+        if reutilizado:
+            # Se lee el resultado antes de restaurar: cambiar las cotas descarta la solución
+            for callback, funcion in suscritos:
+                callback -= funcion
+            if y_fijo is not None:
+                h.changeColsBounds(modelo.m, np.arange(p, p + modelo.m, dtype=np.int32),
+                                   modelo.col_inf[p:], modelo.col_sup[p:])
+    return resultado
+
+
+def extraer_solucion(modelo, valores, tolerancia=1e-6):
+    """
+    Convierte el vector de valores del modelo en almacenes abiertos y una matriz x dispersa.
+
+    Parámetros:
+    - modelo: ModeloMatricial.
+    - valores: Vector de valores de las variables.
+    - tolerancia: Valores de x menores a esta tolerancia se consideran cero.
+
+    Retorna:
+    - abiertos: Array booleano (m,).
+    - x: Matriz dispersa CSR (n, m) con las asignaciones no nulas.
+    """
+    p = modelo.pares_i.size
+    abiertos = valores[p:] > 0.5
+    x = valores[:p]
+    no_nulos = x > tolerancia
+    x = sp.csr_matrix((x[no_nulos], (modelo.pares_i[no_nulos], modelo.pares_j[no_nulos])),
+                      shape=(modelo.n, modelo.m))
+    return abiertos, x
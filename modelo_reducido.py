@@ -0,0 +1,278 @@
+import time
+
+import numpy as np
+
+from modelo_matricial import construir_modelo, crear_highs, resolver_highs, vector_inicial
+
+# Tolerancia para considerar negativo un costo reducido
+EPS_REDUCIDO = 1e-7
+
+# Fracción del límite de tiempo de resolver_reducido que puede usar la generación de
+# columnas de la LP; el resto queda para el MIP
+FRACCION_LP = 0.5
+
+
+def pares_k_cercanos(c, k):
+    """
+    Selecciona, para cada cliente, los k almacenes de menor costo de asignación.
+
+    Parámetros:
+    - c: Matriz de costos de asignación (n, m).
+    - k: Número de almacenes por cliente.
+
+    Retorna:
+    - Array booleano (n, m) con los pares incluidos.
+    """
+    c = np.asarray(c)
+    n, m = c.shape
+    incluidos = np.zeros((n, m), dtype=bool)
+    if k >= m:
+        incluidos[:] = True
+        return incluidos
+    cercanos = np.argpartition(c, k - 1, axis=1)[:, :k]
+    incluidos[np.arange(n)[:, None], cercanos] = True
+    return incluidos
+
+
+def costos_reducidos(instancia, single_source, duales, n, m):
+    """
+    Calcula el costo reducido de todas las columnas x[i, j] con los duales de la
+    relajación lineal, sin construir el modelo completo.
+
+    Las columnas x solo aparecen en la fila de demanda del cliente y en la fila de
+    capacidad del almacén (y, en CFLPsingle.mod, en su fila OpenFacility, cuyo dual es
+    cero mientras la columna no está en el modelo).
+
+    Retorna:
+    - Array (n, m) con c[i, j] - (A^T duales)[i, j].
+    """
+    c = np.asarray(instancia.c, dtype=np.float64)
+    u = duales[:n]
+    w = duales[n:n + m]
+    if single_source:
+        return c - u[:, None] - np.asarray(instancia.demand, dtype=np.float64)[:, None] * w[None, :]
+    return c - u[:, None] - w[None, :]
+
+
+def _agregar_columnas(h, instancia, single_source, pares, col_y, n):
+    """
+    Agrega al objeto Highs las columnas x[i, j] de los pares dados (y, en CFLPsingle.mod,
+    su fila OpenFacility), sin reconstruir el modelo.
+    """
+    pares_i, pares_j = pares
+    q = pares_i.size
+    inicio_col = h.getNumCol()
+    costos = np.asarray(instancia.c, dtype=np.float64)[pares_i, pares_j]
+    indices = np.column_stack((pares_i, n + pares_j)).ravel().astype(np.int32)
+    if single_source:
+        valores = np.column_stack((np.ones(q), np.asarray(instancia.demand, dtype=np.float64)[pares_i])).ravel()
+        superior = np.ones(q)
+    else:
+        valores = np.ones(2 * q)
+        superior = np.full(q, np.inf)
+    inicios = np.arange(0, 2 * q, 2, dtype=np.int32)
+    h.addCols(q, costos, np.zeros(q), superior, 2 * q, inicios, indices, valores)
+    if single_source:
+        # OpenFacility: x[i, j] - y[j] <= 0
+        columnas = np.column_stack((inicio_col + np.arange(q), col_y + pares_j)).ravel().astype(np.int32)
+        valores = np.tile([1.0, -1.0], q)
+        h.addRows(q, np.full(q, -np.inf), np.zeros(q), 2 * q, inicios, columnas, valores)
+
+
+def _agregar_pares(incluidos, reducidos, umbral, max_columnas):
+    """
+    Marca en incluidos los pares descartados con costo reducido < umbral (las más
+    negativas primero si superan max_columnas). Retorna cuántos se agregaron.
+    """
+    candidatos = ~incluidos & (reducidos < umbral)
+    total = int(np.count_nonzero(candidatos))
+    if total > max_columnas and umbral <= -EPS_REDUCIDO:
+        filas, cols = np.nonzero(candidatos)
+        mejores = np.argpartition(reducidos[filas, cols], max_columnas - 1)[:max_columnas]
+        incluidos[filas[mejores], cols[mejores]] = True
+        return max_columnas
+    incluidos[candidatos] = True
+    return total
+
+
+def relajacion_lineal(instancia, single_source, incluidos, y_fijo=None, max_columnas=None, limite_tiempo=None,
+                      verbose=False):
+    """
+    Resuelve la relajación lineal del modelo denso por generación de columnas, partiendo
+    de los pares incluidos.
+
+    Con los duales de la LP reducida se calcula el costo reducido de todas las x[i, j]
+    descartadas y se agregan las negativas al mismo objeto Highs (cada ronda parte de
+    la base anterior), hasta que la LP reducida es óptima para la LP densa. Si la LP
+    reducida es infactible se amplía el vecindario de todos los clientes.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - single_source: Si es True se relaja CFLPsingle.mod; si no, CFLP.mod.
+    - incluidos: Array booleano (n, m) con los pares iniciales. Se actualiza con los
+      pares agregados.
+    - y_fijo: Array (m,) con valores para fijar las variables y (opcional).
+    - max_columnas: Máximo de columnas agregadas por ronda (por defecto, sin límite).
+    - limite_tiempo: Límite de tiempo total en segundos (opcional).
+    - verbose: Si es True se imprime el progreso del pricing.
+
+    Retorna:
+    - h: Objeto Highs con la LP reducida resuelta.
+    - reducidos: Array (n, m) con el costo reducido de todas las x con los duales finales
+      (None si se alcanzó el límite de tiempo antes de terminar).
+    - rondas: Número de rondas de pricing.
+    - col_y: Posición de la primera columna y en h (las columnas agregadas van al final).
+    """
+    inicio = time.perf_counter()
+    c = np.asarray(instancia.c)
+    n, m = c.shape
+    max_columnas = max_columnas or n * m
+    k = int(incluidos.sum(axis=1).min())
+    rondas = 0
+    while True:
+        modelo = construir_modelo(instancia, single_source, np.nonzero(incluidos))
+        h = crear_highs(modelo, y_fijo=y_fijo, relajar=True)
+        col_y = modelo.pares_i.size
+        while True:
+            rondas += 1
+            if limite_tiempo is not None:
+                h.setOptionValue('time_limit', max(0.0, limite_tiempo - (time.perf_counter() - inicio)))
+            h.run()
+            solucion = h.getSolution()
+            estado = h.modelStatusToString(h.getModelStatus())
+            if estado == 'Time limit reached':
+                return h, None, rondas, col_y
+            if estado != 'Optimal' or not solucion.dual_valid:
+                break
+            anteriores = incluidos.copy()
+            reducidos = costos_reducidos(instancia, single_source, np.array(solucion.row_dual), n, m)
+            agregadas = _agregar_pares(incluidos, reducidos, -EPS_REDUCIDO, max_columnas)
+            if verbose:
+                print(f"Pricing LP {rondas}: cota {h.getInfo().objective_function_value:.4f}, "
+                      f"{agregadas} columnas agregadas")
+            if not agregadas:
+                break
+            _agregar_columnas(h, instancia, single_source, np.nonzero(incluidos & ~anteriores), col_y, n)
+        if solucion.dual_valid:
+            return h, reducidos, rondas, col_y
+        if incluidos.all():
+            raise RuntimeError(f"El modelo denso no tiene solución ({h.modelStatusToString(h.getModelStatus())})")
+        k = min(2 * max(k, 1), m)
+        incluidos |= pares_k_cercanos(c, k)
+
+
+def resolver_reducido(instancia, single_source=False, k=10, limite_tiempo=None, max_nodos=None, gap=1e-4,
+                      abiertos_iniciales=None, x_inicial=None, y_fijo=None, objetivo_parada=None,
+                      max_columnas_por_ronda=None, al_mejorar=None, proveedor=None, verbose=False):
+    """
+    Resuelve CFLP.mod / CFLPsingle.mod con HiGHS usando solo los k almacenes más baratos
+    de cada cliente, y recupera la optimalidad del modelo denso por pricing.
+
+    1. Generación de columnas sobre la relajación lineal: con los duales de la LP
+       reducida se calcula el costo reducido de todas las x[i, j] descartadas y se
+       agregan las negativas, hasta que la LP reducida es óptima para la LP densa.
+       Con límite de tiempo, esta fase usa a lo más FRACCION_LP de él; si no termina,
+       el MIP se resuelve con las columnas agregadas hasta ese momento y la solución
+       queda sin certificar.
+    2. Se resuelve el MIP reducido.
+    3. Cierre de optimalidad con la cota LP (z_lp) y el incumbente (z):
+       - CFLPsingle.mod: x es binaria, así que una solución que use una columna
+         descartada cuesta al menos z_lp + costo reducido. Se agregan todas las
+         columnas con costo reducido menor que z - z_lp y se vuelve a resolver; el
+         óptimo del modelo reducido queda probado como óptimo del denso.
+       - CFLP.mod con y fijo: el modelo es una LP y la fase 1 ya es exacta.
+       - CFLP.mod con y libre: x es continua y el argumento anterior no aplica. Se
+         fijan los almacenes abiertos, se hace pricing sobre el transporte resultante
+         y se vuelve a resolver el MIP mientras aparezcan columnas negativas. La
+         solución es óptima para sus almacenes abiertos, pero no queda certificada
+         como óptimo del modelo denso.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - single_source: Si es True se resuelve CFLPsingle.mod; si no, CFLP.mod.
+    - k: Número inicial de almacenes por cliente.
+    - limite_tiempo: Límite de tiempo total del MIP en segundos (opcional).
+    - max_nodos: Número máximo de nodos de cada resolución del MIP (opcional).
+    - gap: Gap relativo de término del MIP.
+    - abiertos_iniciales: Array booleano (m,) de una solución inicial (opcional).
+    - x_inicial: Array (n, m) con la asignación de la solución inicial (opcional). Sus
+      pares no nulos se incluyen en el modelo reducido.
+    - y_fijo: Array (m,) con valores para fijar las variables y (opcional).
+    - objetivo_parada: Se detiene en cuanto el incumbente alcanza este valor (opcional).
+    - max_columnas_por_ronda: Máximo de columnas agregadas por ronda de pricing
+      (por defecto, k * n).
+    - al_mejorar: Función que recibe el costo y los valores de cada incumbente del MIP (opcional).
+    - proveedor: Función que entrega soluciones heurísticas para inyectar (ver resolver_highs).
+    - verbose: Si es True se imprime el progreso del pricing.
+
+    Retorna:
+    - modelo: ModeloMatricial reducido final.
+    - resultado: Diccionario de resolver_highs del último MIP, con además cota_lp (None
+      si la generación de columnas no terminó),
+      columnas (finales y densas), rondas de pricing y la bandera probado (True si la
+      solución está certificada como óptima del modelo denso).
+    """
+    inicio = time.perf_counter()
+    c = np.asarray(instancia.c)
+    n, m = c.shape
+    incluidos = pares_k_cercanos(c, k)
+    if x_inicial is not None:
+        incluidos |= np.asarray(x_inicial) > 0
+    max_columnas = max_columnas_por_ronda or k * n
+
+    def _modelo():
+        return construir_modelo(instancia, single_source, np.nonzero(incluidos))
+
+    # Fase 1: generación de columnas sobre la relajación lineal
+    limite_lp = FRACCION_LP * limite_tiempo if limite_tiempo is not None else None
+    h, reducidos, rondas, _ = relajacion_lineal(instancia, single_source, incluidos, y_fijo, max_columnas,
+                                                limite_tiempo=limite_lp, verbose=verbose)
+    modelo = _modelo()
+    cota_lp = h.getInfo().objective_function_value if reducidos is not None else None
+    if reducidos is None and verbose:
+        print(f"Pricing LP detenido por tiempo tras {rondas} rondas: se sigue con {int(incluidos.sum())} columnas")
+
+    # Fase 2 y 3: MIP reducido y cierre de optimalidad
+    valores_iniciales = None
+    if abiertos_iniciales is not None and x_inicial is not None:
+        valores_iniciales = vector_inicial(modelo, abiertos_iniciales, x_inicial)
+    while True:
+        restante = None if limite_tiempo is None else max(0.0, limite_tiempo - (time.perf_counter() - inicio))
+        mip = resolver_highs(modelo, limite_tiempo=restante, max_nodos=max_nodos, gap=gap,
+                             valores_iniciales=valores_iniciales, y_fijo=y_fijo, objetivo_parada=objetivo_parada,
+                             al_mejorar=al_mejorar, proveedor=proveedor)
+        if mip['valores'] is None:
+            break
+        p = modelo.pares_i.size
+        abiertos = mip['valores'][p:] > 0.5
+        x_actual = np.zeros((n, m))
+        x_actual[modelo.pares_i, modelo.pares_j] = mip['valores'][:p]
+
+        if single_source:
+            # Sin los costos reducidos de una LP terminada no hay cierre de optimalidad
+            agregadas = (_agregar_pares(incluidos, reducidos, mip['objetivo'] - cota_lp, max_columnas)
+                         if reducidos is not None else 0)
+        else:
+            transporte = resolver_highs(modelo, y_fijo=abiertos.astype(float), relajar=True)
+            agregadas = 0
+            if transporte['duales_filas'] is not None:
+                agregadas = _agregar_pares(incluidos, costos_reducidos(instancia, False, transporte['duales_filas'],
+                                                                       n, m), -EPS_REDUCIDO, max_columnas)
+        rondas += 1
+        if verbose:
+            print(f"Pricing MIP {rondas}: objetivo {mip['objetivo']:.4f}, {agregadas} columnas agregadas")
+        if not agregadas or (restante is not None and restante <= 0):
+            break
+        modelo = _modelo()
+        valores_iniciales = vector_inicial(modelo, abiertos, x_actual)
+
+    resultado = dict(mip)
+    resultado['cota_lp'] = cota_lp
+    resultado['columnas'] = int(modelo.pares_i.size)
+    resultado['columnas_densas'] = n * m
+    resultado['rondas'] = rondas
+    certificable = ((single_source or y_fijo is not None) and reducidos is not None) or incluidos.all()
+    resultado['probado'] = bool(certificable and mip['valores'] is not None and not agregadas
+                                and mip['estado'] == 'Optimal')
+    resultado['tiempo'] = time.perf_counter() - inicio
+    return modelo, resultado
@@ -0,0 +1,477 @@
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from lagrangiano import adoptar_primal, mochilas_almacenes, relajacion_lagrangiana
+from modelo_matricial import construir_modelo
+from modelo_reducido import pares_k_cercanos, relajacion_lineal
+
+# Margen relativo sobre la cota superior: una variable se fija solo si forzarla lleva la
+# cota inferior por encima de cota_superior * (1 + TOLERANCIA), lo que absorbe el error
+# numérico de los duales y de los multiplicadores
+TOLERANCIA = 1e-7
+
+# Fuentes de cotas para la fijación por costo reducido
+FUENTES = ('lp', 'lagrangiano')
+
+# Resultado del preproceso:
+# - y_inf, y_sup: Cotas (m,) de las y (y_sup = 0: almacén cerrado; y_inf = 1: abierto).
+# - x_sup: Array (n, m) con la cota superior de cada x en las unidades del modelo
+#   (demanda en CFLP.mod, 0/1 en CFLPsingle.mod); 0 indica un par eliminado.
+# - dominancia: Array (q, 2) de pares (j, k) con la restricción y[j] <= y[k].
+# - cota_inferior: Mejor cota inferior calculada (LP o lagrangiana).
+# - cota_superior: Costo del incumbente respecto del que se fijó.
+# - estadisticas: Diccionario con lo eliminado por cada regla y los tiempos.
+Preproceso = namedtuple('Preproceso', [
+    'y_inf', 'y_sup', 'x_sup', 'dominancia', 'cota_inferior', 'cota_superior', 'estadisticas',
+])
+
+
+def _valor_apertura(v, s, demanda, abiertos, cerrados):
+    """
+    Resuelve la relajación lineal de la mochila de apertura del subproblema lagrangiano
+    (min sum v[j] y[j] s.a. sum s[j] y[j] >= demanda) con almacenes forzados.
+
+    Retorna:
+    - Valor óptimo (inf si la capacidad de los almacenes no cerrados no alcanza).
+    """
+    libres = ~abiertos & ~cerrados
+    valor = float(v[abiertos].sum() + v[libres & (v < 0)].sum())
+    faltante = demanda - s[abiertos].sum() - s[libres & (v < 0)].sum()
+    if faltante <= 0:
+        return valor
+    resto = np.flatnonzero(libres & (v >= 0))
+    resto = resto[np.argsort(v[resto] / s[resto], kind='stable')]
+    acumulado = np.cumsum(s[resto])
+    if resto.size == 0 or acumulado[-1] < faltante:
+        return np.inf
+    ultimo = int(np.searchsorted(acumulado, faltante))
+    completos = resto[:ultimo]
+    previo = acumulado[ultimo - 1] if ultimo else 0.0
+    return valor + float(v[completos].sum()) + v[resto[ultimo]] * (faltante - previo) / s[resto[ultimo]]
+
+
+def fijar_lagrangiano(instancia, single_source, u, umbral, y_inf, y_sup, x_sup):
+    """
+    Fijación por costo reducido lagrangiano con los multiplicadores u.
+
+    Con la demanda dualizada, la cota L(u) se separa en una mochila por almacén (valor
+    v[j]) y la mochila de apertura. Forzar y[j] = 1 (o 0) y volver a resolver la mochila
+    de apertura da una cota inferior de toda solución con ese valor; si supera el umbral,
+    y[j] se fija al valor contrario. Para un almacén que puede abrirse, forzar una
+    fracción t del cliente i sube su mochila al menos (t - x[i, j]) * r[i, j], con r el
+    costo reducido del cliente: en CFLPsingle.mod (t = 1) eso elimina el par y en
+    CFLP.mod acota la cantidad x[i, j].
+
+    Los arrays y_inf, y_sup y x_sup se actualizan en el lugar.
+
+    Retorna:
+    - Cota lagrangiana L(u) con las fijaciones previas.
+    """
+    s = np.asarray(instancia.s, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    c = np.asarray(instancia.c, dtype=np.float64)
+    costos = c if single_source else c * demand[:, None]
+    reducidos = costos - u[:, None]
+    v, x = mochilas_almacenes(reducidos, demand, s, f)
+    base = float(u.sum())
+    demanda_total = float(demand.sum())
+
+    abiertos = y_inf > 0.5
+    cerrados = y_sup < 0.5
+    cota = base + _valor_apertura(v, s, demanda_total, abiertos, cerrados)
+    forzado_abierto = np.full(v.size, np.inf)
+    for j in np.flatnonzero(~abiertos & ~cerrados).tolist():
+        abiertos[j] = True
+        forzado_abierto[j] = base + _valor_apertura(v, s, demanda_total, abiertos, cerrados)
+        abiertos[j] = False
+        cerrados[j] = True
+        forzado_cerrado = base + _valor_apertura(v, s, demanda_total, abiertos, cerrados)
+        cerrados[j] = False
+        if forzado_abierto[j] > umbral:
+            y_sup[j] = 0.0
+        elif forzado_cerrado > umbral:
+            y_inf[j] = 1.0
+    forzado_abierto[abiertos] = cota
+
+    # Pares de los almacenes que pueden abrirse: r > 0 implica x = 0 en su mochila
+    holgura = (umbral - forzado_abierto)[None, :]
+    con_costo = (reducidos > 0) & (y_sup > 0.5)[None, :]
+    if single_source:
+        x_sup[con_costo & ((1 - x) * reducidos > holgura)] = 0.0
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraccion = np.where(con_costo, np.maximum(holgura, 0.0) / reducidos, np.inf)
+        np.minimum(x_sup, fraccion * demand[:, None], out=x_sup)
+    return cota
+
+
+def fijar_lp(instancia, single_source, umbral, y_inf, y_sup, x_sup, k=10, limite_tiempo=None):
+    """
+    Fijación por costo reducido de la relajación lineal.
+
+    La LP se resuelve por generación de columnas desde los k almacenes más baratos de
+    cada cliente (ver modelo_reducido.relajacion_lineal), así que al terminar todos los
+    costos reducidos son no negativos. Para toda solución entera, costo >= z_lp + suma
+    de d[v] * (distancia de v a su cota en la LP): una y con d > 0 se cierra si
+    z_lp + d supera el umbral, una con d < 0 se abre si z_lp - d lo supera, y cada x
+    queda acotada por (umbral - z_lp) / d (eliminada si es binaria y no alcanza 1). En
+    CFLPsingle.mod el costo reducido de las x se calcula sin la fila OpenFacility, cuyo
+    dual solo puede aumentarlo, así que la cota sigue siendo válida.
+
+    Los arrays y_inf, y_sup y x_sup se actualizan en el lugar.
+
+    Retorna:
+    - Cota de la relajación lineal z_lp (None si la LP no terminó dentro de
+      limite_tiempo; en ese caso no se fija nada).
+    """
+    c = np.asarray(instancia.c)
+    h, reducidos, _, col_y = relajacion_lineal(instancia, single_source, pares_k_cercanos(c, k),
+                                               limite_tiempo=limite_tiempo)
+    if reducidos is None:
+        return None
+    z_lp = h.getInfo().objective_function_value
+    m = c.shape[1]
+    d_y = np.array(h.getSolution().col_dual)[col_y:col_y + m]
+
+    y_sup[(d_y > 0) & (z_lp + d_y > umbral)] = 0.0
+    y_inf[(d_y < 0) & (z_lp - d_y > umbral)] = 1.0
+    positivos = reducidos > 0
+    if single_source:
+        x_sup[positivos & (z_lp + reducidos > umbral)] = 0.0
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cota_x = np.where(positivos, max(umbral - z_lp, 0.0) / reducidos, np.inf)
+        np.minimum(x_sup, cota_x, out=x_sup)
+    return z_lp
+
+
+def pares_dominados(instancia, single_source=False):
+    """
+    Busca los almacenes dominados: j está dominado por k si s[k] >= s[j], f[k] <= f[j]
+    y c[i, k] <= c[i, j] para todo cliente i.
+
+    En una solución con j abierto y k cerrado, pasar los clientes de j a k no aumenta
+    el costo y respeta la capacidad, así que la restricción y[j] <= y[k] conserva al
+    menos una solución óptima (en ambas formulaciones). Entre almacenes idénticos solo
+    se conserva el par hacia el de menor índice, para que la relación no tenga ciclos.
+
+    Retorna:
+    - Array (q, 2) con los pares (j, k).
+    """
+    s = np.asarray(instancia.s, dtype=np.float64)
+    f = np.asarray(instancia.f, dtype=np.float64)
+    c = np.asarray(instancia.c, dtype=np.float64)
+    m = s.size
+    pares = []
+    for j in range(m):
+        candidatos = np.flatnonzero((s >= s[j]) & (f <= f[j]))
+        candidatos = candidatos[candidatos != j]
+        if candidatos.size == 0:
+            continue
+        menores = (c[:, candidatos] <= c[:, [j]]).all(axis=0)
+        iguales = (s[candidatos] == s[j]) & (f[candidatos] == f[j]) & (c[:, candidatos] == c[:, [j]]).all(axis=0)
+        for k in candidatos[menores & (~iguales | (candidatos < j))].tolist():
+            pares.append((j, k))
+    return np.array(pares, dtype=np.int64).reshape(-1, 2)
+
+
+def _propagar_dominancia(pares, y_inf, y_sup):
+    """Propaga las fijaciones por y[j] <= y[k] hasta que no cambian. Retorna las y fijadas así."""
+    fijadas = 0
+    cambio = pares.size > 0
+    while cambio:
+        cambio = False
+        for j, k in pares.tolist():
+            if y_sup[k] < 0.5 and y_sup[j] > 0.5:
+                y_sup[j] = 0.0
+                fijadas += 1
+                cambio = True
+            if y_inf[j] > 0.5 and y_inf[k] < 0.5:
+                y_inf[k] = 1.0
+                fijadas += 1
+                cambio = True
+    return fijadas
+
+
+def preprocesar(instancia, single_source=False, cota_superior=None, abiertos=None, fuentes=FUENTES,
+                multiplicadores=None, dominancia=False, k=10, limite_tiempo=None, verbose=True):
+    """
+    Reduce el modelo antes del MIP: fija almacenes y elimina o acota pares x[i, j] que no
+    pueden estar en ninguna solución mejor que el incumbente, y opcionalmente agrega las
+    restricciones de dominancia entre almacenes.
+
+    Reglas, en orden:
+    1. Pares imposibles: en CFLPsingle.mod, clientes cuya demanda supera la capacidad
+       del almacén; en CFLP.mod, x[i, j] <= min(demand[i], s[j]).
+    2. Costo reducido lagrangiano (ver fijar_lagrangiano).
+    3. Costo reducido de la relajación lineal (ver fijar_lp). En CFLP.mod la LP es débil
+       (no tiene x[i, j] <= demand[i] y[j]) y la cota lagrangiana suele fijar mucho más.
+    4. Dominancia (opcional, ver pares_dominados): agrega y[j] <= y[k], propaga las
+       fijaciones y descarta las restricciones que ya quedan implícitas.
+    5. Las x de los almacenes cerrados se eliminan.
+
+    Toda solución que viole una fijación cuesta más que cota_superior, y la dominancia
+    conserva al menos una solución óptima, así que el óptimo del modelo reducido es el
+    del original (o el incumbente ya era óptimo).
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - single_source: Si es True se preprocesa CFLPsingle.mod; si no, CFLP.mod.
+    - cota_superior: Costo de una solución factible conocida (sin ella no se fija nada
+      por costo reducido).
+    - abiertos: Array booleano (m,) de esa solución (opcional). Las restricciones de
+      dominancia que no cumple se descartan, para que siga sirviendo como MIP start.
+    - fuentes: Fuentes de cotas a usar, subconjunto de FUENTES.
+    - multiplicadores: Multiplicadores lagrangianos ya calculados (opcional; si no se
+      entregan se ejecuta la relajación lagrangiana).
+    - dominancia: Si es True se aplican las reglas de dominancia (costo O(m^2 n)).
+    - k: Almacenes por cliente con que parte la generación de columnas de la LP.
+    - limite_tiempo: Límite de tiempo de la relajación lagrangiana y de la LP, cada una
+      (opcional). En CFLPsingle.mod la LP de las instancias grandes puede tardar
+      minutos; si no termina, esa fuente se omite.
+    - verbose: Si es True se imprime el resumen.
+
+    Retorna:
+    - Preproceso.
+    """
+    inicio = time.perf_counter()
+    s = np.asarray(instancia.s, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    n, m = np.asarray(instancia.c).shape
+    y_inf = np.zeros(m)
+    y_sup = np.ones(m)
+    if single_source:
+        x_sup = (demand[:, None] <= s[None, :]).astype(np.float64)
+    else:
+        x_sup = np.minimum(demand[:, None], s[None, :])
+    estadisticas = {'variables': n * m + m, 'pares_imposibles': int(np.count_nonzero(x_sup == 0))}
+    tiempos = {}
+    cota_inferior = -np.inf
+    umbral = np.inf if cota_superior is None else cota_superior + TOLERANCIA * abs(cota_superior)
+
+    def _contar(nombre, antes):
+        cerradas, abiertas, pares = antes
+        estadisticas[f'y_cerradas_{nombre}'] = int(np.count_nonzero(y_sup < 0.5)) - cerradas
+        estadisticas[f'y_abiertas_{nombre}'] = int(np.count_nonzero(y_inf > 0.5)) - abiertas
+        estadisticas[f'pares_{nombre}'] = int(np.count_nonzero(x_sup == 0)) - pares
+
+    def _estado():
+        return int(np.count_nonzero(y_sup < 0.5)), int(np.count_nonzero(y_inf > 0.5)), int(np.count_nonzero(x_sup == 0))
+
+    if np.isfinite(umbral) and 'lagrangiano' in fuentes:
+        tiempo = time.perf_counter()
+        if multiplicadores is None:
+            multiplicadores = relajacion_lagrangiana(instancia, single_source, limite_tiempo=limite_tiempo,
+                                                     verbose=False)['multiplicadores']
+        antes = _estado()
+        cota = fijar_lagrangiano(instancia, single_source, np.asarray(multiplicadores, dtype=np.float64), umbral,
+                                 y_inf, y_sup, x_sup)
+        # Los pares con una cota numéricamente nula se eliminan
+        x_sup[x_sup <= 1e-9 * demand[:, None]] = 0.0
+        _contar('lagrangiano', antes)
+        estadisticas['cota_lagrangiana'] = cota
+        cota_inferior = max(cota_inferior, cota)
+        tiempos['lagrangiano'] = time.perf_counter() - tiempo
+
+    if np.isfinite(umbral) and 'lp' in fuentes:
+        tiempo = time.perf_counter()
+        antes = _estado()
+        z_lp = fijar_lp(instancia, single_source, umbral, y_inf, y_sup, x_sup, k, limite_tiempo)
+        x_sup[x_sup <= 1e-9 * demand[:, None]] = 0.0
+        _contar('lp', antes)
+        estadisticas['cota_lp'] = z_lp
+        if z_lp is not None:
+            cota_inferior = max(cota_inferior, z_lp)
+        tiempos['lp'] = time.perf_counter() - tiempo
+
+    pares = np.zeros((0, 2), dtype=np.int64)
+    if dominancia:
+        tiempo = time.perf_counter()
+        pares = pares_dominados(instancia, single_source)
+        estadisticas['pares_dominancia'] = int(pares.shape[0])
+        estadisticas['y_dominancia'] = _propagar_dominancia(pares, y_inf, y_sup)
+        # Restricciones que ya se cumplen por las fijaciones o que el incumbente no cumple
+        utiles = (y_sup[pares[:, 0]] > 0.5) & (y_inf[pares[:, 1]] < 0.5)
+        if abiertos is not None:
+            abiertos = np.asarray(abiertos, dtype=bool)
+            utiles &= ~abiertos[pares[:, 0]] | abiertos[pares[:, 1]]
+        pares = pares[utiles]
+        tiempos['dominancia'] = time.perf_counter() - tiempo
+
+    if (y_inf > y_sup).any():
+        raise RuntimeError("El preproceso fijó un almacén abierto y cerrado a la vez (cota superior inválida)")
+    x_sup[:, y_sup < 0.5] = 0.0
+
+    pares_finales = int(np.count_nonzero(x_sup))
+    if not single_source:
+        estadisticas['pares_acotados'] = int(np.count_nonzero((x_sup > 0) & (x_sup < np.minimum(demand[:, None],
+                                                                                                  s[None, :]))))
+    estadisticas.update({
+        'y_cerradas': int(np.count_nonzero(y_sup < 0.5)),
+        'y_abiertas': int(np.count_nonzero(y_inf > 0.5)),
+        'pares_eliminados': n * m - pares_finales,
+        'pares_acotados': estadisticas.get('pares_acotados', 0),
+        'filas_dominancia': int(pares.shape[0]),
+        'variables_finales': pares_finales + m - int(np.count_nonzero(y_inf == y_sup)),
+        'tiempos': tiempos,
+        'tiempo': time.perf_counter() - inicio,
+    })
+    if verbose:
+        print(f"Preproceso: {estadisticas['y_cerradas']} almacenes cerrados y {estadisticas['y_abiertas']} abiertos "
+              f"de {m}, {estadisticas['pares_eliminados']} de {n * m} pares x eliminados "
+              f"({estadisticas['pares_acotados']} acotados), "
+              f"{estadisticas['filas_dominancia']} restricciones de dominancia "
+              f"({estadisticas['tiempo']:.2f} s, cota inferior {cota_inferior:.4f})")
+    return Preproceso(y_inf, y_sup, x_sup, pares, cota_inferior, cota_superior, estadisticas)
+
+
+def construir_modelo_preprocesado(instancia, single_source, preproceso):
+    """
+    Construye CFLP.mod o CFLPsingle.mod solo con los pares x que sobreviven al
+    preproceso, con las cotas de x e y ajustadas y las filas de dominancia
+    y[j] - y[k] <= 0 al final.
+
+    Retorna:
+    - ModeloMatricial.
+    """
+    pares = np.nonzero(preproceso.x_sup)
+    modelo = construir_modelo(instancia, single_source, pares)
+    p = modelo.pares_i.size
+    col_inf = modelo.col_inf.copy()
+    col_sup = modelo.col_sup.copy()
+    col_sup[:p] = np.minimum(col_sup[:p], preproceso.x_sup[pares])
+    col_inf[p:] = preproceso.y_inf
+    col_sup[p:] = preproceso.y_sup
+
+    A, fila_inf, fila_sup = modelo.A, modelo.fila_inf, modelo.fila_sup
+    q = preproceso.dominancia.shape[0]
+    if q:
+        filas = np.repeat(np.arange(q), 2)
+        columnas = p + preproceso.dominancia.ravel()
+        dominancia = sp.csc_matrix((np.tile([1.0, -1.0], q), (filas, columnas)), shape=(q, A.shape[1]))
+        A = sp.vstack((A, dominancia), format='csc')
+        fila_inf = np.concatenate((fila_inf, np.full(q, -np.inf)))
+        fila_sup = np.concatenate((fila_sup, np.zeros(q)))
+    return modelo._replace(A=A, fila_inf=fila_inf, fila_sup=fila_sup, col_inf=col_inf, col_sup=col_sup)
+
+
+# Columnas del reporte por instancia
+CAMPOS = ['instancia', 'variables', 'variables_finales', 'y_cerradas', 'y_abiertas', 'pares_eliminados',
+          'pares_acotados', 'filas_dominancia', 'cota_superior', 'cota_inferior', 'tiempo_cota_superior',
+          'tiempo_preproceso', 'objetivo_completo', 'estado_completo', 'tiempo_completo', 'objetivo_reducido',
+          'estado_reducido', 'tiempo_reducido']
+
+
+def reportar_instancia(ruta, single_source=False, dominancia=False, fuentes=FUENTES, limite_tiempo=None,
+                       resolver=True, semilla=0, limite_preproceso=None):
+    """
+    Preprocesa una instancia con el mejor incumbente del ILS y de la relajación
+    lagrangiana como cota superior y, si resolver es True, resuelve con HiGHS el modelo
+    completo y el reducido (con la misma solución inicial) para medir el efecto en el
+    tiempo de resolución.
+
+    Retorna:
+    - Diccionario con los campos de CAMPOS.
+    """
+    from ILS import iterated_local_search
+    from cache_evaluaciones import CacheEvaluaciones
+    from cache_instancias import cargar_instancia, cap_cost_array
+    from evaluador import EvaluadorCFLP
+    from modelo_matricial import resolver_highs, vector_inicial
+
+    instancia = cargar_instancia(ruta)
+    m = instancia.s.shape[0]
+    evaluador = EvaluadorCFLP(instancia, single_source)
+    inicio = time.perf_counter()
+    iterated_local_search(cap_cost_array(instancia), m, float(np.asarray(instancia.demand).sum()), seed=semilla,
+                          evaluator=evaluador, verbose=False, cache=CacheEvaluaciones(m))
+    # La relajación lagrangiana da los multiplicadores y, a veces, un incumbente mejor que el ILS
+    lagrangiano = relajacion_lagrangiana(instancia, single_source, verbose=False)
+    adoptar_primal(evaluador, lagrangiano)
+    tiempo_cota = time.perf_counter() - inicio
+    cota_superior = evaluador.costo if evaluador.factible else None
+    preproceso = preprocesar(instancia, single_source, cota_superior, evaluador.abiertos, fuentes,
+                             multiplicadores=lagrangiano['multiplicadores'], dominancia=dominancia,
+                             limite_tiempo=limite_preproceso)
+    estadisticas = preproceso.estadisticas
+    registro = {
+        'instancia': os.path.splitext(os.path.basename(ruta))[0],
+        'variables': estadisticas['variables'],
+        'variables_finales': estadisticas['variables_finales'],
+        'y_cerradas': estadisticas['y_cerradas'],
+        'y_abiertas': estadisticas['y_abiertas'],
+        'pares_eliminados': estadisticas['pares_eliminados'],
+        'filas_dominancia': estadisticas['filas_dominancia'],
+        'pares_acotados': estadisticas['pares_acotados'],
+        'cota_superior': cota_superior,
+        'cota_inferior': preproceso.cota_inferior,
+        'tiempo_cota_superior': tiempo_cota,
+        'tiempo_preproceso': estadisticas['tiempo'],
+    }
+    if resolver:
+        x_inicial = evaluador.x_inicial() if evaluador.factible else None
+        for nombre, modelo in (('completo', construir_modelo(instancia, single_source)),
+                               ('reducido', construir_modelo_preprocesado(instancia, single_source, preproceso))):
+            inicio = time.perf_counter()
+            valores_iniciales = vector_inicial(modelo, evaluador.abiertos, x_inicial) if x_inicial is not None else None
+            resultado = resolver_highs(modelo, limite_tiempo=limite_tiempo, valores_iniciales=valores_iniciales)
+            registro[f'objetivo_{nombre}'] = resultado['objetivo']
+            registro[f'estado_{nombre}'] = resultado['estado']
+            registro[f'tiempo_{nombre}'] = time.perf_counter() - inicio
+    return registro
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import glob
+
+    parser = argparse.ArgumentParser(description="Preproceso por costo reducido (LP y lagrangiano) y dominancia: "
+                                                 "reporta lo eliminado en cada instancia y el efecto en HiGHS.")
+    parser.add_argument('-i', '--instancias', type=str, nargs='+', default=['instancias/*.txt'],
+                        help="Rutas o patrones glob de las instancias (por defecto: instancias/*.txt).")
+    parser.add_argument('--single', action='store_true', help="Preprocesar CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('--dominancia', action='store_true', help="Aplicar también las reglas de dominancia.")
+    parser.add_argument('-f', '--fuentes', type=str, nargs='+', choices=FUENTES, default=list(FUENTES),
+                        help="Cotas usadas para fijar por costo reducido.")
+    parser.add_argument('-t', '--time', type=float, default=None, help="Límite de tiempo de cada resolución.")
+    parser.add_argument('--limite-preproceso', type=float, default=30,
+                        help="Límite de tiempo de la LP del preproceso (en CFLPsingle.mod puede tardar minutos).")
+    parser.add_argument('--sin-resolver', action='store_true',
+                        help="Solo preprocesar, sin comparar el tiempo de resolución.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del ILS que da la cota superior.")
+    parser.add_argument('-o', '--output', type=str, default=None, help="Archivo .csv del reporte (opcional).")
+    args = parser.parse_args()
+
+    rutas = []
+    for patron in args.instancias:
+        encontradas = sorted(glob.glob(patron))
+        if not encontradas:
+            print(f"Error: No se encontraron instancias para '{patron}'.")
+            sys.exit(1)
+        rutas.extend(encontradas)
+
+    registros = []
+    for ruta in rutas:
+        registro = reportar_instancia(ruta, args.single, args.dominancia, args.fuentes, args.time,
+                                      not args.sin_resolver, args.seed, args.limite_preproceso)
+        registros.append(registro)
+        linea = (f"{registro['instancia']:<12} variables {registro['variables']} -> {registro['variables_finales']}, "
+                 f"preproceso {registro['tiempo_preproceso']:.2f} s")
+        if not args.sin_resolver:
+            linea += (f", HiGHS completo {registro['tiempo_completo']:.2f} s ({registro['estado_completo']}), "
+                      f"reducido {registro['tiempo_reducido']:.2f} s ({registro['estado_reducido']})")
+        print(linea)
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=CAMPOS)
+            escritor.writeheader()
+            escritor.writerows(registros)
+        print(f"\nReporte guardado en {args.output}")
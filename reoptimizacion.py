@@ -0,0 +1,393 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from cache_instancias import CACHE_DIR, Instancia, cargar_instancia
+from descomposicion import estado_desde_x, resolver_instancia
+from evaluador import DIVIDIDO, EPS, SIN_ASIGNAR, EvaluadorCFLP
+from modelo_matricial import extraer_solucion
+from modelo_reducido import resolver_reducido
+from vecindario import Vecindario
+
+# Claves del archivo de cambios (JSON). Los índices son los de la instancia original,
+# contando desde 1 como en los nombres i1, j1 de los modelos:
+# - agregar: Lista de clientes nuevos {"demand": d, "c": [c_1, ..., c_m]}.
+# - eliminar: Lista de clientes que se quitan.
+# - demand: Diccionario cliente -> nueva demanda.
+# - s, f: Diccionarios almacén -> nueva capacidad / nuevo costo fijo.
+CLAVES_DELTA = ('agregar', 'eliminar', 'demand', 's', 'f')
+
+# Almacenes más baratos de cada cliente afectado que entran en la zona de búsqueda
+ALMACENES_CERCANOS = 5
+
+
+def leer_delta(ruta):
+    """
+    Lee un archivo de cambios (JSON con las claves de CLAVES_DELTA, todas opcionales).
+
+    Retorna:
+    - Diccionario con los cambios.
+    """
+    with open(ruta, 'r') as archivo:
+        delta = json.load(archivo)
+    if not isinstance(delta, dict):
+        raise ValueError("el archivo de cambios debe ser un objeto JSON")
+    desconocidas = set(delta) - set(CLAVES_DELTA)
+    if desconocidas:
+        raise ValueError(f"claves desconocidas en los cambios: {', '.join(sorted(desconocidas))} "
+                         f"(opciones: {', '.join(CLAVES_DELTA)})")
+    return delta
+
+
+def _indices(valores, total, nombre):
+    # Convierte índices desde 1 (como en el JSON) a índices de NumPy, validando el rango
+    indices = np.array([int(valor) for valor in valores], dtype=np.int64) - 1
+    fuera = indices[(indices < 0) | (indices >= total)]
+    if fuera.size:
+        raise ValueError(f"índice de {nombre} fuera de rango: {int(fuera[0]) + 1} (hay {total})")
+    return indices
+
+
+def _cambios(cambios, total, nombre):
+    # Diccionario índice -> valor del JSON como arrays (índices, valores)
+    cambios = cambios or {}
+    indices = _indices(cambios.keys(), total, nombre)
+    valores = np.array([float(valor) for valor in cambios.values()], dtype=np.float64)
+    if (valores < 0).any():
+        raise ValueError(f"valor negativo en los cambios de {nombre}")
+    return indices, valores
+
+
+def aplicar_delta(instancia, delta):
+    """
+    Aplica un conjunto de cambios a una instancia.
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - delta: Diccionario de cambios (ver CLAVES_DELTA y leer_delta).
+
+    Retorna:
+    - nueva: Instancia con los cambios, en memoria. Su clave es el hash de la clave
+      original y de los cambios.
+    - mapa: Array (n,) con el índice en la nueva instancia de cada cliente original
+      (-1 si se eliminó). Los clientes agregados van al final.
+    - cambios: Diccionario con clientes (índices nuevos de los agregados y de los
+      que cambiaron de demanda), almacenes (los que cambiaron de capacidad o costo
+      fijo) y eliminados (índices originales).
+    """
+    s = np.array(instancia.s, dtype=np.float64)
+    f = np.array(instancia.f, dtype=np.float64)
+    demand = np.asarray(instancia.demand, dtype=np.float64)
+    c = np.asarray(instancia.c, dtype=np.float64)
+    n, m = c.shape
+
+    eliminados = np.unique(_indices(delta.get('eliminar', []), n, 'cliente'))
+    clientes_demanda, demandas = _cambios(delta.get('demand'), n, 'cliente')
+    if np.isin(clientes_demanda, eliminados).any():
+        raise ValueError("un cliente eliminado no puede cambiar de demanda")
+    almacenes_s, capacidades = _cambios(delta.get('s'), m, 'almacén')
+    almacenes_f, costos_fijos = _cambios(delta.get('f'), m, 'almacén')
+    s[almacenes_s] = capacidades
+    f[almacenes_f] = costos_fijos
+
+    agregar = delta.get('agregar', [])
+    demanda_nueva = np.array([float(cliente['demand']) for cliente in agregar], dtype=np.float64)
+    if any(len(cliente['c']) != m for cliente in agregar):
+        raise ValueError(f"los clientes agregados deben tener {m} costos (uno por almacén)")
+    c_nuevo = np.array([cliente['c'] for cliente in agregar], dtype=np.float64).reshape(len(agregar), m)
+    if (demanda_nueva < 0).any() or (c_nuevo < 0).any():
+        raise ValueError("los clientes agregados no pueden tener demanda ni costos negativos")
+
+    conservados = np.ones(n, dtype=bool)
+    conservados[eliminados] = False
+    mapa = np.full(n, -1, dtype=np.int64)
+    mapa[conservados] = np.arange(int(conservados.sum()))
+    demand = demand.copy()
+    demand[clientes_demanda] = demandas
+    demand = np.concatenate((demand[conservados], demanda_nueva))
+    c = np.vstack((c[conservados], c_nuevo)) if eliminados.size or agregar else c
+
+    clave = hashlib.sha256((instancia.clave + json.dumps(delta, sort_keys=True)).encode()).hexdigest()
+    cambios = {
+        'clientes': np.concatenate((mapa[clientes_demanda], np.arange(demand.size - len(agregar), demand.size))),
+        'almacenes': np.union1d(almacenes_s, almacenes_f),
+        'eliminados': eliminados,
+    }
+    return Instancia(s, f, demand, c, clave), mapa, cambios
+
+
+def trasladar_solucion(evaluador, abiertos, x, mapa, clientes):
+    """
+    Carga en el evaluador de la instancia nueva una solución de la instancia original
+    y repara solo lo que los cambios dejaron inválido:
+
+    - Los clientes agregados o con otra demanda quedan sin asignar.
+    - En cada almacén cuya carga supera su nueva capacidad se liberan primero los
+      clientes divididos y luego los de mayor costo por unidad, hasta que quepa.
+    - Los clientes liberados se ubican con EvaluadorCFLP.reparar, que abre almacenes
+      solo si la capacidad residual no alcanza.
+
+    Parámetros:
+    - evaluador: EvaluadorCFLP de la instancia nueva.
+    - abiertos: Array booleano (m,) de la solución original.
+    - x: Matriz (n, m) de asignaciones de la solución original.
+    - mapa: Array de aplicar_delta.
+    - clientes: Índices nuevos de los clientes agregados o con otra demanda.
+
+    Retorna:
+    - Array con los clientes (índices nuevos) que se reasignaron.
+    """
+    x = sp.csr_matrix(x)
+    conservados = np.flatnonzero(mapa >= 0)
+    agregados = evaluador.n - conservados.size
+    x = sp.vstack((x[conservados], sp.csr_matrix((agregados, evaluador.m)))).tocsr()
+    asignacion, partes = estado_desde_x(x, evaluador.demand, evaluador.single_source)
+    clientes = np.asarray(clientes, dtype=np.int64)
+    asignacion[clientes] = SIN_ASIGNAR
+    for i in clientes.tolist():
+        partes.pop(i, None)
+
+    # Clientes asignados a almacenes cerrados (no debería ocurrir en una solución válida)
+    abiertos = np.asarray(abiertos, dtype=bool)
+    enteros = asignacion >= 0
+    asignacion[enteros & ~abiertos[np.maximum(asignacion, 0)]] = SIN_ASIGNAR
+
+    enteros = asignacion >= 0
+    carga = np.bincount(asignacion[enteros], weights=evaluador.demand[enteros], minlength=evaluador.m)
+    for centros, cantidades in partes.values():
+        carga[centros] += cantidades
+    for j in np.flatnonzero(carga > evaluador.s + EPS).tolist():
+        for i in [i for i, (centros, _) in partes.items() if (centros == j).any()]:
+            centros, cantidades = partes.pop(i)
+            carga[centros] -= cantidades
+            asignacion[i] = SIN_ASIGNAR
+        exceso = carga[j] - evaluador.s[j]
+        if exceso <= EPS:
+            continue
+        miembros = np.flatnonzero(asignacion == j)
+        miembros = miembros[np.argsort(-evaluador.costos[miembros, j] / np.maximum(evaluador.demand[miembros], EPS),
+                                       kind='stable')]
+        liberados = miembros[:np.searchsorted(np.cumsum(evaluador.demand[miembros]), exceso - EPS) + 1]
+        carga[j] -= evaluador.demand[liberados].sum()
+        asignacion[liberados] = SIN_ASIGNAR
+
+    reasignados = np.flatnonzero(asignacion == SIN_ASIGNAR)
+    evaluador.restaurar((abiertos, asignacion, partes))
+    evaluador.reparar()
+    return reasignados
+
+
+def zona_afectada(evaluador, clientes, almacenes, cercanos=ALMACENES_CERCANOS):
+    """
+    Almacenes donde se concentra la búsqueda tras los cambios: los indicados, los
+    cercanos almacenes más baratos de cada cliente afectado y los que hoy lo atienden.
+
+    Parámetros:
+    - evaluador: EvaluadorCFLP con la solución reparada.
+    - clientes: Índices de los clientes afectados.
+    - almacenes: Índices de los almacenes afectados (cambiados o que perdieron clientes).
+    - cercanos: Almacenes más baratos que se toman de cada cliente afectado.
+
+    Retorna:
+    - Array booleano (m,) con la zona.
+    """
+    zona = np.zeros(evaluador.m, dtype=bool)
+    zona[np.asarray(almacenes, dtype=np.int64)] = True
+    clientes = np.asarray(clientes, dtype=np.int64)
+    if clientes.size:
+        cercanos = min(cercanos, evaluador.m)
+        costos = evaluador.costos[clientes]
+        zona[np.argpartition(costos, cercanos - 1, axis=1)[:, :cercanos].ravel()] = True
+        actuales = evaluador.asignacion[clientes]
+        zona[actuales[actuales >= 0]] = True
+        for i in clientes[actuales == DIVIDIDO].tolist():
+            zona[evaluador.partes[i][0]] = True
+    return zona
+
+
+def _resolver_exacto(instancia, evaluador, single_source, k, limite_tiempo):
+    # HiGHS sobre el modelo reducido arrancando desde la solución del evaluador, que se
+    # reemplaza si el MIP la mejora; retorna (estado, cota) de HiGHS
+    factible = evaluador.factible
+    modelo, resultado = resolver_reducido(instancia, single_source, k, limite_tiempo,
+                                          abiertos_iniciales=evaluador.abiertos if factible else None,
+                                          x_inicial=evaluador.x_inicial() if factible else None)
+    if resultado['valores'] is not None and (not factible or resultado['objetivo'] < evaluador.costo - EPS):
+        abiertos_mip, x_mip = extraer_solucion(modelo, resultado['valores'])
+        asignacion, partes = estado_desde_x(x_mip, instancia.demand, single_source)
+        evaluador.restaurar((abiertos_mip, asignacion, partes))
+    return resultado['estado'], resultado['cota']
+
+
+def reoptimizar(instancia, abiertos, x, delta, single_source=False, iteraciones=50, cercanos=ALMACENES_CERCANOS,
+                max_lotes=None, exacto=False, limite_tiempo=None, k=10, semilla=0):
+    """
+    Re-optimiza una solución tras cambios pequeños en la instancia, sin partir de cero:
+
+    1. Aplica los cambios (aplicar_delta).
+    2. Traslada la solución anterior y repara solo las asignaciones y capacidades
+       afectadas (trasladar_solucion).
+    3. Búsqueda local sobre el vecindario de abrir, cerrar e intercambiar almacenes,
+       limitada a la zona afectada (zona_afectada y vecindario.Vecindario).
+    4. Opcionalmente, HiGHS sobre el modelo reducido (modelo_reducido.resolver_reducido)
+       arrancando desde la solución de la búsqueda local.
+
+    Parámetros:
+    - instancia: Instancia original, cargada con cache_instancias.cargar_instancia.
+    - abiertos, x: Solución de la instancia original (como solucion.cargar_solucion).
+    - delta: Diccionario de cambios (ver CLAVES_DELTA).
+    - single_source: Si es True se usa CFLPsingle.mod; si no, CFLP.mod.
+    - iteraciones: Iteraciones máximas de la búsqueda local.
+    - cercanos: Almacenes más baratos de cada cliente afectado que entran en la zona.
+    - max_lotes: Lotes de verificaciones por iteración de la búsqueda local (ver
+      vecindario.Vecindario; por defecto, sin límite).
+    - exacto: Si es True se resuelve el modelo con HiGHS tras la búsqueda local.
+    - limite_tiempo: Límite de tiempo de HiGHS en segundos (opcional).
+    - k: Almacenes por cliente del modelo reducido.
+    - semilla: Semilla del vecindario.
+
+    Retorna:
+    - Diccionario con instancia (la nueva), mapa, objetivo, abiertos, x (matriz dispersa
+      CSR), factible, costo_trasladado (tras la reparación), reasignados (número de
+      clientes), zona (número de almacenes), estado y cota de HiGHS (None sin exacto)
+      y los tiempos por etapa.
+    """
+    inicio = time.perf_counter()
+    tiempos = {}
+    nueva, mapa, cambios = aplicar_delta(instancia, delta)
+    x = sp.csr_matrix(x)
+    if x.shape != (mapa.size, nueva.s.shape[0]):
+        raise ValueError(f"la solución es de {x.shape[0]}x{x.shape[1]} y la instancia de "
+                         f"{mapa.size}x{nueva.s.shape[0]}")
+    tiempos['cambios'] = time.perf_counter() - inicio
+
+    # Almacenes que perdieron clientes eliminados: su capacidad liberada puede servir a otros
+    marca = time.perf_counter()
+    evaluador = EvaluadorCFLP(nueva, single_source)
+    almacenes = np.union1d(cambios['almacenes'], x[cambios['eliminados']].indices)
+    reasignados = trasladar_solucion(evaluador, abiertos, x, mapa, cambios['clientes'])
+    costo_trasladado = evaluador.costo
+    tiempos['reparacion'] = time.perf_counter() - marca
+
+    marca = time.perf_counter()
+    zona = zona_afectada(evaluador, np.union1d(reasignados, cambios['clientes']), almacenes, cercanos)
+    Vecindario('mejor', semilla=semilla, max_lotes=max_lotes).buscar(evaluador, max_iteraciones=iteraciones, zona=zona)
+    tiempos['busqueda'] = time.perf_counter() - marca
+
+    estado, cota = None, None
+    if exacto:
+        marca = time.perf_counter()
+        estado, cota = _resolver_exacto(nueva, evaluador, single_source, k, limite_tiempo)
+        tiempos['exacto'] = time.perf_counter() - marca
+
+    return {
+        'instancia': nueva,
+        'mapa': mapa,
+        'objetivo': evaluador.costo,
+        'abiertos': evaluador.abiertos.copy(),
+        'x': sp.csr_matrix(evaluador.x_inicial()),
+        'factible': evaluador.factible,
+        'costo_trasladado': costo_trasladado,
+        'reasignados': int(reasignados.size),
+        'zona': int(zona.sum()),
+        'estado': estado,
+        'cota': cota,
+        'tiempos': tiempos,
+        'tiempo': time.perf_counter() - inicio,
+    }
+
+
+def resolver_desde_cero(instancia, single_source=False, exacto=False, limite_tiempo=None, k=10, semilla=0):
+    """
+    Resuelve la instancia nueva sin la solución anterior, con el mismo método que
+    reoptimizar: la heurística de descomposicion.resolver_instancia (ILS con el
+    vecindario completo) y, con exacto, HiGHS sobre el modelo reducido con el mismo
+    límite de tiempo y el mismo k. Sirve de referencia para --comparar.
+
+    Retorna:
+    - Diccionario con objetivo, factible, estado y cota de HiGHS (None sin exacto).
+    """
+    resultado = resolver_instancia(instancia, 'heuristica', single_source, semilla=semilla)
+    evaluador = EvaluadorCFLP(instancia, single_source)
+    evaluador.restaurar((resultado['abiertos'], resultado['asignacion'], resultado['partes']))
+    estado, cota = _resolver_exacto(instancia, evaluador, single_source, k, limite_tiempo) if exacto else (None, None)
+    return {'objetivo': evaluador.costo, 'factible': evaluador.factible, 'estado': estado, 'cota': cota}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from generador_instancias import _escribir_instancia
+    from solucion import cargar_solucion, guardar_solucion, resumen_solucion
+
+    parser = argparse.ArgumentParser(description="Re-optimiza una solución guardada tras cambios pequeños en la "
+                                                 "instancia (clientes agregados o eliminados, demandas, capacidades "
+                                                 "o costos fijos), reparando solo la zona afectada.")
+    parser.add_argument('-d', '--data', type=str, required=True, help="Ruta a la instancia original (.txt o .dat).")
+    parser.add_argument('-s', '--solucion', type=str, required=True,
+                        help="Solución (.npz) de la instancia original, guardada con -o.")
+    parser.add_argument('--delta', type=str, required=True, help="Archivo JSON con los cambios.")
+    parser.add_argument('--single', action='store_true', help="Usar CFLPsingle.mod en vez de CFLP.mod.")
+    parser.add_argument('-g', '--iteraciones', type=int, default=50, help="Iteraciones máximas de la búsqueda local.")
+    parser.add_argument('--cercanos', type=int, default=ALMACENES_CERCANOS,
+                        help="Almacenes más baratos de cada cliente afectado que entran en la zona de búsqueda.")
+    parser.add_argument('--max-lotes', type=int, default=None,
+                        help="Lotes de verificaciones por iteración de la búsqueda local (por defecto, sin límite).")
+    parser.add_argument('--exacto', action='store_true', help="Resolver con HiGHS tras la búsqueda local.")
+    parser.add_argument('-t', '--time', type=float, default=None, help="Límite de tiempo de HiGHS.")
+    parser.add_argument('-k', '--k-cercanos', type=int, default=10, help="Almacenes por cliente del modelo reducido.")
+    parser.add_argument('--comparar', action='store_true',
+                        help="Resolver también la instancia nueva desde cero con el mismo método (la heurística y, "
+                             "con --exacto, HiGHS con el mismo -t y -k), para comparar.")
+    parser.add_argument('-o', '--output', type=str, default=None, help="Archivo .npz donde guardar la solución nueva.")
+    parser.add_argument('--escribir-instancia', type=str, default=None,
+                        help="Archivo .txt (OR Library) donde escribir la instancia con los cambios.")
+    parser.add_argument('--cache', type=str, default=CACHE_DIR, help="Directorio del caché de instancias.")
+    args = parser.parse_args()
+
+    for ruta in (args.data, args.solucion, args.delta):
+        if not os.path.exists(ruta):
+            print(f"Error: El archivo '{ruta}' no existe.")
+            sys.exit(1)
+
+    instancia = cargar_instancia(args.data, args.cache)
+    abiertos, x, info = cargar_solucion(args.solucion)
+    try:
+        resultado = reoptimizar(instancia, abiertos, x, leer_delta(args.delta), args.single, args.iteraciones,
+                                args.cercanos, args.max_lotes, args.exacto, args.time, args.k_cercanos)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    nueva = resultado['instancia']
+    print(f"Instancia nueva: {nueva.demand.shape[0]} clientes, {nueva.s.shape[0]} almacenes")
+    print(f"Costo anterior: {info['objetivo']}")
+    print(f"Costo tras trasladar y reparar ({resultado['reasignados']} clientes reasignados): "
+          f"{resultado['costo_trasladado']}")
+    print(f"Búsqueda local en {resultado['zona']} almacenes"
+          + (f", HiGHS ({resultado['estado']})" if resultado['estado'] is not None else ""))
+    resumen_solucion(resultado['abiertos'], resultado['x'], resultado['objetivo'], resultado['cota'])
+    for etapa, segundos in resultado['tiempos'].items():
+        print(f"{etapa:<20} {segundos:10.4f} s")
+    print(f"{'total':<20} {resultado['tiempo']:10.4f} s")
+
+    if args.comparar:
+        inicio = time.perf_counter()
+        completo = resolver_desde_cero(nueva, args.single, args.exacto, args.time, args.k_cercanos)
+        metodo = f"heurística + HiGHS, {completo['estado']}" if args.exacto else "heurística"
+        print(f"\nDesde cero ({metodo}): {completo['objetivo']} en {time.perf_counter() - inicio:.2f} s "
+              f"({(resultado['objetivo'] - completo['objetivo']) / abs(completo['objetivo']):+.4%} la re-optimización)")
+
+    if args.output is not None:
+        ruta = guardar_solucion(args.output, resultado['abiertos'], resultado['x'], resultado['objetivo'],
+                                resultado['cota'], resultado['tiempos'], instancia=args.data, delta=args.delta,
+                                solucion_anterior=args.solucion, clave=nueva.clave)
+        print(f"\nSolución guardada en {ruta}")
+    if args.escribir_instancia is not None:
+        _escribir_instancia(args.escribir_instancia, nueva.s, nueva.f, [(nueva.demand, nueva.c)], nueva.demand.shape[0])
+        print(f"Instancia con los cambios escrita en {args.escribir_instancia}")
@@ -0,0 +1,452 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from ILS import iterated_local_search
+from almacen_resultados import claves_resolucion
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import cap_cost_array, cargar_instancia
+from datos_ampl import Cronometro, cargar_datos_ampl, fijar_arranque, fijar_preproceso
+from evaluador import EvaluadorCFLP
+from heuristica_concurrente import HeuristicaConcurrente
+from lagrangiano import relajacion_lagrangiana
+from modelo_matricial import construir_modelo, extraer_solucion, resolver_highs, vector_inicial
+from modelo_reducido import resolver_reducido
+from preproceso import construir_modelo_preprocesado, preprocesar
+from solucion import guardar_solucion, resumen_solucion
+
+# Modos de uso de la solución heurística:
+# - fijar: las y quedan fijas en los centros de la heurística (evalúa ese conjunto abierto).
+# - arranque: la solución se entrega como MIP start y las y quedan libres.
+# - concurrente: como arranque, y además el ILS sigue corriendo durante la resolución
+#   e inyecta sus mejoras como incumbentes (solo highs).
+MODOS_ARRANQUE = ('fijar', 'arranque', 'concurrente')
+
+
+def resolver_con_ampl(instancia, mod_path, single_source, abiertos, x_inicial, cronometro, solver='gurobi',
+                      max_nodes=None, time_limit=None, cota_inferior=None, k_cercanos=None, instrumentacion=None,
+                      modo='arranque', preproceso=None):
+    """
+    Resuelve la instancia con AMPL y el solver indicado (por defecto, Gurobi).
+
+    Parámetros:
+    - instancia: Instancia cargada con cache_instancias.cargar_instancia.
+    - mod_path: Ruta al archivo .mod.
+    - single_source: Formulación del archivo .mod; solo se usa para aplicar el preproceso.
+    - abiertos: Array booleano (m,) con los almacenes abiertos de la solución inicial
+      (None si no hay una solución inicial factible; en ese caso no se fija nada).
+    - x_inicial: Array (n, m) con los valores iniciales de x (None junto con abiertos).
+    - cronometro: Cronometro en el que se registran las fases.
+    - solver: Nombre del solver de AMPL.
+    - max_nodes: Número máximo de nodos (opcional).
+    - time_limit: Límite de tiempo en segundos (opcional).
+    - cota_inferior: Cota inferior conocida del óptimo (opcional).
+    - k_cercanos: Modelo reducido a los k almacenes más baratos por cliente (solo highs).
+    - instrumentacion: instrumentacion.Instrumentacion que recibe el incumbente final
+      (con HiGHS, cada incumbente del MIP) (opcional).
+    - modo: Uso de la solución heurística, uno de MODOS_ARRANQUE.
+    - preproceso: preproceso.Preproceso con las fijaciones a aplicar antes de resolver (opcional).
+
+    Retorna:
+    - Diccionario con objetivo, cota del solver, abiertos, x (matriz dispersa CSR) y
+      tiempo del solver.
+    """
+    if k_cercanos is not None:
+        raise ValueError("El modelo reducido (k_cercanos) solo está disponible con el backend highs")
+    if modo == 'concurrente':
+        raise ValueError("El modo concurrente solo está disponible con el backend highs")
+
+    from amplpy import AMPL, Environment
+
+    # Inicializamos AMPL
+    cronometro.fase('inicializacion')
+    ampl = AMPL(Environment())
+
+    # Cargamos el modelo
+    cronometro.fase('lectura_modelo')
+    ampl.read(mod_path)
+
+    # Enviamos conjuntos y parámetros a AMPL en bloque, sin releer el .dat
+    cronometro.fase('datos_ampl')
+    C, D = cargar_datos_ampl(ampl, instancia)
+
+    # Configuramos los centros abiertos y las asignaciones iniciales en AMPL; en modo
+    # arranque las y quedan libres y los valores se usan como MIP start
+    cronometro.fase('arranque')
+    if abiertos is not None:
+        fijar_arranque(ampl, C, D, abiertos, x_inicial, fijar=(modo == 'fijar'))
+    if preproceso is not None:
+        fijar_preproceso(ampl, instancia, C, D, preproceso, single_source)
+
+    # Configuramos el solver
+    ampl.setOption('solver', solver)
+    ampl.setOption('gurobi_options', opciones_gurobi(modo, time_limit, max_nodes, cota_inferior))
+
+    # Resolvemos el modelo (incluye la traducción del modelo en AMPL)
+    cronometro.fase('resolucion')
+    ampl.solve()
+
+    cronometro.fase('salida')
+    resultado = solucion_ampl(ampl, C, D)
+    if instrumentacion is not None:
+        instrumentacion.incumbente(resultado['objetivo'], 'ampl')
+    return resultado
+
+
+def opciones_gurobi(modo='arranque', time_limit=None, max_nodes=None, cota_inferior=None, gap=1e-4, extra=None):
+    """
+    Arma la cadena gurobi_options de AMPL.
+
+    Parámetros:
+    - modo: Uso de la solución heurística, uno de MODOS_ARRANQUE.
+    - time_limit: Límite de tiempo en segundos (opcional).
+    - max_nodes: Número máximo de nodos (opcional).
+    - cota_inferior: Cota inferior conocida del óptimo (opcional).
+    - gap: Gap relativo de término del MIP.
+    - extra: Opciones adicionales en formato 'nombre=valor ...' (opcional).
+    """
+    # Establecemos un criterio de término basado en nodos máximos o tiempo límite
+    gurobi_options = f'MIPGap={gap:g} bestbound=1'
+
+    if modo == 'arranque':
+        gurobi_options += ' mipstart=1'
+
+    if time_limit is not None:
+        gurobi_options += f' TimeLimit={time_limit}'
+
+    if max_nodes is not None:
+        gurobi_options += f' NodeLimit={max_nodes}'
+
+    # Con una cota inferior externa, basta un incumbente dentro del gap para terminar
+    if cota_inferior is not None:
+        gurobi_options += f' BestObjStop={cota_inferior * (1 + gap)}'
+
+    if extra:
+        gurobi_options += f' {extra}'
+    return gurobi_options
+
+
+def solucion_ampl(ampl, C, D):
+    """
+    Lee la solución de AMPL después de solve().
+
+    Retorna:
+    - Diccionario con objetivo, cota del solver, abiertos, x (matriz dispersa CSR) y
+      tiempo del solver.
+    """
+    n, m = len(D), len(C)
+    y_values = ampl.getVariable('y').getValues().to_pandas()['y.val'].reindex(C).to_numpy()
+
+    # Solo las x no nulas, en una consulta; los índices se recuperan de los nombres 'i<k>' y 'j<k>'
+    x_values = ampl.getData('{i in D, j in C: x[i, j] > 1e-6} x[i, j]').to_pandas()
+    filas = x_values.index.get_level_values(0).str[1:].astype(np.int64) - 1
+    columnas = x_values.index.get_level_values(1).str[1:].astype(np.int64) - 1
+    x = sp.csr_matrix((x_values.iloc[:, 0].to_numpy(dtype=np.float64), (filas, columnas)), shape=(n, m))
+
+    objetivo = ampl.getObjective('TotalCost').value()
+    try:
+        cota = ampl.getValue('TotalCost.bestbound')
+    except Exception:
+        cota = None
+    return {
+        'objetivo': objetivo,
+        'cota': cota,
+        'abiertos': y_values > 0.5,
+        'x': x,
+        'tiempo_solver': ampl.getValue('_solve_elapsed_time'),
+    }
+
+
+def resolver_con_highs(instancia, mod_path, single_source, abiertos, x_inicial, cronometro, solver=None,
+                       max_nodes=None, time_limit=None, cota_inferior=None, k_cercanos=None, instrumentacion=None,
+                       modo='arranque', preproceso=None):
+    """
+    Resuelve la instancia con HiGHS, construyendo CFLP.mod o CFLPsingle.mod como matriz
+    dispersa directamente desde los arrays de la instancia (sin AMPL ni licencias).
+
+    Los parámetros y el resultado son los mismos que en resolver_con_ampl; mod_path y
+    solver no se usan y la formulación se elige con single_source. En modo concurrente
+    el ILS corre en un hilo (ver heuristica_concurrente.py): sus mejoras se inyectan en
+    HiGHS y los incumbentes de HiGHS pasan a ser el punto de partida del ILS.
+
+    Con k_cercanos se resuelve el modelo reducido a los k almacenes más baratos de cada
+    cliente, recuperando por pricing las columnas necesarias (ver modelo_reducido.py).
+    Con preproceso se resuelve el modelo reducido por preproceso.py; no se combina con
+    k_cercanos, que ya hace su propia selección de columnas.
+    """
+    if preproceso is not None and k_cercanos is not None:
+        raise ValueError("El preproceso y el modelo reducido (k_cercanos) no se pueden combinar")
+    # Con una cota inferior externa, basta un incumbente dentro del gap para terminar
+    objetivo_parada = cota_inferior * (1 + 1e-4) if cota_inferior is not None else None
+    y_fijo = np.asarray(abiertos, dtype=float) if modo == 'fijar' and abiertos is not None else None
+
+    heuristica = proveedor = None
+    if modo == 'concurrente':
+        if abiertos is None:
+            # Sin solución inicial, el ILS concurrente parte con todos los almacenes abiertos
+            heuristica = HeuristicaConcurrente(instancia, single_source, np.ones(instancia.s.shape[0], dtype=bool),
+                                               float('inf'))
+        else:
+            costo_inicial = float(np.asarray(instancia.f)[np.asarray(abiertos, dtype=bool)].sum()
+                                  + (np.asarray(instancia.c) * x_inicial).sum())
+            heuristica = HeuristicaConcurrente(instancia, single_source, abiertos, costo_inicial)
+        proveedor = heuristica.siguiente
+
+    def al_mejorar(costo, valores):
+        if instrumentacion is not None:
+            instrumentacion.incumbente(costo, 'highs')
+        if heuristica is not None:
+            heuristica.incorporar(valores[-instancia.s.shape[0]:] > 0.5, costo)
+
+    if k_cercanos is not None:
+        cronometro.fase('resolucion')
+        if heuristica is not None:
+            heuristica.start()
+        modelo, resultado = resolver_reducido(instancia, single_source, k_cercanos, limite_tiempo=time_limit,
+                                              max_nodos=max_nodes, abiertos_iniciales=abiertos,
+                                              x_inicial=x_inicial, y_fijo=y_fijo, objetivo_parada=objetivo_parada,
+                                              al_mejorar=al_mejorar, proveedor=proveedor)
+        print(f"Modelo reducido: {resultado['columnas']} de {resultado['columnas_densas']} columnas x, "
+              f"{resultado['rondas']} rondas de pricing, óptimo del modelo denso "
+              f"{'probado' if resultado['probado'] else 'no probado'}")
+    else:
+        cronometro.fase('construccion_modelo')
+        if preproceso is not None:
+            modelo = construir_modelo_preprocesado(instancia, single_source, preproceso)
+        else:
+            modelo = construir_modelo(instancia, single_source)
+
+        cronometro.fase('arranque')
+        valores_iniciales = vector_inicial(modelo, abiertos, x_inicial) if abiertos is not None else None
+
+        cronometro.fase('resolucion')
+        if heuristica is not None:
+            heuristica.start()
+        resultado = resolver_highs(modelo, limite_tiempo=time_limit, max_nodos=max_nodes,
+                                   valores_iniciales=valores_iniciales, y_fijo=y_fijo,
+                                   objetivo_parada=objetivo_parada, al_mejorar=al_mejorar, proveedor=proveedor)
+
+    if heuristica is not None:
+        heuristica.detener()
+        print(f"Heurística concurrente: {heuristica.epocas} épocas, {heuristica.publicadas} mejoras publicadas")
+
+    cronometro.fase('salida')
+    if resultado['valores'] is None:
+        raise RuntimeError(f"HiGHS terminó sin solución ({resultado['estado']})")
+    abiertos_final, x = extraer_solucion(modelo, resultado['valores'])
+    if instrumentacion is not None:
+        instrumentacion.incumbente(resultado['objetivo'], 'highs')
+    return {
+        'objetivo': resultado['objetivo'],
+        'cota': resultado['cota'],
+        'abiertos': abiertos_final,
+        'x': x,
+        'tiempo_solver': resultado['tiempo'],
+    }
+
+
+# Backends disponibles para algoritmo_exacto.py y algoritmo_exacto_single.py
+RESOLUTORES = {
+    'ampl': resolver_con_ampl,
+    'highs': resolver_con_highs,
+}
+
+
+def ejecutar_resolucion(mod_path, dat_path, single_source=False, mejora=None, solver='gurobi', max_nodes=None,
+                        time_limit=None, cota_inferior=None, lagrangiano=False, backend='ampl', k_cercanos=None,
+                        instrumentacion=None, modo='arranque', salida=None, cache_mb=64, preproceso=False,
+                        dominancia=False, almacen=None):
+    """
+    Flujo completo de algoritmo_exacto.py y algoritmo_exacto_single.py: almacén de
+    resultados, cota lagrangiana, heurística ILS como solución inicial, preproceso y
+    resolución con el backend elegido.
+
+    Parámetros:
+    - mod_path: Ruta al archivo .mod.
+    - dat_path: Ruta al archivo .dat (o .txt) de la instancia.
+    - single_source: Si es True se resuelve CFLPsingle.mod; si no, CFLP.mod.
+    - mejora: Función (instancia, evaluador) -> (costo, factible) que mejora la solución
+      del ILS dejándola en el evaluador, por ejemplo con la búsqueda local single-source
+      (opcional).
+    - solver: Nombre del solver a utilizar (por defecto, 'gurobi').
+    - max_nodes: Número máximo de nodos para el solver (opcional).
+    - time_limit: Límite de tiempo para el solver (en segundos).
+    - cota_inferior: Cota inferior conocida del óptimo (opcional). El solver se detiene en
+      cuanto su incumbente queda dentro del gap respecto de ella.
+    - backend: Backend de resolución ('ampl' o 'highs', ver RESOLUTORES).
+    - k_cercanos: Si se indica, se resuelve el modelo reducido a los k almacenes más
+      baratos de cada cliente, con pricing para recuperar el óptimo (solo highs).
+    - instrumentacion: instrumentacion.Instrumentacion que recibe los tiempos de cada
+      fase, los contadores del ILS y los incumbentes a lo largo del tiempo (opcional).
+    - modo: Uso de la solución de la heurística, uno de MODOS_ARRANQUE: 'fijar' (evalúa
+      el conjunto abierto de la heurística con las y fijas), 'arranque' (MIP start con
+      las y libres) o 'concurrente' (además el ILS sigue corriendo e inyecta
+      incumbentes, solo highs).
+    - salida: Ruta del archivo .npz donde guardar la solución (ver solucion.py) (opcional).
+    - cache_mb: Memoria máxima en MB del caché de evaluaciones del ILS (0 lo desactiva).
+    - preproceso: Si es True, antes del solver se fijan almacenes y se eliminan pares x
+      por costo reducido respecto de la mejor solución entre la heurística y la primal de
+      la relajación lagrangiana, que se calcula aunque no se pida lagrangiano (ver
+      preproceso.py). El preproceso corre con time_limit y su tiempo se descuenta del
+      límite del solver.
+    - lagrangiano: Si es True, se calcula la cota inferior con la relajación lagrangiana;
+      su solución primal reemplaza a la de la heurística si es mejor.
+    - dominancia: Si es True, el preproceso agrega también las reglas de dominancia.
+    - almacen: almacen_resultados.AlmacenResultados donde se busca el resultado antes de
+      construir el modelo y se guarda después de resolver (opcional).
+    """
+    cronometro = Cronometro(instrumentacion=instrumentacion)
+
+    # Cargamos los arrays de la instancia desde el caché binario
+    cronometro.fase('carga_instancia')
+    instancia = cargar_instancia(dat_path)
+
+    # Consultamos el almacén antes de construir el modelo: una resolución idéntica (o
+    # una con el gap ya cerrado) se entrega directamente, y una que solo difiere en los
+    # límites de tiempo o de nodos sirve como solución inicial
+    arranque = None
+    if almacen is not None:
+        cronometro.fase('almacen')
+        claves = claves_resolucion(instancia, mod_path, single_source, backend, solver, modo=modo,
+                                   k_cercanos=k_cercanos, lagrangiano=lagrangiano, cota_inferior=cota_inferior,
+                                   preproceso=preproceso, dominancia=dominancia, time_limit=time_limit,
+                                   max_nodes=max_nodes)
+        guardado = almacen.buscar(*claves)
+        if guardado is not None:
+            abiertos, x, info = guardado
+            print(f"\n--- SOLUCIÓN {backend} (almacén de resultados, {info['clave'][:12]})")
+            resumen_solucion(abiertos, x, info['objetivo'], info['cota'])
+            if salida is not None:
+                ruta = guardar_solucion(salida, abiertos, x, info['objetivo'], info['cota'], info['tiempos'],
+                                        instancia=dat_path, backend=backend, modo=modo, almacen=info['clave'])
+                print(f"\nSolución guardada en {ruta}")
+            cronometro.detener()
+            cronometro.resumen()
+            if instrumentacion is not None:
+                instrumentacion.cerrar()
+            return
+        arranque = almacen.buscar_arranque(claves[1])
+
+    facilities = instancia.s.shape[0]
+    demand_total = float(instancia.demand.sum())
+
+    # Calculamos la cota inferior lagrangiana si se pidió
+    relajacion = None
+    if lagrangiano:
+        cronometro.fase('lagrangiano')
+        relajacion = relajacion_lagrangiana(instancia, single_source=single_source, verbose=False)
+        print(f"Cota inferior lagrangiana: {relajacion['cota_inferior']} (gap {relajacion['gap']:.4%})")
+        if instrumentacion is not None:
+            instrumentacion.evento('cota_inferior', valor=relajacion['cota_inferior'], fuente='lagrangiano')
+        if cota_inferior is None or relajacion['cota_inferior'] > cota_inferior:
+            cota_inferior = relajacion['cota_inferior']
+
+    heuristica = 'ILS + búsqueda local' if mejora is not None else 'ILS'
+    if arranque is not None:
+        # Partimos del mejor resultado guardado con las mismas opciones
+        cronometro.fase('heuristica')
+        abiertos_iniciales, x_guardada, info = arranque
+        x_inicial = x_guardada.toarray()
+        best_fitness = info['objetivo']
+        cota_superior = best_fitness
+        heuristica = 'almacén de resultados'
+        print(f"\nArranque desde el almacén de resultados ({info['clave'][:12]}), costo {best_fitness}")
+    else:
+        # Aplicamos la heurística ILS, evaluando el costo total (apertura + asignación)
+        cronometro.fase('heuristica')
+        evaluador = EvaluadorCFLP(instancia, single_source=single_source)
+        best_solution, best_fitness = iterated_local_search(
+            cap_cost_array(instancia), facilities, demand_total, evaluator=evaluador, instrumentation=instrumentacion,
+            cache=CacheEvaluaciones(facilities, max_bytes=cache_mb * 2**20) if cache_mb > 0 else None
+        )
+        factible = evaluador.factible
+        if mejora is not None:
+            best_fitness, factible = mejora(instancia, evaluador)
+            best_solution = np.flatnonzero(evaluador.abiertos).tolist()
+            if instrumentacion is not None and factible:
+                instrumentacion.incumbente(best_fitness, 'busqueda_local')
+
+        print("\n---EXACTO")
+        print(f"Centros abiertos (como indices): {best_solution}")
+        print(f"Centros abiertos (como nombres): {[f'j{i+1}' for i in best_solution]}")
+        print(f"Costo: {best_fitness}" + ("" if factible else " (infactible, con penalización)"))
+        if factible:
+            abiertos_iniciales, x_inicial = evaluador.abiertos, evaluador.x_inicial()
+            cota_superior = best_fitness
+        else:
+            # Una solución infactible no sirve como MIP start ni como cota superior
+            print("La heurística no encontró una solución factible: se resuelve sin solución inicial")
+            abiertos_iniciales = x_inicial = cota_superior = None
+
+    # El preproceso necesita los multiplicadores y, sobre todo, una buena cota superior:
+    # la del ILS suele ser demasiado débil para fijar algo, así que sin -l la relajación
+    # lagrangiana se calcula aquí, dentro del límite de tiempo del preproceso
+    inicio_preproceso = time.perf_counter()
+    if preproceso:
+        cronometro.fase('preproceso')
+        if relajacion is None:
+            relajacion = relajacion_lagrangiana(instancia, single_source=single_source, limite_tiempo=time_limit,
+                                                verbose=False)
+
+    # La solución primal de la relajación reemplaza a la de la heurística si es mejor, como
+    # cota superior del preproceso y como solución inicial del solver
+    if relajacion is not None and relajacion['abiertos'] is not None and (
+            cota_superior is None or relajacion['cota_superior'] < cota_superior):
+        evaluador = EvaluadorCFLP(instancia, single_source=single_source)
+        evaluador.restaurar((relajacion['abiertos'], relajacion['asignacion'], relajacion['partes']))
+        abiertos_iniciales, x_inicial = evaluador.abiertos, evaluador.x_inicial()
+        best_fitness = cota_superior = relajacion['cota_superior']
+        heuristica = 'relajación lagrangiana'
+        print(f"La relajación lagrangiana da una solución mejor que la heurística: {best_fitness}")
+        if instrumentacion is not None:
+            instrumentacion.incumbente(best_fitness, 'lagrangiano')
+
+    # Fijamos por costo reducido lo que no puede mejorar la mejor solución conocida
+    reduccion = None
+    if preproceso:
+        restante = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - inicio_preproceso))
+        reduccion = preprocesar(instancia, single_source, cota_superior, abiertos_iniciales,
+                                multiplicadores=relajacion['multiplicadores'], dominancia=dominancia,
+                                limite_tiempo=restante)
+        # El tiempo del preproceso (con la relajación, si se calculó aquí) se descuenta del límite del solver
+        if time_limit is not None:
+            time_limit = max(0.0, time_limit - (time.perf_counter() - inicio_preproceso))
+        if reduccion.cota_inferior > (cota_inferior if cota_inferior is not None else -np.inf):
+            cota_inferior = reduccion.cota_inferior
+
+    # Resolvemos con el backend elegido, partiendo de los centros abiertos de la
+    # heurística y de la asignación calculada por el evaluador (fijos o como MIP start)
+    print(f"\nResolviendo con {backend}...")
+    resultado = RESOLUTORES[backend](
+        instancia, mod_path, single_source, abiertos_iniciales, x_inicial, cronometro,
+        solver=solver, max_nodes=max_nodes, time_limit=time_limit, cota_inferior=cota_inferior,
+        k_cercanos=k_cercanos, instrumentacion=instrumentacion, modo=modo, preproceso=reduccion
+    )
+
+    # Resumen de la solución (las asignaciones se guardan con -o en vez de listarse)
+    print(f"\n--- SOLUCIÓN {backend}")
+    resumen_solucion(resultado['abiertos'], resultado['x'], resultado['objetivo'], resultado['cota'])
+
+    total_cost_final = resultado['objetivo']
+    print("\n--- COMPARACIÓN DE COSTOS ---")
+    print(f"Costo inicial (de apertura + de asignación) de {heuristica}: {best_fitness}")
+    print(f"Costo final (de apertura + de asignación) optimizado por {backend}: {total_cost_final}")
+    if cota_inferior is not None:
+        print(f"Gap respecto de la cota inferior: {(total_cost_final - cota_inferior) / abs(total_cost_final):.4%}")
+
+    if salida is not None:
+        ruta = guardar_solucion(salida, resultado['abiertos'], resultado['x'], total_cost_final, resultado['cota'],
+                                dict(cronometro.tiempos), instancia=dat_path, backend=backend, modo=modo,
+                                costo_heuristica=best_fitness, cota_inferior=cota_inferior)
+        print(f"\nSolución guardada en {ruta}")
+
+    if almacen is not None:
+        almacen.guardar(*claves, resultado['abiertos'], resultado['x'], total_cost_final, resultado['cota'],
+                        dict(cronometro.tiempos), instancia=dat_path, backend=backend, modo=modo)
+
+    cronometro.detener()
+    cronometro.resumen()
+    if instrumentacion is not None:
+        instrumentacion.cerrar()
+    print(f"(tiempo del solver dentro de la resolución: {resultado['tiempo_solver']:.4f} s)")
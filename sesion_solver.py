@@ -0,0 +1,431 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ILS import iterated_local_search
+from cache_evaluaciones import CacheEvaluaciones
+from cache_instancias import cap_cost_array, cargar_instancia
+from datos_ampl import cargar_datos_ampl, fijar_arranque, nombres_conjuntos
+from evaluador import EvaluadorCFLP
+from modelo_matricial import construir_modelo, crear_highs, extraer_solucion, resolver_highs, vector_inicial
+from resolutores import opciones_gurobi, solucion_ampl
+from solucion import guardar_solucion
+
+# Campos de una solicitud de resolución (línea JSON). Solo 'instancia' es obligatorio:
+# - id: Identificador que se copia en la respuesta.
+# - instancia: Ruta al .txt o .dat de la instancia.
+# - single: Si es true se resuelve CFLPsingle.mod; si no, CFLP.mod.
+# - backend: 'highs' (por defecto) o 'ampl'.
+# - modelo, solver: Archivo .mod y solver de AMPL (solo ampl).
+# - tiempo, nodos, gap: Límite de tiempo, de nodos y gap relativo.
+# - capacidades, costos_fijos: Diccionarios {'j3': valor, ...} con los valores que cambian
+#   respecto de la instancia original.
+# - escala_capacidad: Factor que multiplica todas las capacidades (después de 'capacidades').
+# - arranque: Solución inicial: 'ils' (heurística), 'anterior' (la última solución de
+#   este modelo) o null.
+# - modo: 'arranque' (MIP start con las y libres) o 'fijar' (y fijas en la solución inicial).
+# - opciones: Opciones adicionales del solver (diccionario para highs, cadena para gurobi).
+# - salida: Ruta .npz donde guardar la solución (ver solucion.py).
+#
+# Acciones de control: {"accion": "estado"}, {"accion": "descargar", "instancia": ruta}
+# (libera la instancia y sus modelos) y {"accion": "salir"} (termina el flujo al
+# completar los trabajos pendientes).
+BACKENDS = ('highs', 'ampl')
+
+
+class ModeloCargado:
+    """
+    Un modelo construido y cargado en su motor (objeto Highs o AMPL), con los valores de
+    capacidades y costos fijos que tiene en este momento.
+
+    Cada modelo lo usa un solo trabajo a la vez; la sesión guarda los modelos libres
+    por clave y crea uno nuevo solo si todos los de esa clave están ocupados.
+    """
+
+    def __init__(self, backend, instancia, motor, modelo=None, C=None, D=None):
+        self.backend = backend
+        self.motor = motor
+        self.modelo = modelo
+        self.C, self.D = C, D
+        self.s = np.array(instancia.s, dtype=np.float64)
+        self.f = np.array(instancia.f, dtype=np.float64)
+        self.ultima = None  # (abiertos, x) de la última solución
+        self.resoluciones = 0
+
+    def aplicar(self, s, f):
+        """
+        Aplica al motor solo las capacidades y costos fijos que cambiaron.
+
+        Retorna:
+        - Número de parámetros modificados.
+        """
+        cambios_s = np.flatnonzero(s != self.s)
+        cambios_f = np.flatnonzero(f != self.f)
+        if self.backend == 'highs':
+            h, modelo = self.motor, self.modelo
+            p, n, m = modelo.pares_i.size, modelo.n, modelo.m
+            for j in cambios_s.tolist():
+                # CapacityLimit: ... - s[j] y[j] <= 0 (y, en CFLP.mod, SufficientCapacity)
+                h.changeCoeff(n + j, p + j, -s[j])
+                if not modelo.single_source:
+                    h.changeCoeff(n + m, p + j, s[j])
+            if cambios_f.size:
+                h.changeColsCost(cambios_f.size, (p + cambios_f).astype(np.int32), f[cambios_f])
+        else:
+            ampl = self.motor
+            if cambios_s.size:
+                ampl.getParameter('s').setValues({self.C[j]: float(s[j]) for j in cambios_s.tolist()})
+            if cambios_f.size:
+                ampl.getParameter('f').setValues({self.C[j]: float(f[j]) for j in cambios_f.tolist()})
+        self.s[cambios_s] = s[cambios_s]
+        self.f[cambios_f] = f[cambios_f]
+        return int(cambios_s.size + cambios_f.size)
+
+
+def _valores_por_nombre(base, cambios, nombre):
+    # Aplica un diccionario {'j3': valor} sobre una copia del array base
+    valores = np.array(base, dtype=np.float64)
+    for clave, valor in (cambios or {}).items():
+        if not (isinstance(clave, str) and clave[:1] == 'j' and clave[1:].isdigit()):
+            raise ValueError(f"Nombre de almacén inválido en {nombre}: {clave!r} (se espera 'j<k>')")
+        j = int(clave[1:]) - 1
+        if not 0 <= j < valores.size:
+            raise ValueError(f"Almacén fuera de rango en {nombre}: {clave}")
+        valores[j] = float(valor)
+    return valores
+
+
+class SesionSolver:
+    """
+    Sesión de resolución de larga duración.
+
+    Mantiene en memoria las instancias cargadas y los modelos ya construidos (objetos
+    Highs o AMPL con el .mod leído y los datos enviados), de modo que cada solicitud
+    solo aplica los parámetros que cambiaron (capacidades, costos fijos, límites y
+    opciones del solver) y vuelve a resolver, sin pagar de nuevo el arranque ni la
+    construcción o traducción del modelo. Los trabajos se ejecutan en un pool de hilos
+    con un límite de concurrencia; HiGHS libera el GIL mientras resuelve.
+    """
+
+    def __init__(self, concurrencia=1, cache_mb=64, verbose=False):
+        """
+        Parámetros:
+        - concurrencia: Número máximo de resoluciones simultáneas.
+        - cache_mb: Memoria máxima en MB del caché de evaluaciones del ILS (0 lo desactiva).
+        - verbose: Si es True se muestra el log del solver (en stderr).
+        """
+        self.concurrencia = concurrencia
+        self.cache_mb = cache_mb
+        self.verbose = verbose
+        self._instancias = {}  # ruta absoluta -> Instancia
+        self._libres = defaultdict(list)  # clave del modelo -> [ModeloCargado]
+        self._creados = defaultdict(int)
+        self._candado = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(concurrencia)
+        self.contadores = defaultdict(int)
+
+    # --- Instancias y modelos ---
+
+    def instancia(self, ruta):
+        """Retorna la instancia cargada (la carga la primera vez)."""
+        ruta = os.path.abspath(ruta)
+        with self._candado:
+            instancia = self._instancias.get(ruta)
+        if instancia is None:
+            if not os.path.exists(ruta):
+                raise FileNotFoundError(f"El archivo de datos '{ruta}' no existe")
+            instancia = cargar_instancia(ruta)
+            with self._candado:
+                instancia = self._instancias.setdefault(ruta, instancia)
+        return instancia
+
+    def _clave(self, solicitud):
+        backend = solicitud.get('backend', 'highs')
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido: {backend}")
+        single = bool(solicitud.get('single', False))
+        modelo = solicitud.get('modelo') or ('modelo_mod/CFLPsingle.mod' if single else 'modelo_mod/CFLP.mod')
+        return (backend, os.path.abspath(solicitud['instancia']), single,
+                os.path.abspath(modelo) if backend == 'ampl' else None)
+
+    def _tomar(self, clave, instancia):
+        # Toma un modelo libre de la clave o construye uno nuevo
+        with self._candado:
+            if self._libres[clave]:
+                self.contadores['modelos_reutilizados'] += 1
+                return self._libres[clave].pop(), True
+            self._creados[clave] += 1
+            self.contadores['modelos_creados'] += 1
+
+        backend, _, single, mod_path = clave
+        if backend == 'highs':
+            modelo = construir_modelo(instancia, single)
+            return ModeloCargado(backend, instancia, crear_highs(modelo), modelo), False
+
+        from amplpy import AMPL, Environment
+
+        ampl = AMPL(Environment())
+        ampl.read(mod_path)
+        C, D = cargar_datos_ampl(ampl, instancia)
+        return ModeloCargado(backend, instancia, ampl, C=C, D=D), False
+
+    def _devolver(self, clave, cargado):
+        with self._candado:
+            if clave in self._creados:
+                self._libres[clave].append(cargado)
+
+    def descargar(self, ruta):
+        """Libera una instancia y todos sus modelos libres."""
+        ruta = os.path.abspath(ruta)
+        with self._candado:
+            self._instancias.pop(ruta, None)
+            for clave in [k for k in self._creados if k[1] == ruta]:
+                del self._creados[clave]
+                for cargado in self._libres.pop(clave, []):
+                    if cargado.backend == 'ampl':
+                        cargado.motor.close()
+
+    def estado(self):
+        """Retorna un resumen de la sesión: instancias, modelos y contadores."""
+        with self._candado:
+            return {
+                'instancias': sorted(self._instancias),
+                'modelos': [{'backend': k[0], 'instancia': k[1], 'single': k[2], 'creados': creados,
+                             'libres': len(self._libres[k])} for k, creados in self._creados.items()],
+                'concurrencia': self.concurrencia,
+                **self.contadores,
+            }
+
+    # --- Resolución ---
+
+    def _arranque(self, instancia, single, cargado, tipo):
+        # Solución inicial (abiertos, x denso) según el tipo pedido, o None
+        if tipo is None:
+            return None
+        if tipo == 'anterior':
+            if cargado.ultima is None:
+                return None
+            abiertos, x = cargado.ultima
+            return abiertos, x.toarray()
+        if tipo != 'ils':
+            raise ValueError(f"Arranque desconocido: {tipo}")
+        facilities = instancia.s.shape[0]
+        evaluador = EvaluadorCFLP(instancia, single)
+        cache = CacheEvaluaciones(facilities, max_bytes=self.cache_mb * 2**20) if self.cache_mb > 0 else None
+        iterated_local_search(cap_cost_array(instancia), facilities, float(np.asarray(instancia.demand).sum()),
+                              evaluator=evaluador, verbose=False, cache=cache)
+        if not evaluador.factible:
+            return None
+        return evaluador.abiertos.copy(), evaluador.x_inicial()
+
+    def resolver(self, solicitud):
+        """
+        Resuelve una solicitud (diccionario con los campos descritos arriba).
+
+        Retorna:
+        - Diccionario de respuesta con id, estado, objetivo, cota, gap, centros abiertos,
+          tiempos, si el modelo se reutilizó y cuántos parámetros se cambiaron.
+        """
+        inicio = time.perf_counter()
+        clave = self._clave(solicitud)
+        backend, ruta, single, _ = clave
+        base = self.instancia(ruta)
+        s = _valores_por_nombre(base.s, solicitud.get('capacidades'), 'capacidades')
+        s *= float(solicitud.get('escala_capacidad', 1.0))
+        f = _valores_por_nombre(base.f, solicitud.get('costos_fijos'), 'costos_fijos')
+        instancia = base._replace(s=s, f=f)
+        modo = solicitud.get('modo', 'arranque')
+        if modo not in ('arranque', 'fijar'):
+            raise ValueError(f"Modo desconocido: {modo}")
+        gap = float(solicitud.get('gap', 1e-4))
+
+        cargado, reutilizado = self._tomar(clave, base)
+        try:
+            cambios = cargado.aplicar(s, f)
+            arranque = self._arranque(instancia, single, cargado, solicitud.get('arranque'))
+            if modo == 'fijar' and arranque is None:
+                raise ValueError("El modo 'fijar' necesita una solución inicial ('arranque')")
+            preparacion = time.perf_counter() - inicio
+
+            if backend == 'highs':
+                h, modelo = cargado.motor, cargado.modelo
+                # Las opciones de la solicitud anterior no se arrastran
+                h.resetOptions()
+                for nombre, valor in (solicitud.get('opciones') or {}).items():
+                    h.setOptionValue(nombre, valor)
+                resultado = resolver_highs(
+                    modelo, limite_tiempo=solicitud.get('tiempo'), max_nodos=solicitud.get('nodos'), gap=gap,
+                    valores_iniciales=vector_inicial(modelo, *arranque) if arranque is not None else None,
+                    y_fijo=arranque[0].astype(float) if modo == 'fijar' else None, verbose=self.verbose, h=h
+                )
+                if resultado['valores'] is None:
+                    raise RuntimeError(f"HiGHS terminó sin solución ({resultado['estado']})")
+                abiertos, x = extraer_solucion(modelo, resultado['valores'])
+                estado, objetivo, cota = resultado['estado'], resultado['objetivo'], resultado['cota']
+                tiempo_solver = resultado['tiempo']
+            else:
+                ampl = cargado.motor
+                ampl.eval('unfix y;')
+                if arranque is not None:
+                    fijar_arranque(ampl, cargado.C, cargado.D, arranque[0], arranque[1], fijar=(modo == 'fijar'))
+                ampl.setOption('solver', solicitud.get('solver', 'gurobi'))
+                ampl.setOption('gurobi_options', opciones_gurobi(
+                    'arranque' if arranque is not None and modo == 'arranque' else 'fijar',
+                    solicitud.get('tiempo'), solicitud.get('nodos'), gap=gap, extra=solicitud.get('opciones')
+                ))
+                ampl.solve()
+                resultado = solucion_ampl(ampl, cargado.C, cargado.D)
+                abiertos, x = resultado['abiertos'], resultado['x']
+                estado = ampl.getValue('solve_result')
+                objetivo, cota, tiempo_solver = resultado['objetivo'], resultado['cota'], resultado['tiempo_solver']
+
+            cargado.ultima = (abiertos, x)
+            cargado.resoluciones += 1
+        finally:
+            self._devolver(clave, cargado)
+
+        C, _ = nombres_conjuntos(instancia)
+        respuesta = {
+            'id': solicitud.get('id'),
+            'estado': estado,
+            'objetivo': objetivo,
+            'cota': cota,
+            'gap': (objetivo - cota) / abs(objetivo) if cota is not None and np.isfinite(cota) and objetivo else None,
+            'abiertos': [C[j] for j in np.flatnonzero(abiertos)],
+            'reutilizado': reutilizado,
+            'cambios': cambios,
+            'tiempo_preparacion': preparacion,
+            'tiempo_solver': tiempo_solver,
+            'tiempo': time.perf_counter() - inicio,
+        }
+        if solicitud.get('salida'):
+            respuesta['salida'] = guardar_solucion(solicitud['salida'], abiertos, x, objetivo, cota,
+                                                   {'preparacion': preparacion, 'resolucion': tiempo_solver},
+                                                   instancia=ruta, backend=backend, single=single,
+                                                   capacidades=solicitud.get('capacidades'),
+                                                   costos_fijos=solicitud.get('costos_fijos'))
+        return respuesta
+
+    def _resolver_seguro(self, solicitud):
+        try:
+            respuesta = self.resolver(solicitud)
+            self.contadores['resueltas'] += 1
+            return respuesta
+        except Exception as e:
+            self.contadores['errores'] += 1
+            return {'id': solicitud.get('id'), 'error': f"{type(e).__name__}: {e}"}
+
+    def enviar(self, solicitud):
+        """Encola una solicitud; retorna un Future con la respuesta."""
+        return self._ejecutor.submit(self._resolver_seguro, solicitud)
+
+    def atender(self, lineas, escribir):
+        """
+        Procesa un flujo de solicitudes JSON lines. Las respuestas se escriben a medida
+        que terminan (no necesariamente en orden; cada una lleva su id).
+
+        Parámetros:
+        - lineas: Iterable de líneas de texto (por ejemplo, sys.stdin).
+        - escribir: Función que recibe cada línea de respuesta.
+        """
+        candado = threading.Lock()
+
+        def _responder(respuesta):
+            texto = json.dumps(respuesta, default=float)
+            with candado:
+                escribir(texto + '\n')
+
+        pendientes = []
+        for linea in lineas:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                solicitud = json.loads(linea)
+            except ValueError as e:
+                _responder({'error': f"JSON inválido: {e}"})
+                continue
+            accion = solicitud.get('accion', 'resolver')
+            if accion == 'salir':
+                break
+            if accion == 'estado':
+                _responder({'id': solicitud.get('id'), **self.estado()})
+            elif accion == 'descargar':
+                self.descargar(solicitud['instancia'])
+                _responder({'id': solicitud.get('id'), 'descargada': solicitud['instancia']})
+            elif accion == 'resolver':
+                # La respuesta se escribe dentro del trabajo, así que al esperar los
+                # pendientes todas las respuestas ya están escritas
+                pendientes.append(self._ejecutor.submit(lambda s=solicitud: _responder(self._resolver_seguro(s))))
+            else:
+                _responder({'id': solicitud.get('id'), 'error': f"Acción desconocida: {accion}"})
+        for futuro in pendientes:
+            futuro.result()
+
+    def cerrar(self):
+        """Espera los trabajos pendientes y libera los modelos."""
+        self._ejecutor.shutdown(wait=True)
+        for ruta in list(self._instancias):
+            self.descargar(ruta)
+
+
+def servir_socket(sesion, ruta_socket):
+    """
+    Atiende solicitudes en un socket Unix local. Cada conexión es un flujo JSON lines
+    independiente; todas comparten la sesión y su límite de concurrencia.
+    """
+    class _Manejador(socketserver.StreamRequestHandler):
+        def handle(self):
+            lineas = (linea.decode('utf-8') for linea in self.rfile)
+
+            def _escribir(texto):
+                self.wfile.write(texto.encode('utf-8'))
+                self.wfile.flush()
+
+            sesion.atender(lineas, _escribir)
+
+    if os.path.exists(ruta_socket):
+        os.remove(ruta_socket)
+    with socketserver.ThreadingUnixStreamServer(ruta_socket, _Manejador) as servidor:
+        print(f"Sesión escuchando en {ruta_socket}", file=sys.stderr)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    os.remove(ruta_socket)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sesión persistente de resolución: mantiene instancias y modelos "
+                                                 "cargados y atiende solicitudes JSON lines por stdin o un socket.")
+    parser.add_argument('-c', '--concurrencia', type=int, default=1, help="Número máximo de resoluciones simultáneas.")
+    parser.add_argument('--socket', type=str, default=None,
+                        help="Ruta de un socket Unix local donde atender (por defecto, stdin/stdout).")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="Memoria máxima en MB del caché de evaluaciones del ILS (0 lo desactiva).")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Mostrar el log del solver.")
+    args = parser.parse_args()
+
+    if args.concurrencia < 1:
+        print("Error: La concurrencia debe ser al menos 1.")
+        sys.exit(1)
+
+    sesion = SesionSolver(args.concurrencia, args.cache_mb, args.verbose)
+    try:
+        if args.socket is not None:
+            servir_socket(sesion, args.socket)
+        else:
+            # stdout queda solo para las respuestas; los mensajes de progreso van a stderr
+            respuestas, sys.stdout = sys.stdout, sys.stderr
+            sesion.atender(sys.stdin, lambda texto: (respuestas.write(texto), respuestas.flush()))
+    finally:
+        sesion.cerrar()
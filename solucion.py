@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def guardar_solucion(ruta, abiertos, x, objetivo, cota=None, tiempos=None, **meta):
+    """
+    Guarda una solución en formato .npz comprimido: las asignaciones no nulas como
+    tripletas (cliente, almacén, valor), la máscara de almacenes abiertos y un JSON con
+    el objetivo, la cota, los tiempos por fase y los metadatos adicionales.
+
+    Parámetros:
+    - ruta: Ruta del archivo de salida (se agrega .npz si no lo tiene).
+    - abiertos: Array booleano (m,) con los almacenes abiertos.
+    - x: Matriz dispersa (n, m) con las asignaciones (o array denso).
+    - objetivo: Valor de la función objetivo.
+    - cota: Cota inferior del solver (opcional).
+    - tiempos: Diccionario fase -> segundos (opcional).
+    - meta: Otros datos serializables en JSON (instancia, backend, modo, ...).
+
+    Retorna:
+    - Ruta del archivo escrito.
+    """
+    x = sp.coo_matrix(x)
+    info = {'objetivo': objetivo, 'cota': cota, 'tiempos': tiempos or {}, 'forma': list(x.shape), **meta}
+    if not ruta.endswith('.npz'):
+        ruta += '.npz'
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    np.savez_compressed(
+        ruta,
+        fila=x.row.astype(np.int32),
+        columna=x.col.astype(np.int32),
+        valor=x.data.astype(np.float64),
+        abiertos=np.asarray(abiertos, dtype=bool),
+        info=np.array(json.dumps(info, default=float)),
+    )
+    return ruta
+
+
+def cargar_solucion(ruta):
+    """
+    Carga una solución guardada con guardar_solucion.
+
+    Retorna:
+    - abiertos: Array booleano (m,).
+    - x: Matriz dispersa CSR (n, m).
+    - info: Diccionario con objetivo, cota, tiempos y metadatos.
+    """
+    with np.load(ruta) as datos:
+        info = json.loads(str(datos['info']))
+        x = sp.csr_matrix((datos['valor'], (datos['fila'], datos['columna'])), shape=tuple(info['forma']))
+        return datos['abiertos'], x, info
+
+
+def resumen_solucion(abiertos, x, objetivo, cota=None):
+    """Imprime un resumen de la solución: centros abiertos, asignaciones no nulas y clientes divididos."""
+    x = sp.csr_matrix(x)
+    centros = np.flatnonzero(abiertos)
+    por_cliente = np.diff(x.indptr)
+    print(f"Centros abiertos ({centros.size}): " + ", ".join(f"j{j+1}" for j in centros[:50])
+          + (" ..." if centros.size > 50 else ""))
+    print(f"Asignaciones no nulas: {x.nnz} (clientes divididos entre varios centros: {int((por_cliente > 1).sum())})")
+    print(f"Objetivo: {objetivo}")
+    if cota is not None and np.isfinite(cota) and objetivo:
+        print(f"Cota: {cota} (gap {(objetivo - cota) / abs(objetivo):.4%})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Muestra el resumen de una solución guardada (.npz).")
+    parser.add_argument('-i', '--input', type=str, required=True, help="Ruta al archivo .npz de la solución.")
+    parser.add_argument('--asignaciones', action='store_true', help="Listar también cada asignación no nula.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: El archivo '{args.input}' no existe.")
+        sys.exit(1)
+
+    abiertos, x, info = cargar_solucion(args.input)
+    resumen_solucion(abiertos, x, info['objetivo'], info['cota'])
+    for fase, segundos in info['tiempos'].items():
+        print(f"{fase:<20} {segundos:10.4f} s")
+    if args.asignaciones:
+        x = x.tocoo()
+        for i, j, valor in zip(x.row, x.col, x.data):
+            print(f"Cliente i{i+1} asignado a Centro j{j+1}: {valor}")
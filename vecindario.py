@@ -0,0 +1,257 @@
+import numpy as np
+import scipy.sparse as sp
+
+from evaluador import EPS
+
+# Estrategias de selección del movimiento:
+# - mejor: se verifican con el evaluador los `verificaciones` movimientos de mejor delta
+#   estimado y se aplica el mejor de ellos (best improvement); si ninguno mejora, se
+#   sigue con los siguientes mientras la estimación prometa una mejora.
+# - primera: se recorren al azar los movimientos con delta estimado negativo y se aplica
+#   el primero que mejora al verificarlo (first improvement).
+ESTRATEGIAS = ('mejor', 'primera')
+
+# Valor de "ninguno" en los pares (cerrar, abrir) de un movimiento
+NINGUNO = -1
+
+
+class Vecindario:
+    """
+    Evalúa en bloque todo el vecindario de abrir, cerrar e intercambiar centros.
+
+    Con el mejor y el segundo mejor centro abierto de cada cliente, el cambio de
+    costo de cada movimiento (ignorando las capacidades) se obtiene con reducciones
+    de NumPy sobre la matriz de costos:
+
+    - abrir j: f[j] - sum_i max(0, b1[i] - c[i, j]).
+    - cerrar k: -f[k] + sum de (b2[i] - b1[i]) sobre los clientes cuyo mejor centro es k.
+    - intercambiar (cerrar k, abrir j): lo anterior más una corrección para los clientes
+      de k, agregada para todos los pares a la vez con un producto disperso.
+
+    Los movimientos que dejan la capacidad total por debajo de la demanda se
+    descartan. Como las capacidades y la penalización de los clientes sin atender
+    no entran en la estimación, los candidatos elegidos se verifican con el
+    evaluador (EvaluadorCFLP), que da su costo real, y solo se aplican si mejoran
+    (o, con tabú, si son el mejor movimiento admisible).
+
+    Con tenencia > 0 se hace búsqueda tabú: los centros que cambian de estado
+    quedan prohibidos durante tenencia iteraciones, salvo que el movimiento lleve a
+    un costo menor que el mejor encontrado (aspiración).
+    """
+
+    def __init__(self, estrategia='mejor', tenencia=0, verificaciones=3, semilla=None, max_lotes=None):
+        """
+        Parámetros:
+        - estrategia: Una de ESTRATEGIAS.
+        - tenencia: Iteraciones que un centro queda tabú tras cambiar de estado (0 = sin tabú).
+        - verificaciones: Número máximo de movimientos verificados con el evaluador por iteración.
+        - semilla: Semilla del orden aleatorio de la estrategia 'primera'.
+        - max_lotes: Número máximo de lotes de verificaciones por iteración (por defecto,
+          sin límite: se sigue mientras la estimación prometa una mejora).
+        """
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia desconocida: {estrategia} (opciones: {', '.join(ESTRATEGIAS)})")
+        self.estrategia = estrategia
+        self.tenencia = tenencia
+        self.verificaciones = verificaciones
+        self.max_lotes = max_lotes
+        self.rng = np.random.default_rng(semilla)
+        # Contadores acumulados entre llamadas a buscar
+        self.iteraciones = 0
+        self.aplicados = 0
+        self.verificados = 0
+
+    def _deltas(self, evaluador, abiertos, zona=None):
+        # Deltas en forma compacta: solo filas de centros abiertos y columnas de cerrados
+        # (de la zona, si se indica; los abiertos fuera de ella quedan con delta inf)
+        costos, f, s = evaluador.costos, evaluador.f, evaluador.s
+        n = costos.shape[0]
+        filas = np.arange(n)
+        indices_abiertos = np.flatnonzero(abiertos)
+        indices_cerrados = np.flatnonzero(~abiertos if zona is None else ~abiertos & zona)
+        cerrados = costos[:, indices_cerrados]
+        if not indices_abiertos.size:
+            return (indices_abiertos, indices_cerrados, f[indices_cerrados] + cerrados.sum(axis=0),
+                    np.zeros(0), np.zeros((0, indices_cerrados.size)))
+
+        # Mejor y segundo mejor centro abierto de cada cliente
+        sub = costos[:, indices_abiertos]
+        mejor = np.argmin(sub, axis=1)
+        b1 = sub[filas, mejor]
+        sub[filas, mejor] = np.inf
+        b2 = sub.min(axis=1) if indices_abiertos.size > 1 else np.full(n, np.inf)
+
+        ganancia = np.minimum(cerrados - b1[:, None], 0.0).sum(axis=0)
+        delta_abrir = f[indices_cerrados] + ganancia
+
+        # Capacidad que sobra sobre la demanda total: limita qué centros se pueden cerrar
+        sobrante = s[indices_abiertos].sum() - evaluador.demand.sum() + EPS
+        s_abiertos = s[indices_abiertos]
+        perdida = np.bincount(mejor, weights=b2 - b1, minlength=indices_abiertos.size)
+        delta_cerrar = np.where(s_abiertos <= sobrante, perdida - f[indices_abiertos], np.inf)
+
+        # Al cerrar k, cada uno de sus clientes pasa al mejor entre su segundo centro y j,
+        # y pierde lo que ganancia[j] le había contado por pasar a j desde k
+        correccion = np.clip(cerrados, b1[:, None], b2[:, None]) - b1[:, None]
+        asignados = sp.csr_matrix((np.ones(n), (mejor, filas)), shape=(indices_abiertos.size, n))
+        delta_intercambio = (f[indices_cerrados][None, :] - f[indices_abiertos][:, None] + ganancia[None, :]
+                             + asignados @ correccion)
+        delta_intercambio[s_abiertos[:, None] - s[indices_cerrados][None, :] > sobrante] = np.inf
+        if zona is not None:
+            fuera = ~zona[indices_abiertos]
+            delta_cerrar[fuera] = np.inf
+            delta_intercambio[fuera] = np.inf
+        return indices_abiertos, indices_cerrados, delta_abrir, delta_cerrar, delta_intercambio
+
+    def deltas(self, evaluador, abiertos=None, zona=None):
+        """
+        Estima el cambio de costo de todos los movimientos desde un conjunto abierto.
+
+        Parámetros:
+        - evaluador: EvaluadorCFLP de la instancia (se usan sus costos, no su estado).
+        - abiertos: Array booleano (m,) (por defecto, los abiertos del evaluador).
+        - zona: Array booleano (m,) con los centros que pueden cambiar de estado (por
+          defecto, todos). Los movimientos con centros fuera de la zona quedan en inf.
+
+        Retorna:
+        - delta_abrir: Array (m,) (inf para los centros abiertos).
+        - delta_cerrar: Array (m,) (inf para los cerrados y los que dejan la capacidad corta).
+        - delta_intercambio: Array (m, m) con [k, j] = cerrar k y abrir j (inf si no es válido).
+        """
+        abiertos = evaluador.abiertos if abiertos is None else np.asarray(abiertos, dtype=bool)
+        m = abiertos.size
+        indices_abiertos, indices_cerrados, compacto_abrir, compacto_cerrar, compacto_intercambio = \
+            self._deltas(evaluador, abiertos, zona)
+        delta_abrir = np.full(m, np.inf)
+        delta_abrir[indices_cerrados] = compacto_abrir
+        delta_cerrar = np.full(m, np.inf)
+        delta_cerrar[indices_abiertos] = compacto_cerrar
+        delta_intercambio = np.full((m, m), np.inf)
+        delta_intercambio[np.ix_(indices_abiertos, indices_cerrados)] = compacto_intercambio
+        return delta_abrir, delta_cerrar, delta_intercambio
+
+    def movimientos(self, evaluador, zona=None):
+        """
+        Lista todos los movimientos válidos desde la solución actual del evaluador
+        (solo entre centros de la zona, si se indica).
+
+        Retorna:
+        - cerrar: Array con el centro que se cierra en cada movimiento (NINGUNO al abrir).
+        - abrir: Array con el centro que se abre en cada movimiento (NINGUNO al cerrar).
+        - delta: Array con el cambio de costo estimado de cada movimiento.
+        """
+        indices_abiertos, indices_cerrados, delta_abrir, delta_cerrar, delta_intercambio = \
+            self._deltas(evaluador, evaluador.abiertos, zona)
+        c = np.flatnonzero(np.isfinite(delta_cerrar))
+        k, j = np.nonzero(np.isfinite(delta_intercambio))
+        cerrar = np.concatenate((np.full(indices_cerrados.size, NINGUNO), indices_abiertos[c], indices_abiertos[k]))
+        abrir = np.concatenate((indices_cerrados, np.full(c.size, NINGUNO), indices_cerrados[j]))
+        delta = np.concatenate((delta_abrir, delta_cerrar[c], delta_intercambio[k, j]))
+        return cerrar, abrir, delta
+
+    def _aplicar(self, evaluador, cerrar, abrir):
+        if abrir != NINGUNO:
+            evaluador.abrir(abrir)
+        if cerrar != NINGUNO:
+            evaluador.cerrar(cerrar)
+        return evaluador.costo
+
+    def _verificar(self, evaluador, cerrar, abrir):
+        # Costo real del movimiento, dejando el evaluador como estaba
+        marca = evaluador.checkpoint()
+        costo = self._aplicar(evaluador, cerrar, abrir)
+        evaluador.rollback(marca)
+        self.verificados += 1
+        return costo
+
+    def _candidatos(self, delta, admisibles, actual, mejor_costo):
+        # Orden en que se verifican los movimientos: los que la estimación da como mejoras
+        # (al azar con 'primera', de mejor a peor con 'mejor') o, si son menos que
+        # verificaciones, los de mejor estimación. Los tabú solo entran si su estimación
+        # promete superar el mejor costo (aspiración)
+        candidatos = np.flatnonzero(admisibles | (actual + delta < mejor_costo - EPS))
+        mejoran = candidatos[delta[candidatos] < -EPS]
+        if self.estrategia == 'primera' and mejoran.size:
+            return self.rng.permutation(mejoran)
+        if mejoran.size < self.verificaciones and candidatos.size > self.verificaciones:
+            mejoran = candidatos[np.argpartition(delta[candidatos], self.verificaciones - 1)[:self.verificaciones]]
+        elif mejoran.size < self.verificaciones:
+            mejoran = candidatos
+        return mejoran[np.argsort(delta[mejoran], kind='stable')]
+
+    def buscar(self, evaluador, max_iteraciones=100, sin_mejora=None, zona=None):
+        """
+        Búsqueda local (o tabú, con tenencia > 0) sobre la solución del evaluador.
+
+        Parámetros:
+        - evaluador: EvaluadorCFLP con la solución inicial cargada.
+        - max_iteraciones: Número máximo de iteraciones (un movimiento por iteración).
+        - sin_mejora: Con tabú, iteraciones seguidas sin mejorar el mejor costo antes
+          de detenerse (por defecto, max_iteraciones).
+        - zona: Array booleano (m,) con los centros que pueden abrirse o cerrarse (por
+          defecto, todos). Limitar la zona acota el costo de cada iteración a sus
+          columnas; los clientes se siguen reasignando en toda la instancia.
+
+        Retorna:
+        - Costo de la mejor solución encontrada, que queda cargada en el evaluador
+          (con los cambios aceptados).
+        """
+        m = evaluador.m
+        tabu = np.zeros(m, dtype=np.int64)  # Iteración hasta la que cada centro es tabú
+        mejor_costo = evaluador.costo
+        mejor = evaluador.instantanea() if self.tenencia > 0 else None
+        sin_mejora = sin_mejora or max_iteraciones
+        estancadas = 0
+
+        for iteracion in range(1, max_iteraciones + 1):
+            self.iteraciones += 1
+            actual = evaluador.costo
+            cerrar, abrir, delta = self.movimientos(evaluador, zona)
+            if not delta.size:
+                break
+            admisibles = ((cerrar == NINGUNO) | (tabu[cerrar] < iteracion)) & ((abrir == NINGUNO) | (tabu[abrir] < iteracion))
+
+            # Se verifica por lotes de `verificaciones` movimientos; se pasa al lote
+            # siguiente solo si ninguno mejoró y la estimación aún promete una mejora
+            elegido = None
+            elegido_costo = np.inf
+            orden = self._candidatos(delta, admisibles, actual, mejor_costo)
+            if self.max_lotes is not None:
+                orden = orden[:self.max_lotes * self.verificaciones]
+            for inicio in range(0, orden.size, self.verificaciones):
+                lote = orden[inicio:inicio + self.verificaciones]
+                if inicio and (elegido_costo < actual - EPS or delta[lote[0]] >= -EPS):
+                    break
+                for k in lote.tolist():
+                    costo = self._verificar(evaluador, cerrar[k], abrir[k])
+                    if not admisibles[k] and costo >= mejor_costo - EPS:
+                        continue
+                    if costo < elegido_costo:
+                        elegido, elegido_costo = k, costo
+                    if self.estrategia == 'primera' and costo < actual - EPS:
+                        break
+
+            # Sin tabú solo se aceptan mejoras; con tabú, el mejor movimiento admisible
+            if elegido is None or (self.tenencia == 0 and elegido_costo >= actual - EPS):
+                break
+            self._aplicar(evaluador, cerrar[elegido], abrir[elegido])
+            evaluador.commit()
+            self.aplicados += 1
+            if self.tenencia > 0:
+                for centro in (cerrar[elegido], abrir[elegido]):
+                    if centro != NINGUNO:
+                        tabu[centro] = iteracion + self.tenencia
+
+            if evaluador.costo < mejor_costo - EPS:
+                mejor_costo = evaluador.costo
+                estancadas = 0
+                if mejor is not None:
+                    mejor = evaluador.instantanea()
+            else:
+                estancadas += 1
+                if estancadas >= sin_mejora:
+                    break
+
+        if mejor is not None and evaluador.costo > mejor_costo:
+            evaluador.restaurar(mejor)
+        return evaluador.costo